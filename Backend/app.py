@@ -1,4 +1,4 @@
-from flask import Flask, jsonify, render_template, send_from_directory, request
+from flask import Flask, Response, jsonify, render_template, send_from_directory, request
 from flask_cors import CORS
 from config import Config
 from routes.map_routes import map_bp
@@ -6,15 +6,19 @@ from routes.chat_routes import chat_bp
 from routes.travel_routes import travel_bp
 from routes.auth_routes import auth_bp
 from models.plan_model import init_plan_tables
-from services.googlemap_service import GoogleMapService
-from services.data_fix_service import DataFixService
-from services.gemini_service import GeminiService
-from services.travel_service import TravelService
+from models.cache_maintenance import CacheMaintenanceWorker
+from models.cache_metrics import cache_metrics
+from models.cache_namespaces import POLICIES_BY_NAME
+from services import registry
+from services.googlemap_service import single_flight
+from services.circuit_breaker import circuit_breakers
+from services.quota import quota_manager
 from tutorial_template import TUTORIAL_TEMPLATE
 import os
 import traceback
 import json
-from datetime import date
+import math
+from datetime import date, timedelta
 
 # 存储从 setup.html 传来的行程数据
 stored_itinerary_data = None
@@ -24,11 +28,16 @@ with open("response.json", "r", encoding="utf-8") as f:
 with open("test.json", "r", encoding="utf-8") as f:
     test_data_2 = json.load(f)
 
-# 初始化服務
-google_map_service = GoogleMapService()
-data_fix_service = DataFixService()
-gemini_service = GeminiService()
-travel_service = TravelService()
+# 初始化服務（與 controllers、routes 共用同一組實例）
+google_map_service = registry.google_map_service()
+data_fix_service = registry.data_fix_service()
+gemini_service = registry.gemini_service()
+travel_service = registry.travel_service()
+cache_maintenance_worker = CacheMaintenanceWorker(
+    google_map_service.place_cache,
+    interval_seconds=Config.CACHE_PURGE_INTERVAL_SECONDS,
+    place_index=google_map_service.place_index,
+)
 
 
 def create_app():
@@ -40,6 +49,9 @@ def create_app():
 
     init_plan_tables()
 
+    if Config.CACHE_PURGE_INTERVAL_SECONDS > 0 and not cache_maintenance_worker.is_alive():
+        cache_maintenance_worker.start()
+
     CORS(app)
 
     app.register_blueprint(map_bp, url_prefix="/api/maps")
@@ -256,9 +268,125 @@ def create_app():
 
     @app.route("/cache/clear", methods=["POST"])
     def clear_cache():
-        """清除所有快取"""
-        google_map_service.place_cache.clear_all()
-        return jsonify({"success": True, "message": "所有快取已清除"}), 200
+        """
+        選擇性清除快取，body 可組合以下條件，回傳各條件刪除的筆數：
+          {"keys": ["details_xxx", ...]}         指定 key
+          {"prefix": "photo_cdn_"}               key 前綴
+          {"place_id": "ChIJ..."}                和某個地點有關的所有快取
+          {"namespace": "search"}                整個命名空間
+          {"older_than_seconds": 86400}          超過指定秒數的資料（可搭配 namespace）
+          {"all": true}                          全部清除
+        """
+        body = request.get_json(silent=True) or {}
+        place_cache = google_map_service.place_cache
+        namespace = body.get("namespace")
+        if namespace and namespace not in POLICIES_BY_NAME:
+            return jsonify({"success": False, "error": f"未知的命名空間: {namespace}"}), 400
+        max_age = None
+        if body.get("older_than_seconds") is not None:
+            # 先檢查再開始刪除，避免前面的條件已經生效才回 400
+            seconds = body["older_than_seconds"]
+            valid = (not isinstance(seconds, bool) and isinstance(seconds, (int, float))
+                     and math.isfinite(seconds) and seconds >= 0)
+            try:
+                max_age = timedelta(seconds=seconds) if valid else None
+            except OverflowError:
+                max_age = None
+            if max_age is None:
+                return jsonify({"success": False, "error": "older_than_seconds 必須是非負的有限數字"}), 400
+
+        try:
+            deleted = {}
+            if body.get("all") is True:
+                deleted["all"] = place_cache.clear_all()
+                deleted["place_index"] = google_map_service.place_index.clear()
+            else:
+                if body.get("keys"):
+                    keys = body["keys"]
+                    if not isinstance(keys, list):
+                        return jsonify({"success": False, "error": "keys 必須是陣列"}), 400
+                    deleted["keys"] = place_cache.invalidate_keys(keys)
+                if body.get("prefix"):
+                    deleted["prefix"] = place_cache.invalidate_prefix(body["prefix"])
+                if body.get("place_id"):
+                    deleted["place_id"] = place_cache.invalidate_place(body["place_id"])
+                    deleted["place_id"]["place_index"] = google_map_service.place_index.remove_place(body["place_id"])
+                if max_age is not None:
+                    deleted["older_than"] = place_cache.invalidate_older_than(max_age, namespace)
+                elif namespace:
+                    deleted["namespace"] = place_cache.invalidate_namespace(namespace)
+        except (TypeError, ValueError) as exc:
+            return jsonify({"success": False, "error": str(exc)}), 400
+
+        if not deleted:
+            return jsonify({
+                "success": False,
+                "error": "請指定 keys、prefix、place_id、namespace、older_than_seconds，或以 {\"all\": true} 清除全部",
+            }), 400
+
+        total = sum(
+            sum(count.values()) if isinstance(count, dict) else count
+            for count in deleted.values()
+        )
+        return jsonify({"success": True, "data": {"deleted": deleted, "total": total}}), 200
+
+    @app.route("/cache/stats", methods=["GET"])
+    def cache_stats():
+        """各命名空間的命中率、延遲、payload 大小，以及記憶體層與上游請求合併統計"""
+        place_cache = google_map_service.place_cache
+        return jsonify({
+            "success": True,
+            "data": {
+                "metrics": cache_metrics.snapshot(),
+                "table": place_cache.table_stats(),
+                "backend": "postgres" if place_cache.use_postgres else "sqlite",
+                "memory": place_cache.memory.stats(),
+                "single_flight": single_flight.stats(),
+            },
+        }), 200
+
+    @app.route("/quota/usage", methods=["GET"])
+    def quota_usage():
+        """各上游 API 的配額設定、目前可用 token，以及本 worker 的取用、排隊與拒絕次數"""
+        return jsonify({"success": True, "data": quota_manager.usage()}), 200
+
+    @app.route("/circuit/status", methods=["GET"])
+    def circuit_status():
+        """各上游 API 斷路器的狀態、視窗內失敗比例與直接拒絕的次數（本 worker）"""
+        return jsonify({"success": True, "data": circuit_breakers.snapshot()}), 200
+
+    @app.route("/metrics", methods=["GET"])
+    def prometheus_metrics():
+        """Prometheus 格式的快取統計"""
+        place_cache = google_map_service.place_cache
+        table = place_cache.table_stats()["namespaces"]
+        memory = place_cache.memory.stats()
+        gauges = {
+            "flyplay_cache_table_rows": (
+                "Rows currently stored in the places table",
+                {namespace: item["rows"] for namespace, item in table.items()},
+            ),
+            "flyplay_cache_table_bytes": (
+                "Bytes currently stored in the places table",
+                {namespace: item["bytes"] for namespace, item in table.items()},
+            ),
+            "flyplay_cache_memory_entries": (
+                "Entries currently held in the in-process memory tier",
+                {namespace: item["entries"] for namespace, item in memory.items()},
+            ),
+        }
+        return Response(
+            cache_metrics.render_prometheus(gauges),
+            content_type="text/plain; version=0.0.4; charset=utf-8",
+        )
+
+    @app.route("/cache/compact", methods=["POST"])
+    def compact_cache():
+        """立即清除過期快取並套用容量上限，回傳回收筆數"""
+        report = cache_maintenance_worker.run_once()
+        if report is None:
+            return jsonify({"success": False, "error": "快取清理失敗"}), 500
+        return jsonify({"success": True, "data": report}), 200
 
     @app.route("/api/itinerary/detail", methods=["POST"])
     def generate_itinerary_detail():
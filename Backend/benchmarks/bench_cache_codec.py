@@ -0,0 +1,120 @@
+"""
+快取 codec benchmark
+
+以 places 表目前的資料（或匯出的 JSON lines）比較各 codec 的儲存大小與編碼／解碼時間。
+json 一列以 UTF-8 後的字串長度計算，其餘為 payload 欄位的 bytes。
+
+用法（在 Backend 目錄下執行）：
+    python -m benchmarks.bench_cache_codec                       # 讀目前設定的快取資料庫
+    python -m benchmarks.bench_cache_codec --db-path data/cache.db
+    python -m benchmarks.bench_cache_codec --dump places.jsonl   # 每行 {"place_id": ..., "result": ...}
+    python -m benchmarks.bench_cache_codec --export places.jsonl # 把目前的資料匯出成 dump
+"""
+import argparse
+import json
+import time
+from collections import defaultdict
+
+from models import cache_codecs
+from models.cache_model import PlaceCache
+from models.cache_namespaces import namespace_of
+
+
+def load_table(cache, limit):
+    """把 places 表的資料解碼成 [(place_id, json 字串)]"""
+    rows = cache._run(
+        'SELECT place_id, result, payload, codec FROM places ORDER BY cached_at DESC LIMIT %s',
+        (limit,),
+        fetch=True
+    )
+    texts = []
+    for place_id, result, payload, codec in rows:
+        text = cache._decode(result, payload, codec)
+        if text is not None:
+            texts.append((place_id, text))
+    return texts
+
+
+def load_dump(path, limit):
+    texts = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if len(texts) >= limit:
+                break
+            line = line.strip()
+            if line:
+                item = json.loads(line)
+                texts.append((item['place_id'], json.dumps(item['result'])))
+    return texts
+
+
+def measure(codec_name, texts, repeat):
+    """回傳 (總大小, 平均編碼微秒, 平均解碼微秒)"""
+    encoded = [cache_codecs.encode(codec_name, text) for text in texts]
+    size = sum(
+        len(result.encode('utf-8')) if payload is None else len(payload)
+        for result, payload, _ in encoded
+    )
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text in texts:
+            cache_codecs.encode(codec_name, text)
+    encode_us = (time.perf_counter() - start) / (repeat * len(texts)) * 1e6
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for result, payload, codec in encoded:
+            json.loads(cache_codecs.decode(result, payload, codec))
+    decode_us = (time.perf_counter() - start) / (repeat * len(texts)) * 1e6
+    return size, encode_us, decode_us
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db-path', default='Backend/data/cache.db', help='沒有 DATABASE_URL 時讀的 SQLite 檔')
+    parser.add_argument('--dump', help='改讀 JSON lines 匯出檔')
+    parser.add_argument('--export', help='把 places 表匯出成 JSON lines 後結束')
+    parser.add_argument('--limit', type=int, default=5000, help='最多讀幾筆')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    if args.dump:
+        texts = load_dump(args.dump, args.limit)
+    else:
+        cache = PlaceCache(db_path=args.db_path)
+        texts = load_table(cache, args.limit)
+        cache.close()
+        if args.export:
+            with open(args.export, 'w', encoding='utf-8') as f:
+                for place_id, text in texts:
+                    f.write(json.dumps({'place_id': place_id, 'result': json.loads(text)}, ensure_ascii=False) + '\n')
+            print(f"匯出 {len(texts)} 筆到 {args.export}")
+            return
+
+    if not texts:
+        print("沒有資料可以測試，請先讓服務跑一段時間或用 --dump 指定匯出檔")
+        return
+
+    by_namespace = defaultdict(list)
+    for place_id, text in texts:
+        by_namespace[namespace_of(place_id)].append(text)
+    by_namespace['(all)'] = [text for _, text in texts]
+
+    codecs = cache_codecs.available_codecs()
+    missing = sorted(set(cache_codecs.CODECS) - set(codecs))
+    print(f"rows={len(texts)} codecs={','.join(codecs)}" + (f" (未安裝: {','.join(missing)})" if missing else ''))
+    for namespace, items in sorted(by_namespace.items()):
+        baseline = None
+        print(f"\n[{namespace}] {len(items)} rows")
+        for codec_name in codecs:
+            size, encode_us, decode_us = measure(codec_name, items, args.repeat)
+            baseline = baseline or size
+            print(
+                f"  {codec_name:>8}: {size:>12,} bytes ({size / baseline:6.1%}) "
+                f"encode={encode_us:8.1f}us decode={decode_us:8.1f}us"
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+"""
+快取 key 正規化的命中率報告
+
+比較舊版（原始字串、完整精度座標）與 services/cache_keys 正規化後的 key，
+在同一份流量下各能命中多少次。
+
+流量來源（擇一）：
+  --traffic calls.jsonl   每行一次呼叫：{"method": "search_places_nearby", "args": {...}}，
+                          args 為 GoogleMapService 對應方法的參數；以無限大、不過期的快取模擬命中率
+  （預設）places 表       以目前資料庫裡的 key 當作已發生過的查詢，
+                          計算正規化後有多少筆會合併成同一個 key（= 可以省下的上游呼叫）
+
+用法（在 Backend 目錄下執行）：
+    python -m benchmarks.bench_cache_keys
+    python -m benchmarks.bench_cache_keys --traffic calls.jsonl
+"""
+import argparse
+import json
+from collections import defaultdict
+
+from models.cache_model import PlaceCache
+from models.cache_namespaces import namespace_of
+from services import cache_keys
+
+
+# 舊版 GoogleMapService 的 key 組法
+LEGACY_KEYS = {
+    'search_places': lambda a: f"search_{a['text_query']}_{a.get('language_code', 'zh-TW')}_{a.get('max_results', 5)}",
+    'search_places_nearby': lambda a: (
+        f"search_nearby_{a['text_query']}_{a['location']['latitude']}_{a['location']['longitude']}_"
+        f"{a.get('max_results', 10)}"
+    ),
+    'get_place_details': lambda a: f"details_{a['place_id']}",
+    'get_place_business_info': lambda a: f"business_{a['place_id']}",
+    'get_distance_and_duration': lambda a: f"distance_{a['origin']}_{a['destination']}_{a.get('mode', 'driving')}",
+    'get_route_details': lambda a: f"route_{a['origin']}_{a['destination']}_{a.get('mode', 'driving')}",
+    'compute_routes': lambda a: (
+        f"routes_v2_{a['origin'].get('latitude')}_{a['origin'].get('longitude')}_"
+        f"{a['destination'].get('latitude')}_{a['destination'].get('longitude')}_{a.get('mode', 'driving').lower()}"
+    ),
+}
+
+CANONICAL_KEYS = {
+    'search_places': lambda a: cache_keys.search_key(
+        a['text_query'], a.get('language_code', 'zh-TW'), a.get('max_results', 5)),
+    'search_places_nearby': lambda a: cache_keys.search_nearby_key(
+        a['text_query'], a['location'], a.get('max_results', 10)),
+    'get_place_details': lambda a: cache_keys.details_key(a['place_id'], a.get('language_code', 'zh-TW')),
+    'get_place_business_info': lambda a: cache_keys.business_key(a['place_id'], a.get('language_code', 'zh-TW')),
+    'get_distance_and_duration': lambda a: cache_keys.distance_key(
+        a['origin'], a['destination'], a.get('mode', 'driving')),
+    'get_route_details': lambda a: cache_keys.route_key(a['origin'], a['destination'], a.get('mode', 'driving')),
+    'compute_routes': lambda a: cache_keys.routes_v2_key(a['origin'], a['destination'], a.get('mode', 'driving')),
+}
+
+
+def canonicalize_stored_key(key):
+    """把資料庫裡舊格式的 key 轉成正規化後的 key；無法解析的原樣回傳"""
+    namespace = namespace_of(key)
+    try:
+        if namespace == 'search_nearby':
+            text, lat, lng, max_results = key[len('search_nearby_'):].rsplit('_', 3)
+            location = {'latitude': float(lat), 'longitude': float(lng)}
+            return cache_keys.search_nearby_key(text, location, max_results)
+        if namespace == 'search':
+            text, language_code, max_results = key[len('search_'):].rsplit('_', 2)
+            return cache_keys.search_key(text, language_code, max_results)
+        if namespace == 'routes_v2':
+            lat1, lng1, lat2, lng2, mode = key[len('routes_v2_'):].split('_')
+            return cache_keys.routes_v2_key(
+                {'latitude': float(lat1), 'longitude': float(lng1)},
+                {'latitude': float(lat2), 'longitude': float(lng2)},
+                mode,
+            )
+        if namespace in ('distance', 'route'):
+            # 起訖點之間也用底線分隔，整段一起正規化（正規化不會改動底線）
+            body, mode = key[len(namespace) + 1:].rsplit('_', 1)
+            return f"{namespace}_{cache_keys.normalize_text(body)}_{cache_keys.normalize_text(mode)}"
+    except ValueError:
+        return key
+    return key
+
+
+def report_traffic(path):
+    seen_raw, seen_canonical = set(), set()
+    stats = defaultdict(lambda: {'requests': 0, 'raw_hits': 0, 'canonical_hits': 0})
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            call = json.loads(line)
+            method, args = call['method'], call.get('args', {})
+            if method not in LEGACY_KEYS:
+                continue
+            raw, canonical = LEGACY_KEYS[method](args), CANONICAL_KEYS[method](args)
+            item = stats[namespace_of(canonical)]
+            item['requests'] += 1
+            item['raw_hits'] += raw in seen_raw
+            item['canonical_hits'] += canonical in seen_canonical
+            seen_raw.add(raw)
+            seen_canonical.add(canonical)
+
+    print(f"{'namespace':>14} {'requests':>9} {'raw hit':>8} {'canonical':>10} {'gain':>7}")
+    totals = {'requests': 0, 'raw_hits': 0, 'canonical_hits': 0}
+    for namespace, item in sorted(stats.items()) + [('(all)', totals)]:
+        if namespace != '(all)':
+            for field in totals:
+                totals[field] += item[field]
+        requests = item['requests'] or 1
+        raw_rate = item['raw_hits'] / requests
+        canonical_rate = item['canonical_hits'] / requests
+        print(f"{namespace:>14} {item['requests']:>9} {raw_rate:>8.1%} {canonical_rate:>10.1%} "
+              f"{canonical_rate - raw_rate:>+7.1%}")
+
+
+def report_table(db_path):
+    cache = PlaceCache(db_path=db_path)
+    keys = [row[0] for row in cache._run('SELECT place_id FROM places', fetch=True)]
+    cache.close()
+    if not keys:
+        print("places 表沒有資料，請改用 --traffic 指定錄下的呼叫紀錄")
+        return
+
+    raw = defaultdict(set)
+    canonical = defaultdict(set)
+    for key in keys:
+        namespace = namespace_of(key)
+        raw[namespace].add(key)
+        canonical[namespace].add(canonicalize_stored_key(key))
+
+    print(f"{'namespace':>14} {'raw keys':>9} {'canonical':>10} {'merged':>8}")
+    total_raw = total_canonical = 0
+    for namespace in sorted(raw):
+        raw_count, canonical_count = len(raw[namespace]), len(canonical[namespace])
+        total_raw += raw_count
+        total_canonical += canonical_count
+        print(f"{namespace:>14} {raw_count:>9} {canonical_count:>10} {1 - canonical_count / raw_count:>8.1%}")
+    print(f"{'(all)':>14} {total_raw:>9} {total_canonical:>10} {1 - total_canonical / total_raw:>8.1%}")
+    print("merged = 正規化後合併掉的 key 比例，也就是這些查詢原本可以直接命中快取")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--traffic', help='JSON lines 呼叫紀錄')
+    parser.add_argument('--db-path', default='Backend/data/cache.db', help='沒有 DATABASE_URL 時讀的 SQLite 檔')
+    args = parser.parse_args()
+    if args.traffic:
+        report_traffic(args.traffic)
+    else:
+        report_table(args.db_path)
+
+
+if __name__ == '__main__':
+    main()
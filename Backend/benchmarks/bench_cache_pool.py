@@ -0,0 +1,112 @@
+"""
+PlaceCache 連線池 benchmark
+
+比較「每次 get 都重新連線」(舊做法)、連線池版本，以及加上記憶體層後的單次查詢延遲。
+以多執行緒模擬 Flask threaded server 同時處理請求。
+
+用法（在 Backend 目錄下執行）：
+    python -m benchmarks.bench_cache_pool --threads 16 --lookups 200
+    DATABASE_URL=postgresql://... python -m benchmarks.bench_cache_pool
+"""
+import argparse
+import json
+import os
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import psycopg2
+
+from models.cache_model import PlaceCache
+
+
+def legacy_get(cache, place_id):
+    """舊版 PlaceCache.get：每次查詢都重新建立連線"""
+    if cache.use_postgres:
+        with psycopg2.connect(cache.database_url) as conn:
+            with conn.cursor() as cursor:
+                cursor.execute('SELECT result, cached_at FROM places WHERE place_id = %s', (place_id,))
+                row = cursor.fetchone()
+        conn.close()
+    else:
+        with sqlite3.connect(cache.db_path) as conn:
+            row = conn.execute('SELECT result, cached_at FROM places WHERE place_id = ?', (place_id,)).fetchone()
+        conn.close()
+    if row and isinstance(row[0], str):
+        return json.loads(row[0])
+    return row[0] if row else None
+
+
+def run(lookup, keys, threads, lookups):
+    latencies = []
+    lock = threading.Lock()
+    barrier = threading.Barrier(threads)
+
+    def worker(offset):
+        local = []
+        barrier.wait()
+        for i in range(lookups):
+            key = keys[(offset + i) % len(keys)]
+            start = time.perf_counter()
+            lookup(key)
+            local.append((time.perf_counter() - start) * 1000)
+        with lock:
+            latencies.extend(local)
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    wall_start = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    wall = time.perf_counter() - wall_start
+
+    latencies.sort()
+    return {
+        'p50_ms': statistics.median(latencies),
+        'p95_ms': latencies[int(len(latencies) * 0.95) - 1],
+        'mean_ms': statistics.fmean(latencies),
+        'lookups_per_sec': len(latencies) / wall,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--lookups', type=int, default=200, help='每個執行緒的查詢次數')
+    parser.add_argument('--keys', type=int, default=500)
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(), 'bench_cache.db')
+    cache = PlaceCache(db_path=db_path, pool_max=max(args.threads, 1))
+    backend = 'postgres' if cache.use_postgres else 'sqlite'
+
+    keys = [f"bench_search_{i}_zh-TW_5" for i in range(args.keys)]
+    sample = {'success': True, 'places': [{'name': 'bench', 'location': {'latitude': 35.0, 'longitude': 139.0}}]}
+    for key in keys:
+        cache.set(key, sample)
+
+    print(f"backend={backend} threads={args.threads} lookups/thread={args.lookups} ({datetime.now().isoformat(timespec='seconds')})")
+    for label, lookup in (
+        ('connect-per-call', lambda key: legacy_get(cache, key)),
+        ('pooled', cache._fetch_row),
+        ('pooled + memory', cache.get),
+    ):
+        stats = run(lookup, keys, args.threads, args.lookups)
+        print(
+            f"{label:>17}: p50={stats['p50_ms']:.3f}ms p95={stats['p95_ms']:.3f}ms "
+            f"mean={stats['mean_ms']:.3f}ms throughput={stats['lookups_per_sec']:.0f}/s"
+        )
+
+    if cache.use_postgres:
+        with cache._pg_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("DELETE FROM places WHERE place_id LIKE 'bench\\_%%'")
+    cache.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,213 @@
+"""
+Google API 共用 HTTP session benchmark
+
+在本機起兩個 HTTPS stub（模擬 places.googleapis.com 與 routes.googleapis.com），
+重播一份 20 個景點行程會發出的請求：每個景點一次 searchText、3 張照片的 media 查詢，
+相鄰景點之間一次 computeRoutes。比較：
+  - legacy：模組層級 requests.get/post，每次都重新做 TCP + TLS 握手
+  - session：services/http_client 的共用 session，keep-alive 重複使用連線
+
+stub 端統計實際建立的連線數；--rtt-ms 模擬到 Google 的網路往返時間
+（每條新連線多 2 個 RTT：TCP + TLS 1.3 握手，每個請求 1 個 RTT）。
+--fail-rate 讓 stub 隨機回 503，觀察 session 的重試能救回多少請求。
+需要 openssl 指令產生自簽憑證；找不到時退回純 HTTP（只比較 TCP 握手）。
+
+用法（在 Backend 目錄下執行）：
+    python -m benchmarks.bench_http_session
+    python -m benchmarks.bench_http_session --stops 20 --threads 4 --rtt-ms 30 --fail-rate 0.05
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import ssl
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from services import http_client
+from services.circuit_breaker import CircuitBreakers
+from services.quota import QuotaManager
+
+
+class StubServer:
+    """回傳固定 JSON 的 HTTP/1.1 stub，記錄連線數與請求數"""
+
+    def __init__(self, name, rtt, fail_rate, ssl_context=None):
+        self.name = name
+        self.connections = 0
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._random = random.Random(42)
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                with stub._lock:
+                    stub.connections += 1
+                time.sleep(2 * rtt)
+
+            def _reply(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                if length:
+                    self.rfile.read(length)
+                time.sleep(rtt)
+                with stub._lock:
+                    stub.requests += 1
+                    failed = stub._random.random() < fail_rate
+                if failed:
+                    status, body = 503, b'{"error": {"status": "UNAVAILABLE"}}'
+                elif self.path.endswith('/media') or '/media?' in self.path:
+                    status, body = 200, b'{"photoUri": "https://lh3.googleusercontent.com/stub"}'
+                elif 'computeRoutes' in self.path:
+                    status, body = 200, b'{"routes": [{"duration": "900s", "distanceMeters": 5200}]}'
+                else:
+                    status, body = 200, json.dumps({'places': [{'id': 'stub', 'displayName': {'text': 'stub'}}]}).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            do_GET = _reply
+            do_POST = _reply
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        if ssl_context:
+            self.server.socket = ssl_context.wrap_socket(self.server.socket, server_side=True)
+        scheme = 'https' if ssl_context else 'http'
+        self.url = f'{scheme}://localhost:{self.server.server_address[1]}'
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def reset(self):
+        with self._lock:
+            self.connections = 0
+            self.requests = 0
+            self._random.seed(42)
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def make_certificate(directory):
+    """用 openssl 產生 localhost 的自簽憑證，沒有 openssl 時回傳 None"""
+    if not shutil.which('openssl'):
+        return None
+    cert, key = os.path.join(directory, 'cert.pem'), os.path.join(directory, 'key.pem')
+    subprocess.run(
+        ['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1',
+         '-keyout', key, '-out', cert, '-subj', '/CN=localhost', '-addext', 'subjectAltName=DNS:localhost'],
+        check=True, capture_output=True
+    )
+    return cert, key
+
+
+def itinerary_calls(stops, places_url, routes_url):
+    """20 個景點的行程：每個景點 searchText + 3 張照片，相鄰景點 computeRoutes"""
+    calls = []
+    for stop in range(stops):
+        calls.append(('POST', f'{places_url}/v1/places:searchText', {'textQuery': f'景點 {stop}'}))
+        for photo in range(3):
+            calls.append(('GET', f'{places_url}/v1/places/stop{stop}/photos/{photo}/media', None))
+        if stop:
+            calls.append(('POST', f'{routes_url}/directions/v2:computeRoutes', {'travelMode': 'DRIVE'}))
+    return calls
+
+
+def run(send, calls, threads):
+    latencies = []
+    failures = 0
+    lock = threading.Lock()
+
+    def one(call):
+        nonlocal failures
+        method, url, payload = call
+        start = time.perf_counter()
+        try:
+            ok = send(method, url, payload).ok
+        except requests.RequestException:
+            ok = False
+        elapsed = (time.perf_counter() - start) * 1000
+        with lock:
+            latencies.append(elapsed)
+            failures += 0 if ok else 1
+
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(one, calls))
+    return (time.perf_counter() - wall_start) * 1000, latencies, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--stops', type=int, default=20)
+    parser.add_argument('--threads', type=int, default=1, help='同時發出請求的執行緒數（DataFixService 的 worker）')
+    parser.add_argument('--rtt-ms', type=float, default=20, help='模擬的網路往返時間')
+    parser.add_argument('--fail-rate', type=float, default=0.0, help='stub 回 503 的比例')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench-http-')
+    cert = make_certificate(workdir)
+    server_context = None
+    if cert:
+        server_context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        server_context.load_cert_chain(*cert)
+    rtt = args.rtt_ms / 1000
+    places = StubServer('places', rtt, args.fail_rate, server_context)
+    routes = StubServer('routes', rtt, args.fail_rate, server_context)
+    verify = cert[0] if cert else True
+    calls = itinerary_calls(args.stops, places.url, routes.url)
+
+    def legacy_send(method, url, payload):
+        return requests.request(method, url, json=payload, verify=verify, timeout=10)
+
+    # 只比較連線重用，不套用上游配額與斷路器（--fail-rate 高時斷路器會打開）
+    session = http_client.build_session(
+        pool_size=max(args.threads, 1),
+        quota_manager=QuotaManager(enabled=False, state_path=''),
+        breakers=CircuitBreakers(enabled=False),
+    )
+
+    def session_send(method, url, payload):
+        return session.request(method, url, json=payload, verify=verify, timeout=http_client.timeout(10))
+
+    print(f"{'HTTPS' if cert else 'HTTP（找不到 openssl，未含 TLS 握手）'}，"
+          f"{args.stops} 個景點共 {len(calls)} 個請求，threads={args.threads}，"
+          f"rtt={args.rtt_ms}ms，fail_rate={args.fail_rate}")
+    print(f"{'模式':<10}{'總時間ms':>10}{'p50 ms':>9}{'p95 ms':>9}{'連線數':>8}{'請求數':>8}{'失敗':>6}")
+    try:
+        for name, send in (('legacy', legacy_send), ('session', session_send)):
+            places.reset()
+            routes.reset()
+            wall, latencies, failures = run(send, calls, args.threads)
+            latencies.sort()
+            print(
+                f"{name:<10}{wall:>10.0f}{statistics.median(latencies):>9.1f}"
+                f"{latencies[int(len(latencies) * 0.95) - 1]:>9.1f}"
+                f"{places.connections + routes.connections:>8}{places.requests + routes.requests:>8}{failures:>6}"
+            )
+    finally:
+        session.close()
+        places.close()
+        routes.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
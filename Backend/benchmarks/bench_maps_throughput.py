@@ -0,0 +1,162 @@
+"""
+GoogleMapService / DataFixService 離線吞吐量 benchmark
+
+在同一個行程裡啟動 benchmarks/fake_google 的替身，GoogleMapService 的 Places / Routes 位址指向它，
+產生 --itineraries 份行程（每份 --days 天 x --stops 個景點，景點名稱取自替身的資料集），
+以 --threads 個執行緒同時處理，每份行程做的事和 /data/latlng 相同：
+DataFixService.enrich_data_with_location，再以 compute_day_legs 算每天相鄰景點的交通時間。
+
+先以空快取跑一次（cold），再用同一個服務跑一次（warm，記憶體層與 SQLite 快取都已填好），
+回報每秒處理的行程數、單份行程 p50 / p95，以及替身收到的各端點請求數。
+配額與斷路器預設關閉，量的是服務本身；加上 --with-guards 改用 config 的設定。
+DATABASE_URL 未設定時快取寫在暫存的 SQLite 檔。
+
+用法（在 Backend 目錄下執行）：
+    python -m benchmarks.bench_maps_throughput
+    python -m benchmarks.bench_maps_throughput --itineraries 40 --threads 8 --latency-ms 80 --jitter-ms 40
+    python -m benchmarks.bench_maps_throughput --error-rate 0.05 --with-guards
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.fake_google import CITIES, WEEKDAYS, FakeGoogleServer
+from config import Config
+from models.cache_model import PlaceCache
+from services import http_client
+from services.circuit_breaker import CircuitBreakers
+from services.data_fix_service import DataFixService
+from services.googlemap_service import GoogleMapService
+from services.quota import QuotaManager
+
+
+def build_itineraries(places, count, days, stops, seed):
+    """從替身的資料集挑景點組成行程，回傳 [(目的地, /data/latlng 的 data)]"""
+    rng = random.Random(seed)
+    by_city = {}
+    for place in places:
+        if 'locality' not in place['types']:
+            city = next(name for name, _, _ in CITIES if place['displayName']['text'].startswith(name))
+            by_city.setdefault(city, []).append(place['displayName']['text'])
+    itineraries = []
+    for _ in range(count):
+        city = rng.choice(sorted(by_city))
+        names = rng.sample(by_city[city], min(days * stops, len(by_city[city])))
+        data = {'data': [
+            {
+                'day': day + 1,
+                'weekday': WEEKDAYS[day % len(WEEKDAYS)],
+                'location': [
+                    {'location_name': name, 'time': f'{9 + n * 2:02d}:00'}
+                    for n, name in enumerate(names[day * stops:(day + 1) * stops])
+                ],
+            }
+            for day in range(days)
+        ]}
+        itineraries.append((city, data))
+    return itineraries
+
+
+def plan(map_service, destination, data):
+    """一份行程：補上座標，再算每天相鄰景點的交通時間；回傳是否全部成功"""
+    data_fix = DataFixService(google_map_service=map_service)
+    result = data_fix.enrich_data_with_location(data, destination)
+    ok = result.get('success', False)
+    for day in result.get('data', []):
+        stops = [
+            {'latitude': loc['location']['latitude'], 'longitude': loc['location']['longitude']}
+            for loc in day.get('locations', [])
+            if (loc.get('location') or {}).get('latitude') is not None
+        ]
+        legs = map_service.compute_day_legs(stops, 'transit')
+        ok = ok and all(leg.get('success') for leg in legs['legs'])
+    return ok
+
+
+def run(map_service, itineraries, threads):
+    latencies = []
+    failures = 0
+    lock = threading.Lock()
+
+    def one(itinerary):
+        nonlocal failures
+        start = time.perf_counter()
+        try:
+            ok = plan(map_service, *itinerary)
+        except Exception:
+            ok = False
+        elapsed = (time.perf_counter() - start) * 1000
+        with lock:
+            latencies.append(elapsed)
+            failures += 0 if ok else 1
+
+    wall_start = time.perf_counter()
+    # DataFixService 每個景點都會 print，量測時丟掉
+    with contextlib.redirect_stdout(io.StringIO()):
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            list(pool.map(one, itineraries))
+    return (time.perf_counter() - wall_start) * 1000, latencies, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--itineraries', type=int, default=20)
+    parser.add_argument('--days', type=int, default=3)
+    parser.add_argument('--stops', type=int, default=5, help='每天的景點數')
+    parser.add_argument('--threads', type=int, default=8, help='同時處理的行程數（Flask 的請求執行緒）')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--places-per-city', type=int, default=60)
+    parser.add_argument('--latency-ms', type=float, default=50, help='替身每個請求的固定延遲')
+    parser.add_argument('--jitter-ms', type=float, default=20, help='替身額外 0~N ms 的隨機延遲')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='替身回傳錯誤的比例')
+    parser.add_argument('--error-status', type=int, default=503)
+    parser.add_argument('--with-guards', action='store_true', help='啟用 config 的配額與斷路器')
+    args = parser.parse_args()
+
+    server = FakeGoogleServer(
+        seed=args.seed, places_per_city=args.places_per_city, latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms, error_rate=args.error_rate, error_status=args.error_status
+    ).start()
+    Config.GOOGLE_PLACES_BASE_URL = server.places_base_url
+    Config.GOOGLE_ROUTES_BASE_URL = server.routes_base_url
+    Config.GOOGLE_MAPS_API_KEY = Config.GOOGLE_MAPS_API_KEY or 'fake-key'
+
+    workdir = tempfile.mkdtemp(prefix='bench-maps-')
+    cache = PlaceCache(db_path=os.path.join(workdir, 'cache.db'))
+    session = http_client.build_session(
+        max(Config.GOOGLE_HTTP_POOL_SIZE, args.threads * 2), Config.GOOGLE_HTTP_MAX_RETRIES,
+        quota_manager=None if args.with_guards else QuotaManager(enabled=False),
+        breakers=None if args.with_guards else CircuitBreakers(enabled=False),
+    )
+    map_service = GoogleMapService(place_cache=cache, http_session=session)
+    itineraries = build_itineraries(server.fake.places, args.itineraries, args.days, args.stops, args.seed)
+
+    print(f"替身 {server.url}：{len(server.fake.places)} 個地點，延遲 {args.latency_ms:g}+0~{args.jitter_ms:g} ms，"
+          f"錯誤率 {args.error_rate:g}；{args.itineraries} 份行程 x {args.days} 天 x {args.stops} 個景點，"
+          f"{args.threads} 個執行緒，配額/斷路器{'啟用' if args.with_guards else '關閉'}")
+    print(f"{'快取':<8}{'總時間ms':>10}{'行程/秒':>9}{'p50 ms':>9}{'p95 ms':>9}{'上游請求':>10}{'失敗':>6}")
+    for label in ('cold', 'warm'):
+        server.reset_stats()
+        wall_ms, latencies, failures = run(map_service, itineraries, args.threads)
+        stats = server.stats()
+        latencies.sort()
+        print(
+            f"{label:<8}{wall_ms:>10.0f}{len(itineraries) / (wall_ms / 1000):>9.2f}"
+            f"{statistics.median(latencies):>9.0f}{latencies[int(len(latencies) * 0.95) - 1]:>9.0f}"
+            f"{stats['total']:>10}{failures:>6}"
+        )
+        print(f"        {json.dumps(stats['requests'], ensure_ascii=False, sort_keys=True)}"
+              + (f" 錯誤 {json.dumps(stats['errors'], sort_keys=True)}" if stats['errors'] else ''))
+    server.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,509 @@
+"""
+本機的 Google Places / Routes API 替身
+
+不需要 API key 與配額就能量測 GoogleMapService、DataFixService 與 /api/maps/* 的吞吐量。
+以固定 seed 產生一份地點資料（幾個城市 x 各類景點，含座標、評分、照片、營業時間、評論），
+實作 GoogleMapService 會用到的端點，回應格式與欄位遮罩（X-Goog-FieldMask）和正式 API 相同：
+  - POST /v1/places:searchText、/v1/places:searchNearby
+  - GET  /v1/places/{id}
+  - GET  /v1/places/{id}/photos/{n}/media（skipHttpRedirect=true 回 JSON，否則 302）
+  - POST /directions/v2:computeRoutes、/distanceMatrix/v2:computeRouteMatrix
+路線時間以直線距離 x 1.3 與各交通方式的平均速度估算；--latency-ms / --jitter-ms 模擬網路與伺服器延遲，
+--error-rate 讓部分請求回 --error-status（預設 503，429 時附 Retry-After）。
+
+用法（在 Backend 目錄下執行）：
+    python -m benchmarks.fake_google --port 8765 --latency-ms 80 --jitter-ms 20
+再以環境變數讓服務指向它：
+    GOOGLE_PLACES_BASE_URL=http://127.0.0.1:8765/v1 GOOGLE_ROUTES_BASE_URL=http://127.0.0.1:8765 python app.py
+benchmark 內可直接 FakeGoogleServer(...).start() 在同一個行程裡啟動。
+"""
+import argparse
+import json
+import math
+import random
+import re
+import threading
+import time
+import unicodedata
+import zlib
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+CITIES = [
+    ('東京', 35.6812, 139.7671),
+    ('大阪', 34.6937, 135.5023),
+    ('京都', 35.0116, 135.7681),
+    ('台北', 25.0330, 121.5654),
+    ('首爾', 37.5665, 126.9780),
+]
+AREAS = ['中央', '北', '南', '東', '西', '新', '港', '山手', '河畔', '駅前', '舊城', '丘上']
+CATEGORIES = [
+    ('tourist_attraction', ['公園', '神社', '寺', '塔', '博物館', '美術館', '水族館', '展望台']),
+    ('restaurant', ['拉麵', '燒肉', '壽司', '咖啡廳', '食堂']),
+    ('shopping_mall', ['商店街', '百貨', '市場']),
+    ('lodging', ['飯店', '旅館']),
+]
+WEEKDAYS = ['星期一', '星期二', '星期三', '星期四', '星期五', '星期六', '星期日']
+# 各交通方式的平均速度（km/h）；大眾運輸另加等車時間
+SPEEDS_KMH = {'DRIVE': 30, 'TRANSIT': 22, 'WALK': 4.5, 'BICYCLE': 15, 'TWO_WHEELER': 28}
+TRANSIT_WAIT_SECONDS = 480
+DETOUR_FACTOR = 1.3
+MAX_WALK_KM = 50
+MATRIX_LIMITS = {'TRANSIT': 100, 'DEFAULT': 625}
+
+
+def _normalize(text):
+    return re.sub(r'\s+', '', unicodedata.normalize('NFKC', str(text or '')).casefold())
+
+
+def _distance_km(lat1, lng1, lat2, lng2):
+    d_lat = math.radians(lat2 - lat1)
+    d_lng = math.radians(lng2 - lng1)
+    a = (
+        math.sin(d_lat / 2) ** 2
+        + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(d_lng / 2) ** 2
+    )
+    return 6371 * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+
+def build_dataset(seed=42, places_per_city=60):
+    """以 seed 產生固定的地點清單；每個城市本身也是一筆 locality，方便用目的地名稱定中心點"""
+    rng = random.Random(seed)
+    places = []
+    for city_index, (city, lat, lng) in enumerate(CITIES):
+        places.append(_place(rng, f'city{city_index}', city, city, lat, lng, ['locality', 'political']))
+        names = set()
+        while len(names) < places_per_city:
+            place_type, suffixes = rng.choice(CATEGORIES)
+            name = f'{city}{rng.choice(AREAS)}{rng.choice(suffixes)}'
+            if name in names:
+                name = f'{name}{len(names) + 1}號店'
+            names.add(name)
+            places.append(_place(
+                rng, f'fake{city_index}x{len(names):04d}', name, city,
+                lat + rng.uniform(-0.12, 0.12), lng + rng.uniform(-0.15, 0.15),
+                [place_type, 'point_of_interest', 'establishment']
+            ))
+    return places
+
+
+def _place(rng, place_id, name, city, lat, lng, types):
+    opens, closes = rng.choice([(9, 17), (10, 20), (11, 22), (8, 18), (0, 24)])
+    hours = '24 小時營業' if (opens, closes) == (0, 24) else f'{opens:02d}:00 – {closes:02d}:00'
+    closed_day = rng.randrange(len(WEEKDAYS) + 3)  # 大約一半的地點有公休日
+    price_level = rng.randrange(5)
+    return {
+        'id': place_id,
+        'displayName': {'text': name, 'languageCode': 'zh-TW'},
+        'formattedAddress': f'{city}{rng.randrange(1, 9)}丁目{rng.randrange(1, 30)}-{rng.randrange(1, 20)}',
+        'location': {'latitude': round(lat, 7), 'longitude': round(lng, 7)},
+        'types': types,
+        'rating': round(rng.uniform(3.0, 5.0), 1),
+        'userRatingCount': rng.randrange(5, 20000),
+        'priceLevel': ['PRICE_LEVEL_FREE', 'PRICE_LEVEL_INEXPENSIVE', 'PRICE_LEVEL_MODERATE',
+                       'PRICE_LEVEL_EXPENSIVE', 'PRICE_LEVEL_VERY_EXPENSIVE'][price_level],
+        'priceRange': {
+            'startPrice': {'currencyCode': 'JPY', 'units': str(500 * (price_level + 1))},
+            'endPrice': {'currencyCode': 'JPY', 'units': str(1500 * (price_level + 1))},
+        },
+        'internationalPhoneNumber': f'+81 3-{rng.randrange(1000, 9999)}-{rng.randrange(1000, 9999)}',
+        'websiteUri': f'https://example.com/{place_id}',
+        'regularOpeningHours': {
+            'openNow': True,
+            'weekdayDescriptions': [
+                f'{day}: {"休息" if i == closed_day else hours}' for i, day in enumerate(WEEKDAYS)
+            ],
+        },
+        'photos': [
+            {'name': f'places/{place_id}/photos/{n}', 'widthPx': 4032, 'heightPx': 3024}
+            for n in range(rng.randrange(1, 6))
+        ],
+        'reviews': [
+            {'rating': rng.randrange(1, 6), 'text': {'text': f'{name}的評論 {n}', 'languageCode': 'zh-TW'}}
+            for n in range(rng.randrange(0, 5))
+        ],
+    }
+
+
+def _apply_mask(place, mask, prefix=''):
+    """依 X-Goog-FieldMask 只保留要求的最上層欄位，未指定時回傳全部"""
+    fields = {
+        field.strip()[len(prefix):].split('.', 1)[0]
+        for field in (mask or '*').split(',')
+        if field.strip().startswith(prefix) or field.strip() == '*'
+    }
+    if '*' in fields or not fields:
+        return dict(place)
+    return {key: value for key, value in place.items() if key in fields}
+
+
+class FakeGoogle:
+    """替身的資料與回應邏輯，不含 HTTP 細節"""
+
+    def __init__(self, seed=42, places_per_city=60):
+        self.places = build_dataset(seed, places_per_city)
+        self.by_id = {place['id']: place for place in self.places}
+        self.by_name = {_normalize(place['displayName']['text']): place for place in self.places}
+
+    # --- Places ---
+    def search_text(self, body, mask):
+        query = _normalize(body.get('textQuery'))
+        limit = min(int(body.get('maxResultCount') or 20), 20)
+        center = ((body.get('locationBias') or {}).get('circle') or {}).get('center')
+        scored = []
+        for place in self.places:
+            score = self._score(query, place)
+            if score > 0:
+                scored.append((-score, self._distance_to(place, center), place['id'], place))
+        scored.sort(key=lambda item: item[:3])
+        places = [item[3] for item in scored[:limit]]
+        if not places and query:
+            places = self._fallback(query, center, limit)
+        return {'places': [_apply_mask(place, mask, 'places.') for place in places]} if places else {}
+
+    def search_nearby(self, body, mask):
+        circle = (body.get('locationRestriction') or {}).get('circle') or {}
+        center = circle.get('center') or {}
+        radius_km = float(circle.get('radius') or 5000) / 1000
+        types = set(body.get('includedTypes') or [])
+        limit = min(int(body.get('maxResultCount') or 20), 20)
+        nearby = sorted(
+            (self._distance_to(place, center), place['id'], place)
+            for place in self.places
+            if not types or types & set(place['types'])
+        )
+        places = [place for distance, _, place in nearby if distance <= radius_km][:limit]
+        return {'places': [_apply_mask(place, mask, 'places.') for place in places]} if places else {}
+
+    def details(self, place_id, mask):
+        place = self.by_id.get(place_id)
+        return _apply_mask(place, mask) if place else None
+
+    def photo(self, place_id, number, query):
+        place = self.by_id.get(place_id)
+        if not place or number >= len(place['photos']):
+            return None
+        height = (query.get('maxHeightPx') or ['400'])[0]
+        return {
+            'name': f'places/{place_id}/photos/{number}',
+            'photoUri': f'https://fake-photos.invalid/{place_id}/{number}?h={height}',
+        }
+
+    def _score(self, query, place):
+        name = _normalize(place['displayName']['text'])
+        if not query:
+            return 0
+        if query == name:
+            return 100
+        if query in name:
+            return 50 + len(query) / len(name)
+        if name in query:
+            # 「東京 公園」不該讓「東京」本身排第一
+            return len(name) / len(query) * 40
+        # 字元 bigram 重疊（地名拼寫略有不同時仍能找到）
+        grams = {query[i:i + 2] for i in range(len(query) - 1)}
+        if not grams:
+            return 0
+        overlap = len(grams & {name[i:i + 2] for i in range(len(name) - 1)}) / len(grams)
+        return overlap * 40 if overlap >= 0.5 else 0
+
+    def _fallback(self, query, center, limit):
+        """查不到名稱時，依查詢字串固定挑出中心點附近的地點，行為與真實 API 一樣「總會回點什麼」"""
+        nearest = sorted(self.places, key=lambda place: (self._distance_to(place, center), place['id']))[:20]
+        offset = zlib.crc32(query.encode('utf-8')) % len(nearest)
+        return (nearest[offset:] + nearest[:offset])[:min(limit, 1)]
+
+    @staticmethod
+    def _distance_to(place, center):
+        if not center or center.get('latitude') is None or center.get('longitude') is None:
+            return 0.0
+        location = place['location']
+        return _distance_km(center['latitude'], center['longitude'], location['latitude'], location['longitude'])
+
+    # --- Routes ---
+    def _waypoint_location(self, waypoint):
+        """{'location': {'latLng': ...}} 或 {'address': 地名}（地名查不到時以雜湊固定到東京附近）"""
+        waypoint = waypoint or {}
+        lat_lng = (waypoint.get('location') or {}).get('latLng')
+        if lat_lng:
+            return lat_lng.get('latitude', 0), lat_lng.get('longitude', 0)
+        address = str(waypoint.get('address', ''))
+        if re.fullmatch(r'\s*-?\d+(\.\d+)?\s*,\s*-?\d+(\.\d+)?\s*', address):
+            lat, lng = address.split(',')
+            return float(lat), float(lng)
+        result = self.search_text({'textQuery': address, 'maxResultCount': 1}, 'places.location')
+        if result.get('places'):
+            location = result['places'][0]['location']
+            return location['latitude'], location['longitude']
+        digest = zlib.crc32(address.encode('utf-8'))
+        return CITIES[0][1] + (digest % 1000 - 500) / 5000, CITIES[0][2] + (digest // 1000 % 1000 - 500) / 5000
+
+    @staticmethod
+    def _leg(origin, destination, travel_mode):
+        """回傳 (秒數, 公尺)，步行超過 MAX_WALK_KM 視為沒有路線"""
+        road_km = _distance_km(*origin, *destination) * DETOUR_FACTOR
+        if travel_mode == 'WALK' and road_km > MAX_WALK_KM:
+            return None
+        seconds = road_km / SPEEDS_KMH.get(travel_mode, SPEEDS_KMH['DRIVE']) * 3600
+        if travel_mode == 'TRANSIT' and road_km > 0:
+            seconds += TRANSIT_WAIT_SECONDS
+        return int(seconds), int(road_km * 1000)
+
+    def compute_routes(self, body):
+        travel_mode = body.get('travelMode') or 'DRIVE'
+        origin = self._waypoint_location(body.get('origin'))
+        destination = self._waypoint_location(body.get('destination'))
+        leg = self._leg(origin, destination, travel_mode)
+        if leg is None:
+            return {}
+        seconds, meters = leg
+        routes = [self._route(seconds, meters, travel_mode)]
+        if body.get('computeAlternativeRoutes'):
+            routes.append(self._route(int(seconds * 1.15), int(meters * 1.1), travel_mode))
+        return {'routes': routes}
+
+    @staticmethod
+    def _route(seconds, meters, travel_mode):
+        if travel_mode == 'TRANSIT':
+            steps = [
+                {'travelMode': 'WALK', 'distanceMeters': 300, 'staticDuration': '240s',
+                 'navigationInstruction': {'instructions': '步行至車站'}},
+                {'travelMode': 'TRANSIT', 'distanceMeters': max(meters - 300, 0),
+                 'staticDuration': f'{max(seconds - 240, 0)}s',
+                 'navigationInstruction': {'instructions': '搭乘地鐵'},
+                 'transitDetails': {
+                     'stopDetails': {'departureStop': {'name': '出發站'}, 'arrivalStop': {'name': '抵達站'}},
+                     'transitLine': {'name': '替身線', 'vehicle': {'type': 'SUBWAY'}},
+                     'stopCount': max(meters // 1200, 1),
+                 }},
+            ]
+        else:
+            steps = [{'travelMode': travel_mode, 'distanceMeters': meters, 'staticDuration': f'{seconds}s',
+                      'navigationInstruction': {'instructions': '往目的地前進'}}]
+        return {
+            'duration': f'{seconds}s',
+            'staticDuration': f'{seconds}s',
+            'distanceMeters': meters,
+            'legs': [{'duration': f'{seconds}s', 'distanceMeters': meters, 'steps': steps}],
+        }
+
+    def compute_route_matrix(self, body):
+        """回傳 (status, 內容)；元素數超過上限時和正式 API 一樣回 400"""
+        travel_mode = body.get('travelMode') or 'DRIVE'
+        origins = [self._waypoint_location(item.get('waypoint')) for item in body.get('origins') or []]
+        destinations = [self._waypoint_location(item.get('waypoint')) for item in body.get('destinations') or []]
+        limit = MATRIX_LIMITS.get(travel_mode, MATRIX_LIMITS['DEFAULT'])
+        if len(origins) * len(destinations) > limit:
+            return 400, _error_body(400, f'元素數超過 {limit}', 'INVALID_ARGUMENT')
+        elements = []
+        for i, origin in enumerate(origins):
+            for j, destination in enumerate(destinations):
+                leg = self._leg(origin, destination, travel_mode)
+                element = {'originIndex': i, 'destinationIndex': j, 'status': {}}
+                if leg is None:
+                    element['condition'] = 'ROUTE_NOT_FOUND'
+                else:
+                    element.update({
+                        'condition': 'ROUTE_EXISTS',
+                        'duration': f'{leg[0]}s',
+                        'staticDuration': f'{leg[0]}s',
+                        'distanceMeters': leg[1],
+                    })
+                elements.append(element)
+        return 200, elements
+
+
+def _error_body(code, message, status):
+    return {'error': {'code': code, 'message': message, 'status': status}}
+
+
+class FakeGoogleServer:
+    """在背景執行緒跑 FakeGoogle 的 HTTP server，記錄各端點的請求數"""
+
+    def __init__(self, host='127.0.0.1', port=0, seed=42, places_per_city=60,
+                 latency_ms=0.0, jitter_ms=0.0, error_rate=0.0, error_status=503):
+        self.fake = FakeGoogle(seed, places_per_city)
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.counts = Counter()
+        self.errors = Counter()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self.url = f'http://{host}:{self.server.server_address[1]}'
+        self.places_base_url = f'{self.url}/v1'
+        self.routes_base_url = self.url
+        self._thread = None
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def _body(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                if not length:
+                    return {}
+                try:
+                    return json.loads(self.rfile.read(length) or b'{}')
+                except ValueError:
+                    return {}
+
+            def _send(self, status, payload, headers=None):
+                body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _handle(self, method):
+                parts = urlsplit(self.path)
+                body = self._body() if method == 'POST' else {}
+                endpoint, status, payload, headers = server.respond(
+                    method, parts.path, parse_qs(parts.query), body, self.headers.get('X-Goog-FieldMask')
+                )
+                server._record(endpoint, status)
+                if status == 302:
+                    self.send_response(302)
+                    self.send_header('Location', payload)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                else:
+                    self._send(status, payload, headers)
+
+            def do_GET(self):
+                self._handle('GET')
+
+            def do_POST(self):
+                self._handle('POST')
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def respond(self, method, path, query, body, mask):
+        """回傳 (端點名稱, status, 內容, 額外標頭)；先套用延遲與錯誤注入"""
+        endpoint = self._endpoint(method, path)
+        delay = self.latency
+        with self._lock:
+            if self.jitter:
+                delay += self._random.uniform(0, self.jitter)
+            failed = endpoint != 'unknown' and self._random.random() < self.error_rate
+        if delay:
+            time.sleep(delay)
+        if failed:
+            headers = {'Retry-After': '1'} if self.error_status == 429 else None
+            return endpoint, self.error_status, _error_body(self.error_status, '替身注入的錯誤', 'UNAVAILABLE'), headers
+
+        fake = self.fake
+        if endpoint == 'searchText':
+            return endpoint, 200, fake.search_text(body, mask), None
+        if endpoint == 'searchNearby':
+            return endpoint, 200, fake.search_nearby(body, mask), None
+        if endpoint == 'computeRoutes':
+            return endpoint, 200, fake.compute_routes(body), None
+        if endpoint == 'computeRouteMatrix':
+            status, payload = fake.compute_route_matrix(body)
+            return endpoint, status, payload, None
+        if endpoint == 'photo':
+            match = re.fullmatch(r'/v1/places/([^/]+)/photos/(\d+)/media', path)
+            photo = fake.photo(match.group(1), int(match.group(2)), query)
+            if photo is None:
+                return endpoint, 404, _error_body(404, '找不到照片', 'NOT_FOUND'), None
+            if (query.get('skipHttpRedirect') or ['false'])[0].lower() == 'true':
+                return endpoint, 200, photo, None
+            return endpoint, 302, photo['photoUri'], None
+        if endpoint == 'details':
+            details = fake.details(path[len('/v1/places/'):], mask)
+            if details is None:
+                return endpoint, 404, _error_body(404, '找不到地點', 'NOT_FOUND'), None
+            return endpoint, 200, details, None
+        return endpoint, 404, _error_body(404, f'未支援的路徑: {method} {path}', 'NOT_FOUND'), None
+
+    @staticmethod
+    def _endpoint(method, path):
+        if method == 'POST' and path == '/v1/places:searchText':
+            return 'searchText'
+        if method == 'POST' and path == '/v1/places:searchNearby':
+            return 'searchNearby'
+        if method == 'POST' and path == '/directions/v2:computeRoutes':
+            return 'computeRoutes'
+        if method == 'POST' and path == '/distanceMatrix/v2:computeRouteMatrix':
+            return 'computeRouteMatrix'
+        if method == 'GET' and re.fullmatch(r'/v1/places/[^/]+/photos/\d+/media', path):
+            return 'photo'
+        if method == 'GET' and re.fullmatch(r'/v1/places/[^/:]+', path):
+            return 'details'
+        return 'unknown'
+
+    def _record(self, endpoint, status):
+        with self._lock:
+            self.counts[endpoint] += 1
+            if status >= 500 or status == 429:
+                self.errors[endpoint] += 1
+
+    def stats(self):
+        with self._lock:
+            return {'requests': dict(self.counts), 'errors': dict(self.errors), 'total': sum(self.counts.values())}
+
+    def reset_stats(self):
+        with self._lock:
+            self.counts.clear()
+            self.errors.clear()
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Google Places / Routes API 本機替身')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--places-per-city', type=int, default=60)
+    parser.add_argument('--latency-ms', type=float, default=0, help='每個請求固定延遲')
+    parser.add_argument('--jitter-ms', type=float, default=0, help='額外 0~N ms 的隨機延遲')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='回傳錯誤的比例')
+    parser.add_argument('--error-status', type=int, default=503, help='注入錯誤的狀態碼（429 附 Retry-After）')
+    args = parser.parse_args()
+
+    server = FakeGoogleServer(
+        args.host, args.port, args.seed, args.places_per_city,
+        args.latency_ms, args.jitter_ms, args.error_rate, args.error_status
+    )
+    print(f"{len(server.fake.places)} 個地點（{'、'.join(city for city, _, _ in CITIES)}），{server.url}")
+    print(f"  GOOGLE_PLACES_BASE_URL={server.places_base_url}")
+    print(f"  GOOGLE_ROUTES_BASE_URL={server.routes_base_url}")
+    try:
+        server.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(json.dumps(server.stats(), ensure_ascii=False))
+        server.server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -8,6 +8,73 @@ class Config:
     GOOGLE_MAPS_API_KEY = os.getenv('GOOGLE_MAPS_API_KEY')
     GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
     DATABASE_URL = os.getenv('DATABASE_URL')
+
+    # Google API 的位址，benchmark 時可指向 benchmarks/fake_google 的本機替身
+    GOOGLE_PLACES_BASE_URL = os.getenv('GOOGLE_PLACES_BASE_URL', 'https://places.googleapis.com/v1')
+    GOOGLE_ROUTES_BASE_URL = os.getenv('GOOGLE_ROUTES_BASE_URL', 'https://routes.googleapis.com')
+
+    # PlaceCache 連線池
+    CACHE_POOL_MIN = int(os.getenv('CACHE_POOL_MIN', 2))  # 常駐的閒置連線數
+    CACHE_POOL_MAX = int(os.getenv('CACHE_POOL_MAX', 10))  # 同時借出的連線上限
+    CACHE_POOL_TIMEOUT = float(os.getenv('CACHE_POOL_TIMEOUT', 5))  # 等待可用連線的秒數
+    CACHE_POOL_HEALTHCHECK_SECONDS = int(os.getenv('CACHE_POOL_HEALTHCHECK_SECONDS', 30))  # 閒置超過此秒數借出前先 SELECT 1
+
+    # PlaceCache 過期與容量（上限設為 0 表示不限制）
+    CACHE_EXPIRE_DAYS = int(os.getenv('CACHE_EXPIRE_DAYS', 7))
+    CACHE_MAX_ROWS = int(os.getenv('CACHE_MAX_ROWS', 0))
+    CACHE_MAX_BYTES = int(os.getenv('CACHE_MAX_BYTES', 0))
+    CACHE_PURGE_INTERVAL_SECONDS = int(os.getenv('CACHE_PURGE_INTERVAL_SECONDS', 3600))  # 背景清理間隔，0 表示不啟動
+
+    # stale-while-revalidate：過期不久的快取先回傳，背景重新抓取
+    CACHE_STALE_WHILE_REVALIDATE = os.getenv('CACHE_STALE_WHILE_REVALIDATE', 'True').lower() == 'true'
+    CACHE_REFRESH_WORKERS = int(os.getenv('CACHE_REFRESH_WORKERS', 4))
+    CACHE_NEGATIVE_TTL_SECONDS = int(os.getenv('CACHE_NEGATIVE_TTL_SECONDS', 6 * 3600))  # 查無結果的快取秒數
+
+    # PlaceCache 記憶體層（設為 0 即停用）
+    CACHE_MEMORY_MAX_ENTRIES = int(os.getenv('CACHE_MEMORY_MAX_ENTRIES', 1024))  # 每個命名空間的預設筆數上限
+    CACHE_MEMORY_TTL_SECONDS = int(os.getenv('CACHE_MEMORY_TTL_SECONDS', 600))  # 記憶體層最長保留秒數
+
+    # 大型結果（搜尋、詳情）寫入資料庫時使用的 codec：zlib / zstd / msgpack / json
+    CACHE_PAYLOAD_CODEC = os.getenv('CACHE_PAYLOAD_CODEC', 'zlib')
+
+    # 快取 key 的座標以 geohash 量化：7 碼約 150m，8 碼約 40m
+    CACHE_KEY_GEOHASH_PRECISION = int(os.getenv('CACHE_KEY_GEOHASH_PRECISION', 7))
+    CACHE_ROUTE_GEOHASH_PRECISION = int(os.getenv('CACHE_ROUTE_GEOHASH_PRECISION', 8))
+
+    # 呼叫 Google API 的共用連線池與重試（等待秒數 = backoff_factor * 2^(n-1) + 0~jitter 秒）
+    GOOGLE_HTTP_POOL_SIZE = int(os.getenv('GOOGLE_HTTP_POOL_SIZE', 16))  # 每個 host 保留的 keep-alive 連線數
+    GOOGLE_HTTP_MAX_RETRIES = int(os.getenv('GOOGLE_HTTP_MAX_RETRIES', 3))
+    GOOGLE_HTTP_BACKOFF_FACTOR = float(os.getenv('GOOGLE_HTTP_BACKOFF_FACTOR', 0.5))
+    GOOGLE_HTTP_BACKOFF_JITTER = float(os.getenv('GOOGLE_HTTP_BACKOFF_JITTER', 0.5))
+    GOOGLE_HTTP_BACKOFF_MAX = float(os.getenv('GOOGLE_HTTP_BACKOFF_MAX', 8))
+    GOOGLE_HTTP_CONNECT_TIMEOUT = float(os.getenv('GOOGLE_HTTP_CONNECT_TIMEOUT', 3.05))
+    GOOGLE_ASYNC_CONCURRENCY = int(os.getenv('GOOGLE_ASYNC_CONCURRENCY', 16))  # AsyncGoogleMapService 同時進行的查詢數
+    PHOTO_RESOLVE_WORKERS = int(os.getenv('PHOTO_RESOLVE_WORKERS', 16))  # 搜尋結果照片 URL 同時解析的數量
+    PHOTO_RESOLVE_DEADLINE_SECONDS = float(os.getenv('PHOTO_RESOLVE_DEADLINE_SECONDS', 3))  # 單次搜尋等待照片的上限
+    PHOTO_BATCH_MAX_NAMES = int(os.getenv('PHOTO_BATCH_MAX_NAMES', 100))  # /api/maps/photos 單次最多照片數
+    ROUTE_MATRIX_MAX_ELEMENTS = int(os.getenv('ROUTE_MATRIX_MAX_ELEMENTS', 100))  # /api/maps/route_matrix 起點數 x 終點數上限
+    MAPS_BATCH_MAX_CALLS = int(os.getenv('MAPS_BATCH_MAX_CALLS', 50))  # /api/maps/batch 單次最多查詢數
+
+    # 上游 API 請求配額（token bucket，見 services/quota.py）
+    QUOTA_ENABLED = os.getenv('QUOTA_ENABLED', 'True').lower() == 'true'
+    QUOTA_STATE_PATH = os.getenv('QUOTA_STATE_PATH', 'Backend/data/quota.db')  # 多個 worker 共用的狀態檔，空字串表示只在行程內共用
+    QUOTA_PLACES_QPS = float(os.getenv('QUOTA_PLACES_QPS', 10))  # searchText、searchNearby、details 各自的每秒請求數
+    QUOTA_PHOTO_QPS = float(os.getenv('QUOTA_PHOTO_QPS', 10))
+    QUOTA_ROUTES_QPS = float(os.getenv('QUOTA_ROUTES_QPS', 50))  # computeRoutes、computeRouteMatrix 各自的每秒請求數
+    QUOTA_GEMINI_RPM = float(os.getenv('QUOTA_GEMINI_RPM', 60))  # Gemini 每分鐘生成次數
+    QUOTA_BURST_SECONDS = float(os.getenv('QUOTA_BURST_SECONDS', 2))  # bucket 容量 = 每秒請求數 x 此秒數
+    QUOTA_MAX_WAIT_SECONDS = float(os.getenv('QUOTA_MAX_WAIT_SECONDS', 2))  # Google 請求最多排隊秒數，超過回 QUOTA_EXCEEDED
+    QUOTA_GEMINI_MAX_WAIT_SECONDS = float(os.getenv('QUOTA_GEMINI_MAX_WAIT_SECONDS', 10))
+
+    # 上游 API 斷路器（見 services/circuit_breaker.py）
+    CIRCUIT_BREAKER_ENABLED = os.getenv('CIRCUIT_BREAKER_ENABLED', 'True').lower() == 'true'
+    CIRCUIT_FAILURE_RATE = float(os.getenv('CIRCUIT_FAILURE_RATE', 0.5))  # 視窗內失敗比例達到此值就打開
+    CIRCUIT_MIN_REQUESTS = int(os.getenv('CIRCUIT_MIN_REQUESTS', 10))  # 視窗內至少幾次呼叫才判斷
+    CIRCUIT_WINDOW_SECONDS = float(os.getenv('CIRCUIT_WINDOW_SECONDS', 30))
+    CIRCUIT_OPEN_SECONDS = float(os.getenv('CIRCUIT_OPEN_SECONDS', 15))  # 打開後多久放行試探請求
+    CIRCUIT_HALF_OPEN_PROBES = int(os.getenv('CIRCUIT_HALF_OPEN_PROBES', 1))
+    CIRCUIT_GEMINI_MIN_REQUESTS = int(os.getenv('CIRCUIT_GEMINI_MIN_REQUESTS', 3))
+    CIRCUIT_GEMINI_WINDOW_SECONDS = float(os.getenv('CIRCUIT_GEMINI_WINDOW_SECONDS', 120))
     
     # Flask 配置
     SECRET_KEY = os.getenv('SECRET_KEY', 'your-secret-key')
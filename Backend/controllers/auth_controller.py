@@ -1,8 +1,8 @@
-from services.auth_service import AuthService
+from services import registry
 
 class AuthController:
-    def __init__(self):
-        self.auth_service = AuthService()
+    def __init__(self, auth_service=None):
+        self.auth_service = auth_service or registry.auth_service()
 
     def login(self, email, password):
         if not email or not password:
@@ -1,5 +1,4 @@
-from services.gemini_service import GeminiService
-from services.travel_service import TravelService
+from services import registry
 import asyncio
 import json
 import nest_asyncio
@@ -8,9 +7,9 @@ import nest_asyncio
 nest_asyncio.apply()
 
 class ChatController:
-    def __init__(self):
-        self.chat_service = GeminiService()
-        self.travel_service = TravelService()
+    def __init__(self, chat_service=None, travel_service=None):
+        self.chat_service = chat_service or registry.gemini_service()
+        self.travel_service = travel_service or registry.travel_service()
 
     def handle_chat_message(
         self,
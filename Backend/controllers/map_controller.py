@@ -1,12 +1,14 @@
-from services.googlemap_service import GoogleMapService
+from config import Config
+from services import registry, place_profiles
 from typing import Dict, Optional, List
 
 class MapController:
-    def __init__(self):
-        self.map_service = GoogleMapService()
+    def __init__(self, map_service=None, async_map_service=None):
+        self.map_service = map_service or registry.google_map_service()
+        self.async_map_service = async_map_service or registry.async_google_map_service()
     
     def handle_text_search(self, text_query: str, language_code: str = "zh-TW", 
-                          max_results: int = 5):
+                          max_results: int = 5, resolve_photos: bool = True, profile: Optional[str] = None):
         if not text_query or not text_query.strip():
             return {
                 'success': False,
@@ -20,11 +22,18 @@ class MapController:
                 'error': '結果數量必須在1-20之間',
                 'code': 'INVALID_INPUT'
             }
+
+        if profile is not None and not place_profiles.is_valid(profile):
+            return self._invalid_profile()
+        if not isinstance(resolve_photos, bool):
+            return self._invalid_resolve_photos()
         
         result = self.map_service.search_places(
             text_query=text_query.strip(),
             language_code=language_code,
-            max_results=max_results
+            max_results=max_results,
+            resolve_photos=resolve_photos,
+            profile=profile or self.map_service.SEARCH_DEFAULT_PROFILE
         )
         
         if result['success']:
@@ -43,7 +52,8 @@ class MapController:
                 'error_type': result.get('error_type', 'UNKNOWN_ERROR')
             }
             
-    def handle_text_search_nearby(self, text_query: str, location: Dict, radius: int = 5000, language_code: str = "zh-TW", max_results: int = 10):
+    def handle_text_search_nearby(self, text_query: str, location: Dict, radius: int = 5000, language_code: str = "zh-TW", max_results: int = 10,
+                                  resolve_photos: bool = True, profile: Optional[str] = None):
             if not text_query or not text_query.strip():
                 return {
                     'success': False,
@@ -74,12 +84,18 @@ class MapController:
                     'error': '結果數量必須在1-20之間',
                     'code': 'INVALID_INPUT'
                 }
+            if profile is not None and not place_profiles.is_valid(profile):
+                return self._invalid_profile()
+            if not isinstance(resolve_photos, bool):
+                return self._invalid_resolve_photos()
             result = self.map_service.search_places_nearby(
                 text_query=text_query.strip(),
                 location=location,
                 radius=radius,
                 language_code=language_code,
-                max_results=max_results
+                max_results=max_results,
+                resolve_photos=resolve_photos,
+                profile=profile or self.map_service.NEARBY_DEFAULT_PROFILE
             )
             if result['success']:
                 return {
@@ -99,15 +115,37 @@ class MapController:
                     'error_type': result.get('error_type', 'UNKNOWN_ERROR')
                 }
     
-    def handle_place_details(self, place_id: str):
+    @staticmethod
+    def _invalid_profile():
+        return {
+            'success': False,
+            'error': f"profile 必須是 {'、'.join(place_profiles.PROFILES)} 之一",
+            'code': 'INVALID_INPUT'
+        }
+
+    @staticmethod
+    def _invalid_resolve_photos():
+        # "false" 之類的字串是 truthy，不接受，避免默默去解析照片
+        return {
+            'success': False,
+            'error': 'resolvePhotos 必須是 true 或 false',
+            'code': 'INVALID_INPUT'
+        }
+
+    def handle_place_details(self, place_id: str, profile: Optional[str] = None):
         if not place_id or not place_id.strip():
             return {
                 'success': False,
                 'error': '地點ID不能為空',
                 'code': 'INVALID_INPUT'
             }
+
+        if profile is not None and not place_profiles.is_valid(profile):
+            return self._invalid_profile()
         
-        result = self.map_service.get_place_details(place_id=place_id.strip())
+        result = self.map_service.get_place_details(
+            place_id.strip(), profile=profile or self.map_service.DETAILS_DEFAULT_PROFILE
+        )
         
         if result['success']:
             return {
@@ -274,4 +312,115 @@ class MapController:
             return {
                 'success': False,
                 'error': result.get('error', '查詢失敗')
-            }
\ No newline at end of file
+            }
+
+    def handle_batch(self, calls: List[Dict]):
+        """
+        一次執行多個查詢（search_places、search_places_nearby、get_place_details、
+        compute_routes、resolve_photo_url），結果與 calls 順序對齊。
+        """
+        if not isinstance(calls, list) or not calls:
+            return {
+                'success': False,
+                'error': '必須提供查詢清單',
+                'code': 'INVALID_INPUT'
+            }
+        if len(calls) > Config.MAPS_BATCH_MAX_CALLS:
+            return {
+                'success': False,
+                'error': f'單次最多 {Config.MAPS_BATCH_MAX_CALLS} 個查詢',
+                'code': 'INVALID_INPUT'
+            }
+        if not all(isinstance(call, dict) for call in calls):
+            return {
+                'success': False,
+                'error': '每個查詢必須包含method與args',
+                'code': 'INVALID_INPUT'
+            }
+
+        results = self.async_map_service.run_many(calls)
+        return {
+            'success': True,
+            'data': {
+                'results': results,
+                'total': len(results)
+            }
+        }
+
+    def handle_photo_urls(self, photo_names: List[str], max_height: int = 400):
+        """批次把照片 name 轉成 CDN URL，給前端只載入實際顯示的卡片圖片"""
+        if not isinstance(photo_names, list) or not photo_names:
+            return {
+                'success': False,
+                'error': '必須提供照片名稱清單',
+                'code': 'INVALID_INPUT'
+            }
+        if len(photo_names) > Config.PHOTO_BATCH_MAX_NAMES:
+            return {
+                'success': False,
+                'error': f'單次最多 {Config.PHOTO_BATCH_MAX_NAMES} 張照片',
+                'code': 'INVALID_INPUT'
+            }
+        if not isinstance(max_height, int) or max_height < 1 or max_height > 4800:
+            return {
+                'success': False,
+                'error': '圖片高度必須在1-4800之間',
+                'code': 'INVALID_INPUT'
+            }
+
+        result = self.map_service.resolve_photo_urls(photo_names, max_height)
+        return {
+            'success': True,
+            'data': {
+                'photos': result['photos'],
+                'unresolved': result['unresolved']
+            }
+        }
+
+    def handle_route_matrix(self, origins: List, destinations: Optional[List] = None, mode: str = 'driving'):
+        """
+        多個起點到多個終點的交通時間，一次呼叫 Routes API。
+        起終點可以是 {'latitude', 'longitude'} 或地名；destinations 省略時為 origins 兩兩之間。
+        """
+        if destinations is None:
+            destinations = origins
+        if not isinstance(origins, list) or not origins or not isinstance(destinations, list) or not destinations:
+            return {
+                'success': False,
+                'error': '必須提供起點與終點清單',
+                'code': 'INVALID_INPUT'
+            }
+        for waypoint in origins + destinations:
+            valid = (
+                (isinstance(waypoint, str) and waypoint.strip())
+                or (isinstance(waypoint, dict) and 'latitude' in waypoint and 'longitude' in waypoint)
+            )
+            if not valid:
+                return {
+                    'success': False,
+                    'error': '起終點必須是地名或包含latitude和longitude',
+                    'code': 'INVALID_INPUT'
+                }
+        if len(origins) * len(destinations) > Config.ROUTE_MATRIX_MAX_ELEMENTS:
+            return {
+                'success': False,
+                'error': f'起點數 x 終點數不能超過 {Config.ROUTE_MATRIX_MAX_ELEMENTS}',
+                'code': 'INVALID_INPUT'
+            }
+        if mode not in ('driving', 'transit', 'walking'):
+            return {
+                'success': False,
+                'error': 'mode 必須是 driving、transit 或 walking',
+                'code': 'INVALID_INPUT'
+            }
+
+        result = self.map_service.compute_route_matrix(origins, destinations, mode)
+        return {
+            'success': True,
+            'data': {
+                'rows': result['rows'],
+                'mode': result['mode'],
+                'origins': origins,
+                'destinations': destinations
+            }
+        }
@@ -1,11 +1,10 @@
-from services.travel_service import TravelService
-from services.gemini_service import GeminiService
+from services import registry
 
 
 class TravelController:
-    def __init__(self):
-        self.travel_service = TravelService()
-        self.gemini_service = GeminiService()
+    def __init__(self, travel_service=None, gemini_service=None):
+        self.travel_service = travel_service or registry.travel_service()
+        self.gemini_service = gemini_service or registry.gemini_service()
 
     def create_project(self, user_id, title):
         return {
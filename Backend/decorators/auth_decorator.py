@@ -1,8 +1,6 @@
 from functools import wraps
 from flask import request, jsonify
-from services.auth_service import AuthService
-
-auth_service = AuthService()
+from services import registry
 
 def login_required(f):
     @wraps(f)
@@ -11,7 +9,7 @@ def login_required(f):
         if not auth.startswith("Bearer "):
             return jsonify({"code": 401, "message": "缺少授權", "data": None}), 401
         token = auth.split(" ", 1)[1]
-        user = auth_service.verify_token(token)
+        user = registry.auth_service().verify_token(token)
         if not user:
             return jsonify({"code": 401, "message": "權杖失效", "data": None}), 401
         request.user = user
@@ -0,0 +1,44 @@
+"""
+把 places 快取表的既有資料改用各命名空間目前設定的 codec 保存
+
+用法（在 Backend 目錄下執行）：
+    python migrate_cache_codec.py                      # 全部命名空間
+    python migrate_cache_codec.py search details       # 只處理指定命名空間
+"""
+import sys
+
+from models import cache_codecs
+from models.cache_model import PlaceCache
+from models.cache_namespaces import POLICIES_BY_NAME
+
+
+def migrate(namespaces=None):
+    cache = PlaceCache()
+    backend = 'postgres' if cache.use_postgres else f'sqlite ({cache.db_path})'
+    print(f"🔧 快取 codec 遷移：{backend}，可用 codec：{', '.join(cache_codecs.available_codecs())}")
+    for name in namespaces or POLICIES_BY_NAME:
+        policy = POLICIES_BY_NAME[name]
+        target = cache_codecs.resolve_codec(policy.codec)
+        if target != policy.codec:
+            print(f"⚠️ {name}: {policy.codec} 無法使用，改用 {target}")
+
+    before = cache.table_stats()
+    report = cache.recode(namespaces)
+    after = cache.table_stats()
+
+    if not report:
+        print("✅ 所有資料的 codec 都已符合設定")
+    for name, item in report.items():
+        print(f"✅ {name}: 重新編碼 {item['recoded']} 筆為 {item['codec']}"
+              + (f"，{item['skipped']} 筆無法解碼已略過" if item['skipped'] else ''))
+    print(f"📦 資料大小：{before['bytes']:,} → {after['bytes']:,} bytes")
+    cache.close()
+
+
+if __name__ == '__main__':
+    names = sys.argv[1:]
+    unknown = [name for name in names if name not in POLICIES_BY_NAME]
+    if unknown:
+        print(f"❌ 未知的命名空間：{', '.join(unknown)}（可用：{', '.join(POLICIES_BY_NAME)}）")
+        sys.exit(1)
+    migrate(names or None)
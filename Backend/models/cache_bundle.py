@@ -0,0 +1,70 @@
+"""
+PlaceCache 的可攜式快照（bundle）
+
+格式為 gzip 壓縮的 JSON lines：第一行是檔頭，之後每行一筆
+{"key": ..., "cached_at": ..., "result": ...}。
+result 一律以原始 JSON 保存，和資料庫使用哪種 codec 無關，匯入時依目標環境的命名空間策略重新編碼。
+cached_at 會原樣保留，匯入後的資料照常從原本的寫入時間計算 TTL。
+"""
+import gzip
+import json
+from datetime import datetime
+
+from models.cache_namespaces import namespace_of
+
+BUNDLE_FORMAT = 'flyplay-place-cache'
+BUNDLE_VERSION = 1
+
+
+def export_bundle(place_cache, path, namespaces=None):
+    """把快取寫成 bundle，回傳 {'entries': 筆數, 'namespaces': {namespace: 筆數}}"""
+    counts = {}
+    with gzip.open(path, 'wt', encoding='utf-8') as f:
+        header = {
+            'format': BUNDLE_FORMAT,
+            'version': BUNDLE_VERSION,
+            'exported_at': datetime.utcnow().isoformat(),
+            'namespaces': sorted(namespaces) if namespaces else None,
+        }
+        f.write(json.dumps(header) + '\n')
+        for key, result, cached_at in place_cache.iter_entries(namespaces):
+            f.write(json.dumps(
+                {'key': key, 'cached_at': cached_at.isoformat(), 'result': result},
+                ensure_ascii=False
+            ) + '\n')
+            namespace = namespace_of(key)
+            counts[namespace] = counts.get(namespace, 0) + 1
+    return {'entries': sum(counts.values()), 'namespaces': counts}
+
+
+def import_bundle(place_cache, path, overwrite=False, namespaces=None):
+    """
+    匯入 bundle，回傳 {'entries': 寫入筆數, 'expired': 已過期略過的筆數}。
+    overwrite=False 時資料庫裡比較新的資料會保留。
+    """
+    now = datetime.utcnow()
+    skipped = {'expired': 0}
+
+    def entries(f):
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            item = json.loads(line)
+            key = item['key']
+            if namespaces and namespace_of(key) not in namespaces:
+                continue
+            cached_at = datetime.fromisoformat(item['cached_at'])
+            if not place_cache.is_importable(key, cached_at, now):
+                skipped['expired'] += 1
+                continue
+            yield key, item['result'], cached_at
+
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        header = json.loads(f.readline() or '{}')
+        if header.get('format') != BUNDLE_FORMAT:
+            raise ValueError(f'不是快取 bundle 檔案: {path}')
+        if header.get('version', 0) > BUNDLE_VERSION:
+            raise ValueError(f"bundle 版本 {header.get('version')} 比目前支援的 {BUNDLE_VERSION} 新")
+        written = place_cache.load_entries(entries(f), overwrite=overwrite)
+    return {'entries': written, 'expired': skipped['expired']}
@@ -0,0 +1,135 @@
+"""
+快取 payload 編碼
+
+PlaceCache 以 JSON 字串在各層之間傳遞快取值，寫入資料庫前依命名空間選一個 codec：
+  - json：直接存進 result 欄位（Postgres 為 JSONB，可以在 SQL 裡查詢內容）
+  - zlib：JSON 壓縮後存進 payload 欄位，標準函式庫內建
+  - zstd：JSON 以 zstandard 壓縮，需要安裝 zstandard 套件
+  - msgpack：以 MessagePack 二進位格式保存，需要安裝 msgpack 套件
+
+選用的套件沒有安裝時，寫入改用 zlib；讀到無法解碼的列視為未命中。
+"""
+import json
+import zlib
+from abc import ABC, abstractmethod
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+JSON_CODEC = 'json'
+FALLBACK_CODEC = 'zlib'
+
+
+class CacheCodec(ABC):
+    """
+    把 JSON 字串編成 bytes 存進 payload 欄位，讀取時再還原。
+    encode / decode 為抽象方法，少實作一個的 codec 在註冊（建立實例）時就會失敗。
+    """
+
+    name = None
+
+    @property
+    def available(self):
+        return True
+
+    @abstractmethod
+    def encode(self, text):
+        """JSON 字串 -> bytes"""
+
+    @abstractmethod
+    def decode(self, data):
+        """bytes -> JSON 字串"""
+
+
+class ZlibCodec(CacheCodec):
+    name = 'zlib'
+
+    def __init__(self, level=6):
+        self.level = level
+
+    def encode(self, text):
+        return zlib.compress(text.encode('utf-8'), self.level)
+
+    def decode(self, data):
+        return zlib.decompress(data).decode('utf-8')
+
+
+class ZstdCodec(CacheCodec):
+    name = 'zstd'
+
+    def __init__(self, level=3):
+        self.level = level
+
+    @property
+    def available(self):
+        return zstandard is not None
+
+    def encode(self, text):
+        # ZstdCompressor 不是 thread-safe，每次建立新的成本很低
+        return zstandard.ZstdCompressor(level=self.level).compress(text.encode('utf-8'))
+
+    def decode(self, data):
+        return zstandard.ZstdDecompressor().decompress(data).decode('utf-8')
+
+
+class MsgpackCodec(CacheCodec):
+    name = 'msgpack'
+
+    @property
+    def available(self):
+        return msgpack is not None
+
+    def encode(self, text):
+        return msgpack.packb(json.loads(text), use_bin_type=True)
+
+    def decode(self, data):
+        return json.dumps(msgpack.unpackb(data, raw=False))
+
+
+CODECS = {codec.name: codec for codec in (ZlibCodec(), ZstdCodec(), MsgpackCodec())}
+
+
+def available_codecs():
+    """目前環境可用的 codec 名稱（含 json）"""
+    return [JSON_CODEC] + [name for name, codec in CODECS.items() if codec.available]
+
+
+def resolve_codec(name):
+    """
+    回傳實際用來寫入的 codec 名稱：json 原樣回傳，未安裝或不認得的 codec 改用 zlib
+    """
+    if not name or name == JSON_CODEC:
+        return JSON_CODEC
+    codec = CODECS.get(name)
+    if codec is None or not codec.available:
+        return FALLBACK_CODEC
+    return name
+
+
+def encode(codec_name, text):
+    """依 codec 編碼，回傳 (result 欄位, payload 欄位, codec 欄位)"""
+    codec_name = resolve_codec(codec_name)
+    if codec_name == JSON_CODEC:
+        return text, None, None
+    return 'null', CODECS[codec_name].encode(text), codec_name
+
+
+def decode(result, payload, codec_name):
+    """
+    把資料庫的欄位還原成 JSON 字串；codec 為 NULL 的舊資料直接讀 result 欄位。
+    codec 無法使用（套件未安裝）時丟出 LookupError。
+    """
+    if not codec_name or codec_name == JSON_CODEC:
+        return result if isinstance(result, str) else json.dumps(result)
+    codec = CODECS.get(codec_name)
+    if codec is None or not codec.available:
+        raise LookupError(f'快取 codec 無法使用: {codec_name}')
+    return codec.decode(bytes(payload))
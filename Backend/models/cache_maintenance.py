@@ -0,0 +1,38 @@
+import threading
+import traceback
+
+
+class CacheMaintenanceWorker(threading.Thread):
+    """背景執行緒，定期呼叫 PlaceCache.compact() 清掉過期資料並套用容量上限"""
+
+    def __init__(self, place_cache, interval_seconds=3600, place_index=None):
+        super().__init__(name='place-cache-maintenance', daemon=True)
+        self.place_cache = place_cache
+        self.place_index = place_index
+        self.interval_seconds = interval_seconds
+        self.last_report = None
+        self._stop_event = threading.Event()
+
+    def run(self):
+        # 先等一個間隔再清，避免和啟動時的建表搶資料庫
+        while not self._stop_event.wait(self.interval_seconds):
+            self.run_once()
+
+    def run_once(self):
+        """清理一次並回傳這次的報告；失敗時回傳 None（不拿上一次的報告充數）"""
+        try:
+            report = self.place_cache.compact()
+            if self.place_index is not None:
+                report['index_expired'] = self.place_index.purge_expired()
+        except Exception as error:
+            print(f"[cache] 背景清理失敗: {error}")
+            print(traceback.format_exc())
+            return None
+        self.last_report = report
+        if report['reclaimed']:
+            print(f"[cache] 回收 {report['reclaimed']} 筆快取 "
+                  f"(過期 {report['expired']}、淘汰 {report['evicted']})")
+        return report
+
+    def stop(self):
+        self._stop_event.set()
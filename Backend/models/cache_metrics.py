@@ -0,0 +1,218 @@
+"""
+快取與上游 API 的統計
+
+PlaceCache 記錄每次查詢的結果（記憶體命中、資料庫命中、stale、未命中）與讀寫的 payload 大小；
+GoogleMapService 記錄每個快取 key 的最終處理方式與實際呼叫 Google API 的延遲。
+所有數字依 key 命名空間分開累計，提供 JSON 快照與 Prometheus 文字格式兩種輸出。
+"""
+import threading
+import time
+
+# 延遲分布的區間上限（秒），與 Prometheus histogram 的 le 標籤一致
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# PlaceCache 查詢結果
+MEMORY_HIT = 'memory_hit'
+DB_HIT = 'db_hit'
+STALE_HIT = 'stale'
+MISS = 'miss'
+
+# GoogleMapService._cached 的處理方式
+HIT = 'hit'
+NEGATIVE_HIT = 'negative_hit'
+INDEX_HIT = 'index_hit'  # key 未命中，但由 PlaceIndex 的已知地點回答
+
+
+class _Histogram:
+    def __init__(self):
+        self.counts = [0] * len(LATENCY_BUCKETS)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                self.counts[i] += 1
+                break
+
+    def quantile(self, q):
+        """以區間上限估計分位數"""
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS, self.counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return self.max
+
+    def snapshot(self):
+        if not self.count:
+            return {'count': 0}
+        p50, p95 = self.quantile(0.5), self.quantile(0.95)
+        return {
+            'count': self.count,
+            'mean_ms': round(self.total / self.count * 1000, 2),
+            'p50_ms_le': round(p50 * 1000, 2),
+            'p95_ms_le': round(p95 * 1000, 2),
+            'max_ms': round(self.max * 1000, 2),
+        }
+
+
+class _NamespaceMetrics:
+    def __init__(self):
+        self.lookups = {MEMORY_HIT: 0, DB_HIT: 0, STALE_HIT: 0, MISS: 0}
+        self.requests = {HIT: 0, STALE_HIT: 0, NEGATIVE_HIT: 0, INDEX_HIT: 0, MISS: 0}
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.writes = 0
+        self.upstream_errors = {}
+        self.db_latency = _Histogram()
+        self.upstream_latency = _Histogram()
+
+
+class CacheMetrics:
+    """行程內共用的統計，所有方法都是 thread-safe"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._namespaces = {}
+        self.started_at = time.time()
+
+    def _ns(self, namespace):
+        metrics = self._namespaces.get(namespace)
+        if metrics is None:
+            metrics = self._namespaces[namespace] = _NamespaceMetrics()
+        return metrics
+
+    def record_lookup(self, namespace, outcome, payload_bytes=0):
+        with self._lock:
+            metrics = self._ns(namespace)
+            metrics.lookups[outcome] += 1
+            metrics.bytes_read += payload_bytes
+
+    def record_db_latency(self, namespace, seconds):
+        with self._lock:
+            self._ns(namespace).db_latency.observe(seconds)
+
+    def record_write(self, namespace, payload_bytes):
+        with self._lock:
+            metrics = self._ns(namespace)
+            metrics.writes += 1
+            metrics.bytes_written += payload_bytes
+
+    def record_request(self, namespace, outcome):
+        with self._lock:
+            self._ns(namespace).requests[outcome] += 1
+
+    def record_upstream(self, namespace, seconds, error_type=None):
+        with self._lock:
+            metrics = self._ns(namespace)
+            metrics.upstream_latency.observe(seconds)
+            if error_type:
+                metrics.upstream_errors[error_type] = metrics.upstream_errors.get(error_type, 0) + 1
+
+    def reset(self):
+        with self._lock:
+            self._namespaces.clear()
+            self.started_at = time.time()
+
+    def snapshot(self):
+        """各命名空間的統計，hit_ratio 以 GoogleMapService 的請求計算（stale 也算省下一次上游呼叫）"""
+        with self._lock:
+            namespaces = {}
+            for name, metrics in self._namespaces.items():
+                total = sum(metrics.requests.values())
+                served = total - metrics.requests[MISS]
+                lookups = sum(metrics.lookups.values())
+                namespaces[name] = {
+                    'requests': dict(metrics.requests),
+                    'hit_ratio': round(served / total, 4) if total else None,
+                    'lookups': dict(metrics.lookups),
+                    'lookup_hit_ratio': round((lookups - metrics.lookups[MISS]) / lookups, 4) if lookups else None,
+                    'bytes_read': metrics.bytes_read,
+                    'bytes_written': metrics.bytes_written,
+                    'writes': metrics.writes,
+                    'avg_payload_bytes': round(metrics.bytes_written / metrics.writes) if metrics.writes else None,
+                    'db_latency': metrics.db_latency.snapshot(),
+                    'upstream_latency': metrics.upstream_latency.snapshot(),
+                    'upstream_errors': dict(metrics.upstream_errors),
+                }
+            return {
+                'uptime_seconds': round(time.time() - self.started_at),
+                'namespaces': namespaces,
+            }
+
+    def render_prometheus(self, gauges=None):
+        """
+        輸出 Prometheus text exposition 格式。
+        gauges 為額外的 {metric 名稱: (說明, {namespace: 數值})}，例如資料表筆數。
+        """
+        lines = []
+
+        def header(name, kind, help_text):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+
+        def histogram(name, help_text, attr):
+            header(name, 'histogram', help_text)
+            for namespace, metrics in items:
+                hist = getattr(metrics, attr)
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS, hist.counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{namespace="{namespace}",le="{bound}"}} {cumulative}')
+                lines.append(f'{name}_bucket{{namespace="{namespace}",le="+Inf"}} {hist.count}')
+                lines.append(f'{name}_sum{{namespace="{namespace}"}} {hist.total:.6f}')
+                lines.append(f'{name}_count{{namespace="{namespace}"}} {hist.count}')
+
+        with self._lock:
+            items = sorted(self._namespaces.items())
+
+            header('flyplay_cache_requests_total', 'counter', 'GoogleMapService cached lookups by outcome')
+            for namespace, metrics in items:
+                for outcome, value in metrics.requests.items():
+                    lines.append(f'flyplay_cache_requests_total{{namespace="{namespace}",outcome="{outcome}"}} {value}')
+
+            header('flyplay_cache_lookups_total', 'counter', 'PlaceCache lookups by tier and result')
+            for namespace, metrics in items:
+                for outcome, value in metrics.lookups.items():
+                    lines.append(f'flyplay_cache_lookups_total{{namespace="{namespace}",result="{outcome}"}} {value}')
+
+            header('flyplay_cache_read_bytes_total', 'counter', 'Encoded payload bytes read from the cache database')
+            for namespace, metrics in items:
+                lines.append(f'flyplay_cache_read_bytes_total{{namespace="{namespace}"}} {metrics.bytes_read}')
+
+            header('flyplay_cache_written_bytes_total', 'counter', 'Encoded payload bytes written to the cache database')
+            for namespace, metrics in items:
+                lines.append(f'flyplay_cache_written_bytes_total{{namespace="{namespace}"}} {metrics.bytes_written}')
+
+            header('flyplay_cache_writes_total', 'counter', 'Rows written to the cache database')
+            for namespace, metrics in items:
+                lines.append(f'flyplay_cache_writes_total{{namespace="{namespace}"}} {metrics.writes}')
+
+            header('flyplay_upstream_errors_total', 'counter', 'Failed upstream API calls by error type')
+            for namespace, metrics in items:
+                for error_type, value in sorted(metrics.upstream_errors.items()):
+                    lines.append(
+                        f'flyplay_upstream_errors_total{{namespace="{namespace}",error_type="{error_type}"}} {value}'
+                    )
+
+            histogram('flyplay_cache_db_latency_seconds', 'PlaceCache database read latency', 'db_latency')
+            histogram('flyplay_upstream_latency_seconds', 'Google API call latency on cache miss', 'upstream_latency')
+
+        for name, (help_text, values) in (gauges or {}).items():
+            header(name, 'gauge', help_text)
+            for namespace, value in sorted(values.items()):
+                lines.append(f'{name}{{namespace="{namespace}"}} {value}')
+
+        return '\n'.join(lines) + '\n'
+
+
+# 整個行程共用一份，PlaceCache 與 GoogleMapService 都寫進這裡
+cache_metrics = CacheMetrics()
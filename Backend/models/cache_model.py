@@ -1,17 +1,56 @@
 import sqlite3
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 import json
 import os
 import psycopg2
 from psycopg2 import Error as PsycopgError
+from psycopg2 import pool as psycopg2_pool
+from psycopg2.extras import execute_batch, execute_values
+from config import Config
+from models import cache_codecs
+from models import cache_metrics as metrics
+from models.cache_metrics import cache_metrics
+from models.cache_namespaces import (
+    DEFAULT_NAMESPACE, DEFAULT_POLICY, MEMORY_LIMITS, NAMESPACE_POLICIES, NEGATIVE_PREFIX, POLICIES_BY_NAME,
+    namespace_of, policy_for
+)
+from models.memory_cache import MemoryCache
 
 class PlaceCache:
-    def __init__(self, db_path='Backend/data/cache.db', database_url=None):
+    BATCH_SIZE = 500
+    FRESH = 'fresh'
+    STALE = 'stale'
+    # 每筆資料佔用的大小（JSON 欄位加上壓縮 payload）
+    SIZE_SQL_PG = 'pg_column_size(result) + COALESCE(octet_length(payload), 0)'
+    SIZE_SQL_SQLITE = 'LENGTH(CAST(result AS BLOB)) + COALESCE(LENGTH(payload), 0)'
+
+    def __init__(self, db_path='Backend/data/cache.db', database_url=None,
+                 pool_min=None, pool_max=None):
         self.db_path = db_path
         self.database_url = database_url or os.getenv('DATABASE_URL')
         self.use_postgres = bool(self.database_url and self.database_url.startswith('postgres'))
         self.postgres_error = None
 
+        # 連線池設定：Postgres 用 ThreadedConnectionPool，SQLite 每個執行緒一條長連線
+        self.pool_min = pool_min if pool_min is not None else Config.CACHE_POOL_MIN
+        self.pool_max = max(pool_max if pool_max is not None else Config.CACHE_POOL_MAX, self.pool_min, 1)
+        self.pool_timeout = Config.CACHE_POOL_TIMEOUT
+        self.healthcheck_seconds = Config.CACHE_POOL_HEALTHCHECK_SECONDS
+        self._pg_pool = None
+        self._pg_slots = None
+        self._pg_last_used = {}
+        self._sqlite_local = threading.local()
+
+        # 記憶體層：熱門 key 直接在行程內回應，不必每次都打資料庫
+        self.memory = MemoryCache(
+            max_entries=Config.CACHE_MEMORY_MAX_ENTRIES,
+            ttl_seconds=Config.CACHE_MEMORY_TTL_SECONDS,
+            namespace_limits=MEMORY_LIMITS,
+        )
+
         if self.use_postgres:
             try:
                 self._init_postgres()
@@ -23,12 +62,13 @@ class PlaceCache:
 
     def _fallback_to_sqlite(self):
         self.use_postgres = False
+        self._close_pg_pool()
         os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
         self._init_sqlite()
 
     def _init_sqlite(self):
         """初始化 SQLite 表"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._sqlite_connection() as conn:
             conn.execute('''
                 CREATE TABLE IF NOT EXISTS places (
                     place_id TEXT PRIMARY KEY,
@@ -36,11 +76,22 @@ class PlaceCache:
                     cached_at TEXT NOT NULL
                 )
             ''')
-            conn.commit()
+            # 命名空間與壓縮欄位：舊表用 ALTER 補上
+            columns = {row[1] for row in conn.execute('PRAGMA table_info(places)')}
+            for column, column_type in (('namespace', 'TEXT'), ('payload', 'BLOB'), ('codec', 'TEXT')):
+                if column not in columns:
+                    conn.execute(f'ALTER TABLE places ADD COLUMN {column} {column_type}')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_places_cached_at ON places (cached_at)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_places_namespace_cached_at ON places (namespace, cached_at)')
 
     def _init_postgres(self):
-        """初始化 PostgreSQL 表"""
-        with psycopg2.connect(self.database_url) as conn:
+        """初始化 PostgreSQL 連線池與表"""
+        self._pg_pool = psycopg2_pool.ThreadedConnectionPool(
+            self.pool_min, self.pool_max, self.database_url
+        )
+        # ThreadedConnectionPool 滿了會直接丟 PoolError，用 semaphore 讓呼叫端排隊等待
+        self._pg_slots = threading.BoundedSemaphore(self.pool_max)
+        with self._pg_connection() as conn:
             with conn.cursor() as cursor:
                 cursor.execute('''
                     CREATE TABLE IF NOT EXISTS places (
@@ -49,82 +100,715 @@ class PlaceCache:
                         cached_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
                     )
                 ''')
+                cursor.execute('''
+                    ALTER TABLE places
+                    ADD COLUMN IF NOT EXISTS namespace TEXT,
+                    ADD COLUMN IF NOT EXISTS payload BYTEA,
+                    ADD COLUMN IF NOT EXISTS codec TEXT
+                ''')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_places_cached_at ON places (cached_at)')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_places_namespace_cached_at ON places (namespace, cached_at)')
+
+    def _is_pg_healthy(self, conn):
+        """閒置太久的連線借出前先 ping 一次，避免拿到被 server 斷掉的連線"""
+        if conn.closed:
+            return False
+        last_used = self._pg_last_used.get(id(conn))
+        if last_used is not None and time.monotonic() - last_used < self.healthcheck_seconds:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            conn.rollback()
+            return True
+        except PsycopgError:
+            return False
+
+    def _checkout_pg(self, pg_pool):
+        for _ in range(self.pool_max):
+            conn = pg_pool.getconn()
+            if self._is_pg_healthy(conn):
+                return conn
+            self._pg_last_used.pop(id(conn), None)
+            pg_pool.putconn(conn, close=True)
+        return pg_pool.getconn()
+
+    @contextmanager
+    def _pg_connection(self):
+        """從連線池借一條連線，離開時 commit 並歸還；壞掉的連線直接丟棄"""
+        pg_pool, slots = self._pg_pool, self._pg_slots
+        if pg_pool is None or pg_pool.closed:
+            raise psycopg2_pool.PoolError('PlaceCache 連線池已關閉')
+        if not slots.acquire(timeout=self.pool_timeout):
+            raise psycopg2_pool.PoolError('PlaceCache 連線池已滿')
+        conn = None
+        broken = False
+        try:
+            conn = self._checkout_pg(pg_pool)
+            yield conn
+            conn.commit()
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            broken = True
+            raise
+        except Exception:
+            if conn is not None and not conn.closed:
+                try:
+                    conn.rollback()
+                except PsycopgError:
+                    broken = True
+            raise
+        finally:
+            if conn is not None:
+                broken = broken or bool(conn.closed)
+                if broken:
+                    self._pg_last_used.pop(id(conn), None)
+                else:
+                    self._pg_last_used[id(conn)] = time.monotonic()
+                try:
+                    pg_pool.putconn(conn, close=broken)
+                except psycopg2_pool.PoolError:
+                    pass
+            slots.release()
+
+    @contextmanager
+    def _sqlite_connection(self):
+        """每個執行緒重用同一條 WAL 模式的 SQLite 連線"""
+        conn = getattr(self._sqlite_local, 'conn', None)
+        if conn is None or getattr(self._sqlite_local, 'db_path', None) != self.db_path:
+            conn = sqlite3.connect(self.db_path, timeout=self.pool_timeout)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._sqlite_local.conn = conn
+            self._sqlite_local.db_path = self.db_path
+        try:
+            yield conn
             conn.commit()
+        except sqlite3.ProgrammingError:
+            # 連線已被關閉，下次重新建立
+            self._sqlite_local.conn = None
+            raise
+        except Exception:
+            conn.rollback()
+            raise
+
+    def _close_pg_pool(self):
+        if self._pg_pool is not None and not self._pg_pool.closed:
+            self._pg_pool.closeall()
+        self._pg_pool = None
+        self._pg_last_used.clear()
+
+    def close(self):
+        """關閉連線池與目前執行緒的 SQLite 連線"""
+        self._close_pg_pool()
+        conn = getattr(self._sqlite_local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._sqlite_local.conn = None
+
+    def _freshness(self, place_id, cached_time, now, expire_days=None):
+        """
+        判斷資料新鮮度：TTL 內為 FRESH，超過 TTL 但在命名空間的 stale_ttl 內為 STALE，其餘為 None。
+        expire_days 有指定時以它為準且不允許 stale。
+        """
+        age = now - cached_time
+        if expire_days:
+            return self.FRESH if age < timedelta(days=expire_days) else None
+        policy = policy_for(place_id)
+        if age < policy.ttl:
+            return self.FRESH
+        if Config.CACHE_STALE_WHILE_REVALIDATE and age < policy.ttl + policy.stale_ttl:
+            return self.STALE
+        return None
+
+    @staticmethod
+    def _encode(place_id, text):
+        """依命名空間策略決定存法，回傳 (namespace, result, payload, codec)"""
+        policy = policy_for(place_id)
+        return (policy.name, *cache_codecs.encode(policy.codec, text))
 
-    def get(self, place_id, expire_days=7):
-        """獲取快取數據"""
+    @staticmethod
+    def _decode(result, payload, codec):
+        """把資料庫的欄位還原成 JSON 字串；codec 無法使用時回傳 None，視為未命中"""
+        try:
+            return cache_codecs.decode(result, payload, codec)
+        except LookupError:
+            return None
+
+    @staticmethod
+    def _stored_size(result, payload):
+        """資料在資料庫中佔用的 bytes（壓縮後的 payload 或 JSON 本身）"""
+        if payload is not None:
+            return len(payload)
+        if isinstance(result, str):
+            return len(result.encode('utf-8'))
+        return len(json.dumps(result).encode('utf-8'))
+
+    def _fetch_row(self, place_id):
+        """從資料庫讀一筆，回傳 (json 字串, cached_at, 儲存大小)；不存在回傳 None"""
+        return self._fetch_rows([place_id]).get(place_id)
+
+    def _fetch_rows(self, place_ids):
+        """一次查詢多筆，回傳 {place_id: (json 字串, cached_at, 儲存大小)}"""
+        rows = {}
+        if not place_ids:
+            return rows
         if self.use_postgres:
             try:
-                with psycopg2.connect(self.database_url) as conn:
+                with self._pg_connection() as conn:
                     with conn.cursor() as cursor:
                         cursor.execute(
-                            'SELECT result, cached_at FROM places WHERE place_id = %s',
-                            (place_id,)
+                            '''SELECT place_id, result, payload, codec, cached_at
+                               FROM places WHERE place_id = ANY(%s)''',
+                            (list(place_ids),)
                         )
-                        row = cursor.fetchone()
-
-                        if row:
-                            result, cached_at = row
-                            cached_time = cached_at.replace(tzinfo=None) if cached_at.tzinfo else cached_at
-                            if datetime.utcnow() - cached_time < timedelta(days=expire_days):
-                                return result if isinstance(result, dict) else json.loads(result)
+                        fetched = cursor.fetchall()
+                for place_id, result, payload, codec, cached_at in fetched:
+                    text = self._decode(result, payload, codec)
+                    if text is not None:
+                        cached_time = cached_at.replace(tzinfo=None) if cached_at.tzinfo else cached_at
+                        rows[place_id] = text, cached_time, self._stored_size(result, payload)
+                return rows
+            except psycopg2_pool.PoolError:
+                return rows
             except PsycopgError as error:
                 self.postgres_error = str(error)
                 self._fallback_to_sqlite()
-            return None
+                return rows
 
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.execute(
-                'SELECT result, cached_at FROM places WHERE place_id = ?',
-                (place_id,)
-            )
-            row = cursor.fetchone()
+        place_ids = list(place_ids)
+        with self._sqlite_connection() as conn:
+            # SQLite 的參數數量有上限，分批查詢
+            for start in range(0, len(place_ids), self.BATCH_SIZE):
+                chunk = place_ids[start:start + self.BATCH_SIZE]
+                placeholders = ','.join('?' * len(chunk))
+                cursor = conn.execute(
+                    f'''SELECT place_id, result, payload, codec, cached_at
+                        FROM places WHERE place_id IN ({placeholders})''',
+                    chunk
+                )
+                for place_id, result, payload, codec, cached_at in cursor.fetchall():
+                    text = self._decode(result, payload, codec)
+                    if text is not None:
+                        rows[place_id] = text, datetime.fromisoformat(cached_at), self._stored_size(result, payload)
+        return rows
 
-            if row:
-                result, cached_at = row
-                cached_time = datetime.fromisoformat(cached_at)
-                if datetime.utcnow() - cached_time < timedelta(days=expire_days):
-                    return json.loads(result)
-        return None
+    def get(self, place_id, expire_days=None):
+        """獲取快取數據（先查記憶體層，未命中再查資料庫並回填記憶體層）"""
+        return self.get_many([place_id], expire_days).get(place_id)
+
+    def get_with_state(self, place_id):
+        """回傳 (result, FRESH/STALE)，未命中回傳 (None, None)"""
+        return self.get_many_with_state([place_id]).get(place_id, (None, None))
+
+    def get_many(self, place_ids, expire_days=None):
+        """批次獲取快取數據，回傳 {place_id: result}，只包含新鮮的 key"""
+        entries = self.get_many_with_state(place_ids, expire_days)
+        return {
+            place_id: result
+            for place_id, (result, state) in entries.items()
+            if state == self.FRESH
+        }
+
+    def get_many_with_state(self, place_ids, expire_days=None):
+        """批次獲取快取數據，回傳 {place_id: (result, FRESH/STALE)}，只包含命中的 key"""
+        now = datetime.utcnow()
+        results = {}
+        missing = []
+        for place_id in dict.fromkeys(place_ids):
+            cached = self.memory.get(place_id)
+            state = self._freshness(place_id, cached[1], now, expire_days) if cached else None
+            if state:
+                results[place_id] = json.loads(cached[0]), state
+                outcome = metrics.MEMORY_HIT if state == self.FRESH else metrics.STALE_HIT
+                cache_metrics.record_lookup(namespace_of(place_id), outcome)
+            else:
+                missing.append(place_id)
+        if not missing:
+            return results
+
+        started = time.perf_counter()
+        fetched = self._fetch_rows(missing)
+        elapsed = time.perf_counter() - started
+        for namespace in {namespace_of(place_id) for place_id in missing}:
+            cache_metrics.record_db_latency(namespace, elapsed)
+
+        for place_id in missing:
+            text, cached_time, size = fetched.get(place_id, (None, None, 0))
+            state = self._freshness(place_id, cached_time, now, expire_days) if text is not None else None
+            if state:
+                self.memory.set(place_id, text, cached_time)
+                results[place_id] = json.loads(text), state
+                outcome = metrics.DB_HIT if state == self.FRESH else metrics.STALE_HIT
+                cache_metrics.record_lookup(namespace_of(place_id), outcome, size)
+            else:
+                cache_metrics.record_lookup(namespace_of(place_id), metrics.MISS)
+        return results
 
     def set(self, place_id, result):
-        """設置快取數據"""
+        """設置快取數據（同時寫入記憶體層與資料庫）"""
+        self.set_many({place_id: result})
+
+    def set_many(self, items):
+        """批次設置快取數據，items 為 dict 或 (place_id, result) 序列"""
+        if isinstance(items, dict):
+            items = items.items()
+        cached_time = datetime.utcnow()
+        # 同一批內重複的 key 只保留最後一筆，避免 ON CONFLICT 同一列更新兩次
+        texts = {place_id: json.dumps(result) for place_id, result in items}
+        if not texts:
+            return
+        rows = []
+        for place_id, text in texts.items():
+            self.memory.set(place_id, text, cached_time)
+            namespace, result, payload, codec = self._encode(place_id, text)
+            rows.append((place_id, namespace, result, payload, codec, cached_time))
+            cache_metrics.record_write(namespace, self._stored_size(result, payload))
+
+        self._write_rows(rows)
+
+    def _write_rows(self, rows, only_newer=False):
+        """
+        寫入已編碼的資料列 (place_id, namespace, result, payload, codec, cached_at)。
+        only_newer=True 時，已存在且比較新的資料不會被覆蓋（匯入 bundle 用）。
+        """
+        update_where = ' WHERE places.cached_at < EXCLUDED.cached_at' if only_newer else ''
         if self.use_postgres:
             try:
-                with psycopg2.connect(self.database_url) as conn:
+                with self._pg_connection() as conn:
                     with conn.cursor() as cursor:
-                        cursor.execute(
-                            '''INSERT INTO places (place_id, result, cached_at)
-                               VALUES (%s, %s::jsonb, %s)
-                               ON CONFLICT (place_id)
-                               DO UPDATE SET result = EXCLUDED.result, cached_at = EXCLUDED.cached_at''',
-                            (place_id, json.dumps(result), datetime.utcnow())
+                        execute_values(
+                            cursor,
+                            f'''INSERT INTO places (place_id, namespace, result, payload, codec, cached_at)
+                                VALUES %s
+                                ON CONFLICT (place_id)
+                                DO UPDATE SET namespace = EXCLUDED.namespace, result = EXCLUDED.result,
+                                              payload = EXCLUDED.payload, codec = EXCLUDED.codec,
+                                              cached_at = EXCLUDED.cached_at{update_where}''',
+                            rows,
+                            template='(%s, %s, %s::jsonb, %s, %s, %s)',
+                            page_size=self.BATCH_SIZE
                         )
-                    conn.commit()
+                return
+            except psycopg2_pool.PoolError:
                 return
             except PsycopgError as error:
                 self.postgres_error = str(error)
                 self._fallback_to_sqlite()
 
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute(
-                '''INSERT OR REPLACE INTO places (place_id, result, cached_at) 
-                   VALUES (?, ?, ?)''',
-                (place_id, json.dumps(result), datetime.utcnow().isoformat())
+        with self._sqlite_connection() as conn:
+            conn.executemany(
+                f'''INSERT INTO places (place_id, namespace, result, payload, codec, cached_at)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (place_id)
+                    DO UPDATE SET namespace = excluded.namespace, result = excluded.result,
+                                  payload = excluded.payload, codec = excluded.codec,
+                                  cached_at = excluded.cached_at{update_where}''',
+                [row[:-1] + (row[-1].isoformat(),) for row in rows]
             )
-            conn.commit()
-            
+
+    def iter_entries(self, namespaces=None, include_expired=False, batch_size=None):
+        """
+        依 key 順序分批讀出所有快取，逐筆產生 (place_id, result, cached_at)。
+        預設略過已超過 TTL 與 stale 範圍、不會再被使用的資料。
+        """
+        batch_size = batch_size or self.BATCH_SIZE
+        now = datetime.utcnow()
+        last_id = ''
+        while True:
+            fetched = self._run(
+                '''SELECT place_id, result, payload, codec, cached_at FROM places
+                   WHERE place_id > %s ORDER BY place_id LIMIT %s''',
+                (last_id, batch_size),
+                fetch=True
+            )
+            for place_id, result, payload, codec, cached_at in fetched:
+                if namespaces and namespace_of(place_id) not in namespaces:
+                    continue
+                if isinstance(cached_at, str):
+                    cached_time = datetime.fromisoformat(cached_at)
+                else:
+                    cached_time = cached_at.replace(tzinfo=None) if cached_at.tzinfo else cached_at
+                if not include_expired and not self._freshness(place_id, cached_time, now):
+                    continue
+                text = self._decode(result, payload, codec)
+                if text is not None:
+                    yield place_id, json.loads(text), cached_time
+            if len(fetched) < batch_size:
+                return
+            last_id = fetched[-1][0]
+
+    def is_importable(self, place_id, cached_time, now=None):
+        """以 cached_time 寫入的資料目前是否仍可使用（新鮮或在 stale 期間內），匯入 bundle 時用來略過過期資料"""
+        return self._freshness(place_id, cached_time, now or datetime.utcnow()) is not None
+
+    def load_entries(self, entries, overwrite=False):
+        """
+        寫入 (place_id, result, cached_at) 並保留原本的寫入時間，TTL 照常從 cached_at 起算。
+        overwrite=False 時不覆蓋資料庫裡比較新的資料。回傳寫入的筆數（含被略過的較舊資料）。
+        """
+        written = 0
+        rows = []
+        for place_id, result, cached_time in entries:
+            namespace, stored, payload, codec = self._encode(place_id, json.dumps(result))
+            rows.append((place_id, namespace, stored, payload, codec, cached_time))
+            if len(rows) >= self.BATCH_SIZE:
+                written += self._load_batch(rows, overwrite)
+                rows = []
+        if rows:
+            written += self._load_batch(rows, overwrite)
+        return written
+
+    def _load_batch(self, rows, overwrite):
+        # 同一批內重複的 key 只保留最後一筆
+        rows = list({row[0]: row for row in rows}.values())
+        self._write_rows(rows, only_newer=not overwrite)
+        # 記憶體層可能還留著匯入前的舊值
+        for row in rows:
+            self.memory.delete(row[0])
+        return len(rows)
+
     def clear_all(self):
-        """清除所有快取"""
+        """清除所有快取（分批刪除），回傳刪除筆數"""
+        deleted = self._delete_batched('1 = 1', (), self.BATCH_SIZE)
+        self.memory.clear()
+        return deleted
+
+    def _run(self, sql, params=(), fetch=False, sqlite_sql=None):
+        """
+        在目前的後端執行一段 SQL，每次呼叫是一個獨立交易。
+        SQL 以 Postgres 的 %s 佔位符撰寫，SQLite 自動換成 ?（語法不同時用 sqlite_sql 覆寫）。
+        回傳查詢結果（fetch=True）或影響筆數。
+        """
         if self.use_postgres:
             try:
-                with psycopg2.connect(self.database_url) as conn:
+                with self._pg_connection() as conn:
                     with conn.cursor() as cursor:
-                        cursor.execute('DELETE FROM places')
-                    conn.commit()
+                        cursor.execute(sql, params)
+                        return cursor.fetchall() if fetch else cursor.rowcount
+            except psycopg2_pool.PoolError:
+                return [] if fetch else 0
+            except PsycopgError as error:
+                self.postgres_error = str(error)
+                self._fallback_to_sqlite()
+
+        sqlite_params = [p.isoformat() if isinstance(p, datetime) else p for p in params]
+        with self._sqlite_connection() as conn:
+            cursor = conn.execute(sqlite_sql or sql.replace('%s', '?'), sqlite_params)
+            return cursor.fetchall() if fetch else cursor.rowcount
+
+    def _run_many(self, sql, rows, sqlite_sql=None):
+        """同一段 SQL 套用多組參數，整批在同一個交易內執行"""
+        if not rows:
+            return
+        if self.use_postgres:
+            try:
+                with self._pg_connection() as conn:
+                    with conn.cursor() as cursor:
+                        execute_batch(cursor, sql, rows, page_size=self.BATCH_SIZE)
+                return
+            except psycopg2_pool.PoolError:
                 return
-            except PsycopgError:
-                pass
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute('DELETE FROM places')
-            conn.commit()
\ No newline at end of file
+            except PsycopgError as error:
+                self.postgres_error = str(error)
+                self._fallback_to_sqlite()
+
+        sqlite_rows = [
+            [p.isoformat() if isinstance(p, datetime) else p for p in row]
+            for row in rows
+        ]
+        with self._sqlite_connection() as conn:
+            conn.executemany(sqlite_sql or sql.replace('%s', '?'), sqlite_rows)
+
+    def _delete_keys(self, place_ids):
+        """依 key 分批刪除，回傳刪除筆數"""
+        deleted = 0
+        place_ids = list(place_ids)
+        for start in range(0, len(place_ids), self.BATCH_SIZE):
+            chunk = place_ids[start:start + self.BATCH_SIZE]
+            placeholders = ','.join(['%s'] * len(chunk))
+            deleted += self._run(f'DELETE FROM places WHERE place_id IN ({placeholders})', chunk)
+            for place_id in chunk:
+                self.memory.delete(place_id)
+        return deleted
+
+    def table_stats(self):
+        """回傳快取表的筆數與資料大小（bytes），以及各命名空間的明細"""
+        rows = self._run(
+            f'''SELECT COALESCE(namespace, %s), COUNT(*), COALESCE(SUM({self.SIZE_SQL_PG}), 0)
+                FROM places GROUP BY 1''',
+            (DEFAULT_NAMESPACE,),
+            fetch=True,
+            sqlite_sql=f'''SELECT COALESCE(namespace, ?), COUNT(*), COALESCE(SUM({self.SIZE_SQL_SQLITE}), 0)
+                           FROM places GROUP BY 1'''
+        )
+        namespaces = {
+            namespace: {'rows': int(count), 'bytes': int(size)}
+            for namespace, count, size in rows
+        }
+        return {
+            'rows': sum(item['rows'] for item in namespaces.values()),
+            'bytes': sum(item['bytes'] for item in namespaces.values()),
+            'namespaces': namespaces,
+        }
+
+    def _backfill_namespaces(self, batch_size):
+        """舊資料沒有 namespace 欄位值，依 key 前綴分批補上"""
+        updated = 0
+        for policy in NAMESPACE_POLICIES + [DEFAULT_POLICY]:
+            while True:
+                count = self._run(
+                    '''UPDATE places SET namespace = %s WHERE place_id IN (
+                           SELECT place_id FROM places
+                           WHERE namespace IS NULL AND substr(place_id, 1, %s) = %s
+                           LIMIT %s)''',
+                    (policy.name, len(policy.prefix), policy.prefix, batch_size)
+                )
+                updated += max(count, 0)
+                if count < batch_size:
+                    break
+        return updated
+
+    def _delete_batched(self, where, params, batch_size, sqlite_where=None):
+        """依條件分批刪除最舊的資料，每批一個短交易，避免長時間鎖表"""
+        sql = '''DELETE FROM places WHERE place_id IN (
+                   SELECT place_id FROM places WHERE {where}
+                   ORDER BY cached_at LIMIT %s)'''
+        sqlite_sql = sql.format(where=sqlite_where).replace('%s', '?') if sqlite_where else None
+        deleted_total = 0
+        while True:
+            deleted = self._run(sql.format(where=where), (*params, batch_size), sqlite_sql=sqlite_sql)
+            deleted_total += max(deleted, 0)
+            if deleted < batch_size:
+                return deleted_total
+
+    def invalidate_keys(self, place_ids):
+        """刪除指定的 key 以及它們的負向快取，回傳刪除筆數"""
+        keys = list(dict.fromkeys(place_ids))
+        return self._delete_keys(keys + [NEGATIVE_PREFIX + key for key in keys])
+
+    def invalidate_prefix(self, prefix, batch_size=None):
+        """刪除某個前綴開頭的所有 key（含負向快取），回傳刪除筆數"""
+        if not prefix:
+            raise ValueError('prefix 不可為空，清空全部請用 clear_all()')
+        batch_size = batch_size or self.BATCH_SIZE
+        deleted = 0
+        for key_prefix in (prefix, NEGATIVE_PREFIX + prefix):
+            deleted += self._delete_batched(
+                'substr(place_id, 1, %s) = %s', (len(key_prefix), key_prefix), batch_size
+            )
+        self.memory.delete_matching(
+            lambda key, text, cached_at: key.startswith(prefix) or key.startswith(NEGATIVE_PREFIX + prefix)
+        )
+        return deleted
+
+    def invalidate_place(self, google_place_id, scan_payloads=True, batch_size=None):
+        """
+        刪除和某個 Google place_id 有關的所有快取，回傳 {'keys': 筆數, 'payloads': 筆數}：
+          - key 含有 place_id（details_、business_、photo_cdn_ 以及對應的負向快取）
+          - 結果內容含有 place_id（search_、search_nearby_ 等），
+            JSON 欄位直接在 SQL 比對，壓縮過的資料分批解碼後比對（scan_payloads=False 可略過）
+        """
+        if not google_place_id:
+            raise ValueError('place_id 不可為空')
+        batch_size = batch_size or self.BATCH_SIZE
+        report = {
+            'keys': self._delete_batched(
+                'strpos(place_id, %s) > 0', (google_place_id,), batch_size,
+                sqlite_where='instr(place_id, %s) > 0'
+            ),
+        }
+        payloads = self._delete_batched(
+            'codec IS NULL AND strpos(result::text, %s) > 0', (google_place_id,), batch_size,
+            sqlite_where='codec IS NULL AND instr(result, %s) > 0'
+        )
+
+        if scan_payloads:
+            last_id = ''
+            while True:
+                fetched = self._run(
+                    '''SELECT place_id, result, payload, codec FROM places
+                       WHERE codec IS NOT NULL AND place_id > %s ORDER BY place_id LIMIT %s''',
+                    (last_id, batch_size),
+                    fetch=True
+                )
+                if not fetched:
+                    break
+                victims = [
+                    place_id for place_id, result, payload, codec in fetched
+                    if google_place_id in (self._decode(result, payload, codec) or '')
+                ]
+                payloads += self._delete_keys(victims)
+                last_id = fetched[-1][0]
+                if len(fetched) < batch_size:
+                    break
+        report['payloads'] = payloads
+
+        self.memory.delete_matching(
+            lambda key, text, cached_at: google_place_id in key or google_place_id in text
+        )
+        return report
+
+    def invalidate_older_than(self, max_age, namespace=None, batch_size=None):
+        """刪除寫入時間超過 max_age（timedelta）的資料，可限定命名空間，回傳刪除筆數"""
+        cutoff = datetime.utcnow() - max_age
+        batch_size = batch_size or self.BATCH_SIZE
+        if namespace:
+            self._backfill_namespaces(batch_size)
+            deleted = self._delete_batched('namespace = %s AND cached_at < %s', (namespace, cutoff), batch_size)
+        else:
+            deleted = self._delete_batched('cached_at < %s', (cutoff,), batch_size)
+        self.memory.delete_matching(
+            lambda key, text, cached_at: cached_at < cutoff and (not namespace or namespace_of(key) == namespace)
+        )
+        return deleted
+
+    def invalidate_namespace(self, namespace, batch_size=None):
+        """刪除整個命名空間，回傳刪除筆數"""
+        self._backfill_namespaces(batch_size or self.BATCH_SIZE)
+        deleted = self._delete_batched('namespace = %s', (namespace,), batch_size or self.BATCH_SIZE)
+        self.memory.delete_matching(lambda key, text, cached_at: namespace_of(key) == namespace)
+        return deleted
+
+    def purge_expired(self, expire_days=None, batch_size=None):
+        """
+        依各命名空間的 TTL（含 stale 寬限）分批刪除過期資料，回傳 {namespace: 刪除筆數}。
+        指定 expire_days 時所有命名空間一律用同一個期限。
+        """
+        batch_size = batch_size or self.BATCH_SIZE
+        now = datetime.utcnow()
+        purged = {}
+        for name, policy in POLICIES_BY_NAME.items():
+            if expire_days:
+                ttl = timedelta(days=expire_days)
+            elif Config.CACHE_STALE_WHILE_REVALIDATE:
+                # stale 範圍內的資料還可能被回傳，要保留到 stale_ttl 結束
+                ttl = policy.ttl + policy.stale_ttl
+            else:
+                ttl = policy.ttl
+            deleted = self._delete_batched('namespace = %s AND cached_at < %s', (name, now - ttl), batch_size)
+            if deleted:
+                purged[name] = deleted
+        return purged
+
+    def evict_oldest(self, max_rows=None, max_bytes=None, batch_size=None):
+        """
+        超過上限時從最舊的資料開始淘汰，回傳淘汰筆數。
+        先套用各命名空間的 max_entries，再套用整張表的筆數與容量上限。
+        """
+        batch_size = batch_size or self.BATCH_SIZE
+        evicted = 0
+        stats = self.table_stats()
+
+        for name, policy in POLICIES_BY_NAME.items():
+            namespace_rows = stats['namespaces'].get(name, {}).get('rows', 0)
+            if policy.max_entries and namespace_rows > policy.max_entries:
+                evicted += self._evict_rows('namespace = %s', (name,), namespace_rows - policy.max_entries, batch_size)
+
+        if evicted:
+            stats = self.table_stats()
+        if max_rows and stats['rows'] > max_rows:
+            evicted += self._evict_rows('1 = 1', (), stats['rows'] - max_rows, batch_size)
+            stats = self.table_stats()
+
+        total_bytes = stats['bytes']
+        while max_bytes and total_bytes > max_bytes:
+            oldest = self._run(
+                f'SELECT place_id, {self.SIZE_SQL_PG} FROM places ORDER BY cached_at LIMIT %s',
+                (batch_size,),
+                fetch=True,
+                sqlite_sql=f'SELECT place_id, {self.SIZE_SQL_SQLITE} FROM places ORDER BY cached_at LIMIT ?'
+            )
+            if not oldest:
+                break
+            victims = []
+            for place_id, size in oldest:
+                if total_bytes <= max_bytes:
+                    break
+                victims.append(place_id)
+                total_bytes -= size or 0
+            evicted += self._delete_keys(victims)
+        return evicted
+
+    def _evict_rows(self, where, params, excess, batch_size):
+        evicted = 0
+        while excess > 0:
+            deleted = self._run(
+                f'''DELETE FROM places WHERE place_id IN (
+                        SELECT place_id FROM places WHERE {where}
+                        ORDER BY cached_at LIMIT %s)''',
+                (*params, min(batch_size, excess))
+            )
+            if deleted <= 0:
+                break
+            evicted += deleted
+            excess -= deleted
+        return evicted
+
+    def recode(self, namespaces=None, batch_size=None):
+        """
+        把 codec 與命名空間策略不一致的資料（含舊版直接存 JSON 的列）分批重新編碼，
+        回傳 {namespace: {'recoded': 筆數, 'skipped': 無法解碼的筆數, 'codec': 目標 codec}}。
+        改了 CACHE_PAYLOAD_CODEC 或 NamespacePolicy.codec 之後執行一次即可，可重複執行。
+        """
+        batch_size = batch_size or self.BATCH_SIZE
+        self._backfill_namespaces(batch_size)
+        report = {}
+        for name, policy in POLICIES_BY_NAME.items():
+            if namespaces and name not in namespaces:
+                continue
+            target = cache_codecs.resolve_codec(policy.codec)
+            recoded = skipped = 0
+            last_id = ''
+            while True:
+                fetched = self._run(
+                    '''SELECT place_id, result, payload, codec FROM places
+                       WHERE namespace = %s AND COALESCE(codec, %s) <> %s AND place_id > %s
+                       ORDER BY place_id LIMIT %s''',
+                    (name, cache_codecs.JSON_CODEC, target, last_id, batch_size),
+                    fetch=True
+                )
+                if not fetched:
+                    break
+                updates = []
+                for place_id, result, payload, codec in fetched:
+                    text = self._decode(result, payload, codec)
+                    if text is None:
+                        skipped += 1
+                        continue
+                    updates.append((*cache_codecs.encode(target, text), place_id))
+                self._run_many(
+                    'UPDATE places SET result = %s::jsonb, payload = %s, codec = %s WHERE place_id = %s',
+                    updates,
+                    sqlite_sql='UPDATE places SET result = ?, payload = ?, codec = ? WHERE place_id = ?'
+                )
+                recoded += len(updates)
+                last_id = fetched[-1][0]
+                if len(fetched) < batch_size:
+                    break
+            if recoded or skipped:
+                report[name] = {'recoded': recoded, 'skipped': skipped, 'codec': target}
+        return report
+
+    def compact(self, expire_days=None, max_rows=None, max_bytes=None):
+        """清掉過期資料並套用容量上限，回傳回收報告"""
+        started = time.monotonic()
+        backfilled = self._backfill_namespaces(self.BATCH_SIZE)
+        expired_by_namespace = self.purge_expired(expire_days)
+        expired = sum(expired_by_namespace.values())
+        evicted = self.evict_oldest(
+            max_rows if max_rows is not None else Config.CACHE_MAX_ROWS,
+            max_bytes if max_bytes is not None else Config.CACHE_MAX_BYTES,
+        )
+        if not self.use_postgres and expired + evicted:
+            self._run('PRAGMA wal_checkpoint(PASSIVE)', fetch=True)
+        report = self.table_stats()
+        report.update({
+            'expired': expired,
+            'expired_by_namespace': expired_by_namespace,
+            'evicted': evicted,
+            'reclaimed': expired + evicted,
+            'namespaces_backfilled': backfilled,
+            'duration_ms': round((time.monotonic() - started) * 1000, 1),
+            'finished_at': datetime.utcnow().isoformat(),
+        })
+        return report
@@ -0,0 +1,84 @@
+"""
+快取 key 命名空間
+
+GoogleMapService 的快取 key 都以固定前綴開頭（search_、details_ ...）。
+這裡以宣告方式列出每個前綴的保存策略，PlaceCache 依此決定：
+  - ttl：資料多久後視為過期（讀取時忽略、背景清理時刪除）
+  - max_entries：資料庫內此命名空間最多保留幾筆（0 表示不限制，超過時淘汰最舊的）
+  - memory_max_entries：記憶體層最多保留幾筆（None 表示用 Config.CACHE_MEMORY_MAX_ENTRIES）
+  - codec：寫入資料庫時的編碼（見 models/cache_codecs.py），json 表示直接存進 result 欄位
+  - stale_ttl：過期後還能先回傳舊資料、同時背景更新的最長時間（stale-while-revalidate 的上限）
+"""
+from dataclasses import dataclass
+from datetime import timedelta
+
+from config import Config
+
+
+@dataclass(frozen=True)
+class NamespacePolicy:
+    name: str
+    prefix: str
+    ttl: timedelta
+    max_entries: int = 0
+    memory_max_entries: int = None
+    codec: str = 'json'
+    stale_ttl: timedelta = timedelta(0)
+
+
+NEGATIVE_PREFIX = 'negative_'
+# 內容大、重複欄位多的命名空間（照片、評論）使用的 codec
+PAYLOAD_CODEC = Config.CACHE_PAYLOAD_CODEC
+
+# 長的前綴要排在前面，search_nearby_ 才不會被 search_ 先吃掉
+NAMESPACE_POLICIES = [
+    # 地點搜尋結果（id、座標、照片 name）變動慢；照片 CDN URL 會失效，不寫進快取，讀出時經 photo_cdn_ 補回
+    NamespacePolicy('search_nearby', 'search_nearby_', timedelta(days=14),
+                    memory_max_entries=2048, codec=PAYLOAD_CODEC, stale_ttl=timedelta(days=7)),
+    NamespacePolicy('search', 'search_', timedelta(days=14), codec=PAYLOAD_CODEC, stale_ttl=timedelta(days=7)),
+    # 詳情含評論與營業時間，較常變動
+    NamespacePolicy('details', 'details_', timedelta(days=3),
+                    memory_max_entries=1024, codec=PAYLOAD_CODEC, stale_ttl=timedelta(days=2)),
+    NamespacePolicy('business', 'business_', timedelta(days=1),
+                    memory_max_entries=1024, stale_ttl=timedelta(hours=12)),
+    # 地名對應的 place_id（依名稱查詳情、營業時間時使用），和搜尋結果一樣變動慢
+    NamespacePolicy('place_name', 'place_name_', timedelta(days=14),
+                    memory_max_entries=2048, stale_ttl=timedelta(days=7)),
+    # 路線時間受班表與路況影響，大眾運輸以當天 09:00 出發計算
+    NamespacePolicy('routes_v2', 'routes_v2_', timedelta(days=1),
+                    memory_max_entries=2048, stale_ttl=timedelta(days=1)),
+    NamespacePolicy('route', 'route_', timedelta(days=1), stale_ttl=timedelta(days=1)),
+    NamespacePolicy('distance', 'distance_', timedelta(days=3), stale_ttl=timedelta(days=2)),
+    # 查無結果（ZERO_RESULTS、空的 places、4xx）的負向快取，短暫保留避免重複查詢不存在的地點
+    NamespacePolicy('negative', NEGATIVE_PREFIX, timedelta(seconds=Config.CACHE_NEGATIVE_TTL_SECONDS),
+                    max_entries=50000, memory_max_entries=2048),
+    # 照片 CDN URL 會過期，筆數多但每筆很小；過期的 URL 可能已失效，不提供 stale
+    NamespacePolicy('photo_cdn', 'photo_cdn_', timedelta(days=3),
+                    max_entries=100000, memory_max_entries=4096),
+]
+
+DEFAULT_NAMESPACE = 'other'
+DEFAULT_POLICY = NamespacePolicy(DEFAULT_NAMESPACE, '', timedelta(days=Config.CACHE_EXPIRE_DAYS))
+
+POLICIES_BY_NAME = {policy.name: policy for policy in NAMESPACE_POLICIES}
+POLICIES_BY_NAME[DEFAULT_NAMESPACE] = DEFAULT_POLICY
+
+# 記憶體層每個命名空間的筆數上限，未列出的用 Config.CACHE_MEMORY_MAX_ENTRIES
+MEMORY_LIMITS = {
+    policy.name: policy.memory_max_entries
+    for policy in NAMESPACE_POLICIES
+    if policy.memory_max_entries is not None
+}
+
+
+def policy_for(cache_key):
+    """回傳快取 key 對應的保存策略"""
+    for policy in NAMESPACE_POLICIES:
+        if cache_key.startswith(policy.prefix):
+            return policy
+    return DEFAULT_POLICY
+
+
+def namespace_of(cache_key):
+    """回傳快取 key 所屬的命名空間名稱"""
+    return policy_for(cache_key).name
@@ -0,0 +1,107 @@
+import threading
+import time
+from collections import OrderedDict
+
+from models.cache_namespaces import namespace_of
+
+
+class MemoryCache:
+    """
+    行程內的 LRU + TTL 記憶體快取，放在 PlaceCache 的 SQL 層前面
+
+    值以 JSON 字串保存，每次讀取都重新 loads，呼叫端修改回傳結果不會污染快取。
+    """
+
+    def __init__(self, max_entries=2048, ttl_seconds=600, namespace_limits=None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.namespace_limits = dict(namespace_limits or {})
+        self._lock = threading.Lock()
+        self._namespaces = {}
+        self._stats = {}
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0 and self.ttl_seconds > 0
+
+    def _limit_for(self, namespace):
+        return self.namespace_limits.get(namespace, self.max_entries)
+
+    def _stat(self, namespace):
+        stats = self._stats.get(namespace)
+        if stats is None:
+            stats = self._stats[namespace] = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0}
+        return stats
+
+    def get(self, key):
+        """回傳 (json 字串, cached_at)；不存在或超過 TTL 回傳 None"""
+        if not self.enabled:
+            return None
+        namespace = namespace_of(key)
+        with self._lock:
+            entries = self._namespaces.get(namespace)
+            entry = entries.get(key) if entries else None
+            stats = self._stat(namespace)
+            if entry is None:
+                stats['misses'] += 1
+                return None
+            text, cached_at, stored_at = entry
+            if time.monotonic() - stored_at >= self.ttl_seconds:
+                del entries[key]
+                stats['expirations'] += 1
+                stats['misses'] += 1
+                return None
+            entries.move_to_end(key)
+            stats['hits'] += 1
+            return text, cached_at
+
+    def set(self, key, text, cached_at):
+        if not self.enabled:
+            return
+        namespace = namespace_of(key)
+        limit = self._limit_for(namespace)
+        if limit <= 0:
+            return
+        with self._lock:
+            entries = self._namespaces.setdefault(namespace, OrderedDict())
+            entries[key] = (text, cached_at, time.monotonic())
+            entries.move_to_end(key)
+            while len(entries) > limit:
+                entries.popitem(last=False)
+                self._stat(namespace)['evictions'] += 1
+
+    def delete(self, key):
+        with self._lock:
+            entries = self._namespaces.get(namespace_of(key))
+            if entries:
+                entries.pop(key, None)
+
+    def delete_matching(self, predicate):
+        """刪除 predicate(key, json 字串, cached_at) 為真的項目，回傳刪除筆數"""
+        deleted = 0
+        with self._lock:
+            for entries in self._namespaces.values():
+                victims = [
+                    key for key, (text, cached_at, _) in entries.items() if predicate(key, text, cached_at)
+                ]
+                for key in victims:
+                    del entries[key]
+                deleted += len(victims)
+        return deleted
+
+    def clear(self):
+        with self._lock:
+            self._namespaces.clear()
+
+    def stats(self):
+        """各命名空間的筆數與命中統計"""
+        with self._lock:
+            report = {}
+            for namespace in set(self._namespaces) | set(self._stats):
+                stats = dict(self._stat(namespace))
+                stats['entries'] = len(self._namespaces.get(namespace, ()))
+                stats['limit'] = self._limit_for(namespace)
+                lookups = stats['hits'] + stats['misses']
+                stats['hit_ratio'] = round(stats['hits'] / lookups, 4) if lookups else None
+                report[namespace] = stats
+            return report
@@ -1,11 +1,11 @@
 from flask import Blueprint, request, jsonify
 from controllers.map_controller import MapController
-from services.googlemap_service import GoogleMapService
+from services import registry
 from decorators.auth_decorator import login_required
 
 map_bp = Blueprint('maps', __name__)
 map_controller = MapController()
-map_service = GoogleMapService()
+map_service = registry.google_map_service()
 
 @map_bp.route('/search', methods=['POST'])
 @login_required
@@ -22,10 +22,15 @@ def text_search():
         language_code = data.get('languageCode', 'zh-TW')
         max_results = data.get('maxResultCount', 5)
         
+        resolve_photos = data.get('resolvePhotos', True)
+        profile = data.get('profile')
+        
         result = map_controller.handle_text_search(
             text_query, 
             language_code, 
-            max_results
+            max_results,
+            resolve_photos,
+            profile
         )
         
         if result['success']:
@@ -50,6 +55,8 @@ def text_search_nearby():
         radius = data.get('radius', 5000)
         language_code = data.get('languageCode', 'zh-TW')
         max_results = data.get('maxResultCount', 10)
+        resolve_photos = data.get('resolvePhotos', True)
+        profile = data.get('profile')
         if not location:
             return jsonify({'success': False, 'error': '必須提供location參數'}), 400
         result = map_controller.handle_text_search_nearby(
@@ -57,7 +64,9 @@ def text_search_nearby():
             location,
             radius,
             language_code,
-            max_results
+            max_results,
+            resolve_photos,
+            profile
         )
         if result['success']:
             return jsonify(result), 200
@@ -71,7 +80,7 @@ def text_search_nearby():
 def get_place_details(place_id):
     """獲取地點詳情"""
     try:
-        result = map_controller.handle_place_details(place_id)
+        result = map_controller.handle_place_details(place_id, request.args.get('profile'))
         
         if result['success']:
             return jsonify(result), 200
@@ -239,3 +248,64 @@ def estimate_transit():
             return jsonify(result), 400
     except Exception as e:
         return jsonify({'success': False, 'error': f'服務器錯誤: {str(e)}'}), 500
+
+@map_bp.route('/batch', methods=['POST'])
+@login_required
+def batch_lookup():
+    """一次送出多個地點 / 路線查詢，後端同時執行"""
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({'success': False, 'error': '請求體不能為空'}), 400
+
+        result = map_controller.handle_batch(data.get('calls'))
+
+        if result.get('success'):
+            return jsonify(result), 200
+        else:
+            return jsonify(result), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': f'服務器錯誤: {str(e)}'}), 500
+
+@map_bp.route('/photos', methods=['POST'])
+@login_required
+def resolve_photo_urls():
+    """批次把照片 name（search 回傳的 photos[].name）轉成 CDN URL"""
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({'success': False, 'error': '請求體不能為空'}), 400
+
+        photo_names = data.get('photoNames') or data.get('photo_names')
+        max_height = data.get('maxHeightPx', 400)
+
+        result = map_controller.handle_photo_urls(photo_names, max_height)
+
+        if result.get('success'):
+            return jsonify(result), 200
+        else:
+            return jsonify(result), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': f'服務器錯誤: {str(e)}'}), 500
+
+@map_bp.route('/route_matrix', methods=['POST'])
+@login_required
+def route_matrix():
+    """多個起終點之間的交通時間與距離，rows[i][j] 為 origins[i] 到 destinations[j]"""
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({'success': False, 'error': '請求體不能為空'}), 400
+
+        origins = data.get('origins')
+        destinations = data.get('destinations')
+        mode = str(data.get('mode', 'driving')).lower()
+
+        result = map_controller.handle_route_matrix(origins, destinations, mode)
+
+        if result.get('success'):
+            return jsonify(result), 200
+        else:
+            return jsonify(result), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': f'服務器錯誤: {str(e)}'}), 500
@@ -0,0 +1,101 @@
+import asyncio
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from config import Config
+from services import place_profiles, registry
+
+
+class AsyncGoogleMapService:
+    """
+    GoogleMapService 的非同步版本，讓 controller 一次發出大量查詢。
+
+    每個 coroutine 都在專用的執行緒池裡呼叫同一個 GoogleMapService 實例，
+    快取、single-flight、PlaceIndex 與回傳格式都和同步版完全相同；
+    HTTP 走 services/http_client 的共用連線池。同時進行的上游查詢數以 concurrency 限制
+    （執行緒池大小，加上每個事件迴圈一個 semaphore 避免排隊的工作塞滿執行緒池）。
+    """
+
+    # 可以用 call_many / run_many 依名稱呼叫的方法
+    METHODS = ('search_places', 'search_places_nearby', 'get_place_details', 'compute_routes', 'resolve_photo_url')
+
+    def __init__(self, map_service=None, concurrency: Optional[int] = None):
+        self.map_service = map_service or registry.google_map_service()
+        self.concurrency = max(concurrency or Config.GOOGLE_ASYNC_CONCURRENCY, 1)
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='maps-async')
+        self._semaphores = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        """asyncio.Semaphore 只能在建立它的事件迴圈使用，每個迴圈各自一個"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            semaphore = self._semaphores.get(loop)
+            if semaphore is None:
+                semaphore = self._semaphores[loop] = asyncio.Semaphore(self.concurrency)
+            return semaphore
+
+    async def _call(self, func, *args, **kwargs):
+        async with self._semaphore():
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, lambda: func(*args, **kwargs))
+
+    async def search_places(self, text_query: str, language_code: str = "zh-TW", max_results: int = 5,
+                            resolve_photos: bool = True, profile: Optional[str] = None):
+        return await self._call(
+            self.map_service.search_places, text_query, language_code, max_results, resolve_photos,
+            profile or self.map_service.SEARCH_DEFAULT_PROFILE
+        )
+
+    async def search_places_nearby(self, text_query: str, location: Dict, radius: int = 5000,
+                                   language_code: str = "zh-TW", max_results: int = 10, resolve_photos: bool = True,
+                                   profile: Optional[str] = None):
+        return await self._call(
+            self.map_service.search_places_nearby, text_query, location, radius, language_code, max_results,
+            resolve_photos, profile or self.map_service.NEARBY_DEFAULT_PROFILE
+        )
+
+    async def get_place_details(self, place_id_or_name: str, is_name: bool = False, profile: Optional[str] = None):
+        return await self._call(
+            self.map_service.get_place_details, place_id_or_name, is_name,
+            profile or self.map_service.DETAILS_DEFAULT_PROFILE
+        )
+
+    async def compute_routes(self, origin: Dict, destination: Dict, mode: str = 'driving'):
+        return await self._call(self.map_service.compute_routes, origin, destination, mode)
+
+    async def resolve_photo_url(self, photo_name: str, max_height: int = 400) -> str:
+        return await self._call(self.map_service._resolve_photo_url, photo_name, max_height)
+
+    async def call_many(self, calls: List[Dict]) -> List:
+        """
+        同時執行多個查詢，calls 的每一項為 {'method': 方法名稱, 'args': {參數}}，
+        回傳與 calls 對齊的結果；單一查詢失敗時該項回傳錯誤結果，不影響其他查詢。
+        """
+        async def one(call):
+            method = call.get('method')
+            if method not in self.METHODS:
+                return {'success': False, 'error': f'不支援的方法: {method}', 'error_type': 'INVALID_INPUT'}
+            args = call.get('args') or {}
+            if not isinstance(args, dict):
+                return {'success': False, 'error': 'args 必須是物件', 'error_type': 'INVALID_INPUT'}
+            profile = args.get('profile')
+            if profile is not None and not place_profiles.is_valid(profile):
+                return {'success': False, 'error': f'不支援的 profile: {profile}', 'error_type': 'INVALID_INPUT'}
+            try:
+                return await getattr(self, method)(**args)
+            except TypeError as e:
+                return {'success': False, 'error': f'參數錯誤: {e}', 'error_type': 'INVALID_INPUT'}
+            except Exception as e:
+                return {'success': False, 'error': str(e), 'error_type': 'UNKNOWN_ERROR'}
+
+        return await asyncio.gather(*(one(call) for call in calls))
+
+    def run_many(self, calls: List[Dict]) -> List:
+        """call_many 的同步版本，給 Flask 的同步 view / controller 使用"""
+        return asyncio.run(self.call_many(calls))
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,86 @@
+"""
+快取 key 正規化
+
+同一個查詢常因為字串或座標的細微差異而組出不同的 key，例如「東京車站」和「東京車站 」、
+全形與半形英數、或是小數點第 7 位不同的座標。這裡把文字與座標轉成標準形式後再組 key：
+  - 文字：Unicode NFKC（全形轉半形、半形片假名轉全形）、casefold、連續空白合併成一個並去頭尾
+  - 座標：轉成指定精度的 geohash，同一格內的座標共用同一個 key
+GoogleMapService 所有會寫快取的方法都透過這裡組 key，前綴需與 models/cache_namespaces.py 一致。
+"""
+import re
+import unicodedata
+from typing import Dict
+
+from config import Config
+from services.geo import geohash
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_text(text) -> str:
+    """NFKC + casefold + 空白正規化"""
+    if text is None:
+        return ''
+    text = unicodedata.normalize('NFKC', str(text)).casefold()
+    return _WHITESPACE.sub(' ', text).strip()
+
+
+def location_cell(location: Dict, precision: int = None) -> str:
+    """把 {'latitude', 'longitude'} 轉成 geohash 格子；座標不完整時退回原始值"""
+    precision = precision or Config.CACHE_KEY_GEOHASH_PRECISION
+    latitude = location.get('latitude') if location else None
+    longitude = location.get('longitude') if location else None
+    try:
+        return geohash(float(latitude), float(longitude), precision)
+    except (TypeError, ValueError):
+        return f"{latitude}_{longitude}"
+
+
+def search_key(text_query: str, language_code: str = 'zh-TW', max_results: int = 5) -> str:
+    return f"search_{normalize_text(text_query)}_{normalize_text(language_code)}_{max_results}"
+
+
+def search_nearby_key(text_query: str, location: Dict, max_results: int = 10) -> str:
+    return f"search_nearby_{normalize_text(text_query)}_{location_cell(location)}_{max_results}"
+
+
+def profile_key(base_key: str, profile: str, default_profile: str) -> str:
+    """非預設的欄位 profile（見 services/place_profiles.py）加在 key 後面，預設 profile 維持原本的 key"""
+    return base_key if profile == default_profile else f"{base_key}_{profile}"
+
+
+def photo_names_key(search_cache_key: str) -> str:
+    """search_places(resolve_photos=False) 的結果只有照片 name，和完整結果分開存"""
+    return f"{search_cache_key}_names"
+
+
+def details_key(place_id: str, language_code: str = 'zh-TW') -> str:
+    return f"details_{str(place_id).strip()}_{normalize_text(language_code)}"
+
+
+def business_key(place_id: str, language_code: str = 'zh-TW') -> str:
+    return f"business_{str(place_id).strip()}_{normalize_text(language_code)}"
+
+
+def place_name_key(name: str, language_code: str = 'zh-TW') -> str:
+    return f"place_name_{normalize_text(name)}_{normalize_text(language_code)}"
+
+
+def photo_key(photo_name: str, max_height: int) -> str:
+    return f"photo_cdn_{str(photo_name).strip()}_{max_height}"
+
+
+def distance_key(origin: str, destination: str, mode: str) -> str:
+    return f"distance_{normalize_text(origin)}_{normalize_text(destination)}_{normalize_text(mode)}"
+
+
+def route_key(origin: str, destination: str, mode: str) -> str:
+    return f"route_{normalize_text(origin)}_{normalize_text(destination)}_{normalize_text(mode)}"
+
+
+def routes_v2_key(origin: Dict, destination: Dict, mode: str) -> str:
+    precision = Config.CACHE_ROUTE_GEOHASH_PRECISION
+    return (
+        f"routes_v2_{location_cell(origin, precision)}_"
+        f"{location_cell(destination, precision)}_{normalize_text(mode)}"
+    )
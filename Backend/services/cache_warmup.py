@@ -0,0 +1,155 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+from models import cache_metrics as metrics
+from models.cache_metrics import cache_metrics
+
+
+class CacheWarmupService:
+    """
+    快取預熱：把行程的景點清單照 enrich_data_with_location 的流程跑一次，
+    讓 search_、search_nearby_、photo_cdn_ 等快取在真正的使用者來之前就先建好。
+    """
+
+    def __init__(self, data_fix_service, travel_service=None):
+        self.data_fix_service = data_fix_service
+        self.travel_service = travel_service
+
+    @staticmethod
+    def _load_json(value):
+        if isinstance(value, str):
+            try:
+                return json.loads(value)
+            except ValueError:
+                return None
+        return value
+
+    @classmethod
+    def to_data_json(cls, data_json=None, data_latlng=None, days=None):
+        """
+        把各種來源的景點清單轉成 enrich_data_with_location 的輸入格式：
+          - data_json：{"data": [{"day": 1, "location": [{"location_name": ...}]}]}
+          - data_latlng：[{"day": 1, "locations": [{"location_name": ...}]}]
+          - days：[["景點 A", "景點 B"], ...]（種子檔用）
+        """
+        data_json = cls._load_json(data_json)
+        if isinstance(data_json, dict) and data_json.get('data'):
+            return data_json
+
+        if days:
+            return {'data': [
+                {'day': index + 1, 'location': [{'location_name': name} for name in names if name]}
+                for index, names in enumerate(days)
+            ]}
+
+        data_latlng = cls._load_json(data_latlng)
+        if isinstance(data_latlng, list) and data_latlng:
+            return {'data': [
+                {
+                    'day': day.get('day', index + 1),
+                    'location': [
+                        {'location_name': loc.get('location_name')}
+                        for loc in day.get('locations', [])
+                        if loc.get('location_name')
+                    ],
+                }
+                for index, day in enumerate(data_latlng)
+            ]}
+        return None
+
+    @staticmethod
+    def _signature(destination, data_json):
+        return destination or '', tuple(
+            tuple(loc.get('location_name', '') for loc in day.get('location', []))
+            for day in data_json.get('data', [])
+        )
+
+    @staticmethod
+    def _upstream_calls():
+        """目前為止未命中快取、需要呼叫上游的次數"""
+        return sum(
+            item['requests'][metrics.MISS]
+            for item in cache_metrics.snapshot()['namespaces'].values()
+        )
+
+    def _warm_cards(self, result):
+        """
+        enrich_data_with_location 的中心點只用 geo profile 查（較精簡的結果回答不了 card / full 請求），
+        景點則以當天中心點為圓心搜尋，兩者都和之後卡片查詢的 key 不同。
+        這裡另外重播 enrich_data_with_picture 與聊天卡片對每個景點的查詢（含照片 URL）：
+        有座標的用 500 公尺的 nearby 搜尋（card），沒有的用全域搜尋（full）。
+        """
+        map_service = self.data_fix_service.google_map_service
+        for day in result.get('data', []):
+            for loc in day.get('locations', []):
+                name = loc.get('location_name')
+                if not name:
+                    continue
+                location = loc.get('location') or {}
+                if location.get('latitude') is not None and location.get('longitude') is not None:
+                    map_service.search_places_nearby(
+                        text_query=name,
+                        location={'latitude': location['latitude'], 'longitude': location['longitude']},
+                        radius=500,
+                        language_code='zh-TW',
+                        max_results=1
+                    )
+                else:
+                    map_service.search_places(name, language_code='zh-TW', max_results=1)
+
+    def warm_itinerary(self, destination, data_json):
+        """跑一次景點查詢與卡片查詢，回傳是否成功"""
+        try:
+            result = self.data_fix_service.enrich_data_with_location(data_json, destination)
+            if result.get('success'):
+                self._warm_cards(result)
+            return bool(result.get('success'))
+        except Exception as e:
+            print(f"[warmup] {destination} 預熱失敗: {e}")
+            return False
+
+    def warm(self, itineraries, workers=2):
+        """
+        itineraries 為 [{"destination": ..., "data_json"/"data_latlng"/"days": ...}]，
+        景點清單相同的行程只跑一次。回傳預熱報告。
+        """
+        jobs = {}
+        invalid = 0
+        for item in itineraries:
+            data_json = self.to_data_json(item.get('data_json'), item.get('data_latlng'), item.get('days'))
+            if not data_json:
+                invalid += 1
+                continue
+            jobs.setdefault(self._signature(item.get('destination'), data_json), (item.get('destination'), data_json))
+
+        upstream_before = self._upstream_calls()
+        with ThreadPoolExecutor(max_workers=max(workers, 1), thread_name_prefix='cache-warmup') as executor:
+            results = list(executor.map(lambda job: self.warm_itinerary(*job), jobs.values()))
+
+        return {
+            'itineraries': len(jobs),
+            'succeeded': sum(results),
+            'failed': len(results) - sum(results),
+            'invalid': invalid,
+            'duplicates': len(itineraries) - len(jobs) - invalid,
+            'upstream_calls': self._upstream_calls() - upstream_before,
+        }
+
+    def warm_recent(self, limit=50, since_days=30, workers=2):
+        """重播最近建立的行程"""
+        if self.travel_service is None:
+            raise ValueError('沒有 TravelService，無法讀取最近的行程')
+        rows = self.travel_service.get_recent_itineraries(limit, since_days)
+        return self.warm([dict(row) for row in rows], workers)
+
+    def warm_from_seed(self, path, workers=2):
+        """
+        讀取種子檔（JSON 陣列）預熱，每筆格式：
+          {"destination": "大阪", "days": [["大阪城公園", "梅田藍天大廈"], ["新世界"]]}
+        也接受 data_json / data_latlng 欄位。
+        """
+        with open(path, 'r', encoding='utf-8') as f:
+            seeds = json.load(f)
+        if not isinstance(seeds, list):
+            raise ValueError('種子檔必須是 JSON 陣列')
+        return self.warm(seeds, workers)
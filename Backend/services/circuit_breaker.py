@@ -0,0 +1,228 @@
+"""
+上游 API 的斷路器（circuit breaker）
+
+Places、Routes 或 Gemini 部分故障時，每個請求仍會等滿 requests 的逾時或整個生成時間，
+Flask 的執行緒很快就被卡住。每個上游 API（名稱和 services/quota.py 相同）各有一個斷路器：
+  - closed：正常呼叫，記錄最近 window_seconds 秒的成功與失敗
+  - open：失敗比例達到 failure_rate（且至少 min_requests 次呼叫）時打開，
+    open_seconds 秒內所有呼叫直接拋出 CircuitOpen，不送出請求
+  - half_open：時間到後只放行 half_open_probes 個試探請求，成功就關閉，失敗再打開
+
+呼叫端拿到 CIRCUIT_OPEN 的結果後自行降級（回傳快取、略過照片、用估算值），而不是卡住等逾時。
+狀態只在行程內共用，每個 worker 各自判斷。
+"""
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+from config import Config
+from services import quota
+
+
+class CircuitOpen(Exception):
+    """斷路器打開中，請求沒有送出"""
+
+    def __init__(self, name: str, retry_after: float):
+        self.name = name
+        self.retry_after = retry_after
+        super().__init__(f"{name} 暫時無法使用，請 {max(retry_after, 0.1):.1f} 秒後再試")
+
+    def result(self) -> Dict:
+        """GoogleMapService 的錯誤結果格式；CIRCUIT_OPEN 不會寫進負向快取"""
+        return {
+            'success': False,
+            'error': str(self),
+            'error_type': 'CIRCUIT_OPEN',
+            'retry_after': round(self.retry_after, 2),
+        }
+
+
+class CircuitBreaker:
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name: str, failure_rate: float, min_requests: int, window_seconds: float,
+                 open_seconds: float, half_open_probes: int = 1):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_requests = max(min_requests, 1)
+        self.window_seconds = window_seconds
+        self.open_seconds = open_seconds
+        self.half_open_probes = max(half_open_probes, 1)
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._outcomes = deque()  # (時間, 是否失敗)
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self._opened_count = 0
+        self._rejected = 0
+
+    def _prune(self, now: float):
+        while self._outcomes and now - self._outcomes[0][0] > self.window_seconds:
+            _, failed = self._outcomes.popleft()
+            self._failures -= failed
+
+    def _open(self, now: float):
+        self._state = self.OPEN
+        self._opened_at = now
+        self._probes = 0
+        self._opened_count += 1
+        print(f"[circuit] {self.name} 斷路器打開，{self.open_seconds:g} 秒內直接回傳錯誤")
+
+    def _close(self):
+        self._state = self.CLOSED
+        self._outcomes.clear()
+        self._failures = 0
+        self._probes = 0
+
+    def before_call(self):
+        """呼叫前檢查，不允許時拋出 CircuitOpen；half_open 時會佔用一個試探名額"""
+        now = time.monotonic()
+        with self._lock:
+            if self._state == self.OPEN:
+                remaining = self.open_seconds - (now - self._opened_at)
+                if remaining > 0:
+                    self._rejected += 1
+                    raise CircuitOpen(self.name, remaining)
+                self._state = self.HALF_OPEN
+                self._probes = 0
+            if self._state == self.HALF_OPEN:
+                if self._probes >= self.half_open_probes:
+                    self._rejected += 1
+                    raise CircuitOpen(self.name, self.open_seconds)
+                self._probes += 1
+
+    def record_success(self):
+        now = time.monotonic()
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._close()
+                return
+            self._outcomes.append((now, False))
+            self._prune(now)
+
+    def record_failure(self):
+        now = time.monotonic()
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._open(now)
+                return
+            if self._state == self.OPEN:
+                return
+            self._outcomes.append((now, True))
+            self._failures += 1
+            self._prune(now)
+            total = len(self._outcomes)
+            if total >= self.min_requests and self._failures / total >= self.failure_rate:
+                self._open(now)
+
+    def release(self):
+        """呼叫沒有送出（例如配額不足），歸還試探名額，不計成敗"""
+        with self._lock:
+            if self._state == self.HALF_OPEN and self._probes > 0:
+                self._probes -= 1
+
+    def is_open(self) -> bool:
+        """目前是否會直接拒絕呼叫（不佔用試探名額）"""
+        with self._lock:
+            if self._state == self.OPEN:
+                return time.monotonic() - self._opened_at < self.open_seconds
+            return self._state == self.HALF_OPEN and self._probes >= self.half_open_probes
+
+    def snapshot(self) -> Dict:
+        now = time.monotonic()
+        with self._lock:
+            self._prune(now)
+            total = len(self._outcomes)
+            return {
+                'state': self._state,
+                'window_requests': total,
+                'window_failure_rate': round(self._failures / total, 4) if total else 0,
+                'opened_count': self._opened_count,
+                'rejected': self._rejected,
+                'retry_after': (
+                    round(max(self.open_seconds - (now - self._opened_at), 0), 2)
+                    if self._state == self.OPEN else 0
+                ),
+            }
+
+
+class CircuitBreakers:
+    """依上游 API 名稱建立與取得斷路器"""
+
+    def __init__(self, enabled: Optional[bool] = None, overrides: Optional[Dict[str, Dict]] = None):
+        self.enabled = Config.CIRCUIT_BREAKER_ENABLED if enabled is None else enabled
+        # Gemini 呼叫次數少，較少的失敗、較長的視窗就要打開
+        self.overrides = overrides if overrides is not None else {
+            'gemini.generate': {
+                'min_requests': Config.CIRCUIT_GEMINI_MIN_REQUESTS,
+                'window_seconds': Config.CIRCUIT_GEMINI_WINDOW_SECONDS,
+            },
+        }
+        self._lock = threading.Lock()
+        self._breakers = {}
+
+    def get(self, name: Optional[str]) -> Optional[CircuitBreaker]:
+        """停用或名稱為 None（不屬於任何上游 API）時回傳 None"""
+        if not self.enabled or name is None:
+            return None
+        with self._lock:
+            breaker = self._breakers.get(name)
+            if breaker is None:
+                settings = {
+                    'failure_rate': Config.CIRCUIT_FAILURE_RATE,
+                    'min_requests': Config.CIRCUIT_MIN_REQUESTS,
+                    'window_seconds': Config.CIRCUIT_WINDOW_SECONDS,
+                    'open_seconds': Config.CIRCUIT_OPEN_SECONDS,
+                    'half_open_probes': Config.CIRCUIT_HALF_OPEN_PROBES,
+                    **self.overrides.get(name, {}),
+                }
+                breaker = self._breakers[name] = CircuitBreaker(name, **settings)
+            return breaker
+
+    def is_open(self, name: str) -> bool:
+        breaker = self.get(name)
+        return breaker is not None and breaker.is_open()
+
+    def call(self, name: Optional[str], func, is_failure=None, ignore=(), unless=()):
+        """
+        在斷路器保護下呼叫 func()，斷路器打開時拋出 CircuitOpen。
+        func 拋出例外算失敗（ignore 列出的例外代表上游有正常回應，算成功，
+        但屬於 unless 的仍算失敗，例如 4xx 裡的 429）；
+        is_failure(回傳值) 為 True 時也算失敗。QuotaExceeded 表示請求沒送出，不計成敗。
+        """
+        breaker = self.get(name)
+        if breaker is None:
+            return func()
+        breaker.before_call()
+        try:
+            result = func()
+        except quota.QuotaExceeded:
+            breaker.release()
+            raise
+        except Exception as error:
+            if isinstance(error, ignore) and not isinstance(error, unless):
+                breaker.record_success()
+            else:
+                breaker.record_failure()
+            raise
+        if is_failure is not None and is_failure(result):
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        return result
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {
+            'enabled': self.enabled,
+            'breakers': {name: breaker.snapshot() for name, breaker in breakers.items()},
+        }
+
+
+# 同一行程內所有服務共用
+circuit_breakers = CircuitBreakers()
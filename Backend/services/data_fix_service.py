@@ -1,6 +1,6 @@
 import math
 
-from services.googlemap_service import GoogleMapService
+from services import registry
 
 
 class DataFixService:
@@ -9,8 +9,18 @@ class DataFixService:
     負責增強行程數據的位置坐標信息
     """
     
-    def __init__(self):
-        self.google_map_service = GoogleMapService()
+    MAX_DISTANCE_KM = 500
+
+    def __init__(self, google_map_service=None):
+        self.google_map_service = google_map_service or registry.google_map_service()
+
+    @staticmethod
+    def _has_valid_latlng(location):
+        return (
+            isinstance(location, dict)
+            and location.get('lat') not in (None, 0)
+            and location.get('lng') not in (None, 0)
+        )
 
     @staticmethod
     def _calculate_distance_km(origin, target):
@@ -36,6 +46,73 @@ class DataFixService:
         c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
         return earth_radius_km * c
     
+    def _prefetch_day_chains(self, days, center_location):
+        """
+        批次預取每天的 nearby 搜尋快取。
+        同一天的景點以前一個景點為中心搜尋，所以每一輪只能往前推進一站：
+        每輪用一次 get_many 查出所有天數的下一站，命中就用快取結果推出下一個中心點，
+        直到遇到未命中（之後需要呼叫 Google 的地點）為止。
+        """
+        chains = [
+            [loc.get('location_name', '') for loc in day.get('location', [])]
+            for day in days
+        ]
+        centers = [center_location] * len(chains)
+        positions = [0] * len(chains)
+        active = [index for index, chain in enumerate(chains) if chain]
+
+        while active:
+            queries = [{
+                'text_query': chains[index][positions[index]],
+                'location': centers[index],
+                'max_results': 1
+            } for index in active]
+            results = self.google_map_service.prefetch_searches(queries)
+
+            next_active = []
+            for index, result in zip(active, results):
+                if result is None:
+                    continue
+                if result.get('success') and result.get('places'):
+                    location = result['places'][0].get('location', {})
+                    distance_km = self._calculate_distance_km(center_location, location)
+                    if distance_km is not None and distance_km <= self.MAX_DISTANCE_KM:
+                        centers[index] = {
+                            'latitude': location['latitude'],
+                            'longitude': location['longitude']
+                        }
+                positions[index] += 1
+                if positions[index] < len(chains[index]):
+                    next_active.append(index)
+            active = next_active
+
+    def _prefetch_picture_searches(self, days, spot_images_map=None):
+        """把 enrich_data_with_picture 需要搜尋的地點先一次批次查快取"""
+        queries = []
+        for day in days:
+            for loc in day.get('location', []):
+                place_name = loc.get('place_name', '未命名')
+                if not place_name or place_name == '未命名':
+                    continue
+                cached = spot_images_map.get(place_name) if spot_images_map else None
+                if (cached and cached.get('photo_url')) or str(loc.get('photo_url') or '').strip():
+                    continue
+                existing_location = loc.get('location', {'lat': 0, 'lng': 0})
+                if self._has_valid_latlng(existing_location):
+                    queries.append({
+                        'text_query': place_name,
+                        'location': {
+                            'latitude': existing_location['lat'],
+                            'longitude': existing_location['lng'],
+                        },
+                        'max_results': 1
+                    })
+                else:
+                    queries.append({'text_query': place_name, 'language_code': 'zh-TW', 'max_results': 1})
+
+        if queries:
+            self.google_map_service.prefetch_searches(queries)
+
     def enrich_data_with_location(self, data, destination=None):
         output_data = []
         center_location = None
@@ -48,7 +125,8 @@ class DataFixService:
             dest_result = self.google_map_service.search_places(
                 text_query=destination,
                 language_code='zh-TW',
-                max_results=1
+                max_results=1,
+                profile='geo'
             )
             if dest_result.get('success') and dest_result.get('places'):
                 place = dest_result['places'][0]
@@ -70,7 +148,8 @@ class DataFixService:
                     search_result = self.google_map_service.search_places(
                         text_query=location_name,
                         language_code='zh-TW',
-                        max_results=1
+                        max_results=1,
+                        profile='geo'
                     )
                     if search_result.get('success') and search_result.get('places'):
                         place = search_result['places'][0]
@@ -93,8 +172,11 @@ class DataFixService:
             }
 
         # 第二步：查詢所有地點
+        # 景點用預設 profile（含照片 URL）搜尋，快取預熱才會建好 UI 讀的 search_nearby_ 與 photo_cdn_；
+        # 只有上面的中心點 geocode 用 geo
         print(f"開始查詢剩餘地點")
         destination_center = center_location  # 保留目的地中心點作為每日重置基準
+        self._prefetch_day_chains(days, destination_center)
         for day in days:
             day_result = {
                 "day": day.get("day"),
@@ -128,8 +210,8 @@ class DataFixService:
                         print(f"跳過 {location_name}，無法計算距離（坐標不完整）")
                         continue
 
-                    if distance_km > 500:
-                        print(f"跳過 {location_name}，距目的地 {distance_km:.2f} 公里，超過 500 公里")
+                    if distance_km > self.MAX_DISTANCE_KM:
+                        print(f"跳過 {location_name}，距目的地 {distance_km:.2f} 公里，超過 {self.MAX_DISTANCE_KM} 公里")
                         continue
 
                     day_result["locations"].append({
@@ -159,6 +241,7 @@ class DataFixService:
     def enrich_data_with_picture(self, days, spot_images_map=None):
         """增強詳細行程格式 (location 字段) 的圖片信息"""
         modified_days = []
+        self._prefetch_picture_searches(days, spot_images_map)
 
         for day in days:
             modified_day = {
@@ -211,11 +294,7 @@ class DataFixService:
                 # 使用 search_places 獲取圖片
                 place_name = modified_loc['place_name']
                 existing_location = modified_loc.get('location')
-                has_valid_location = (
-                    isinstance(existing_location, dict)
-                    and existing_location.get('lat') not in (None, 0)
-                    and existing_location.get('lng') not in (None, 0)
-                )
+                has_valid_location = self._has_valid_latlng(existing_location)
                 print(f"[enrich_picture] {place_name} | 既有座標={existing_location} | 有效={has_valid_location}")
                 if place_name and place_name != '未命名':
                     try:
@@ -1,10 +1,12 @@
 import json
 import re
 import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
 from config import Config
 from datetime import datetime
-from services.googlemap_service import GoogleMapService
-from services.data_fix_service import DataFixService
+from services import registry
+from services.circuit_breaker import circuit_breakers
+from services.quota import quota_manager
 
 
 with open("test.json", "r", encoding="utf-8") as f:
@@ -12,7 +14,7 @@ with open("test.json", "r", encoding="utf-8") as f:
 
 
 class GeminiService:
-    def __init__(self):
+    def __init__(self, map_service=None, data_fix_service=None):
         genai.configure(api_key=Config.GEMINI_API_KEY)
         self.system_prompt = (
             "你是一個旅遊規劃 AI，說話風格簡潔自然，像朋友聊天一樣。"
@@ -27,8 +29,8 @@ class GeminiService:
             "gemini-2.5-flash",
             system_instruction=self.system_prompt,
         )
-        self.map_service = GoogleMapService()
-        self.data_fix_service = DataFixService()
+        self.map_service = map_service or registry.google_map_service()
+        self.data_fix_service = data_fix_service or registry.data_fix_service()
 
         # 配置生成參數
         self.generation_config = {
@@ -38,6 +40,30 @@ class GeminiService:
             "max_output_tokens": 9999,  # revised
         }
 
+    def _guarded(self, func):
+        """
+        在 Gemini 的斷路器（services/circuit_breaker.py）保護下取得配額（services/quota.py）並呼叫；
+        斷路器打開時直接拋出 CircuitOpen，由各方法的 except 回傳錯誤，不再等待整個生成逾時。
+        4xx（ClientError）代表請求本身的問題，不算 Gemini 故障；
+        429（TooManyRequests / ResourceExhausted）是 Gemini 過載或配額用完，和 5xx 一樣算失敗。
+        """
+        def call():
+            quota_manager.acquire("gemini.generate")
+            return func()
+
+        return circuit_breakers.call(
+            "gemini.generate", call,
+            ignore=(google_exceptions.ClientError,),
+            unless=(google_exceptions.TooManyRequests, google_exceptions.ResourceExhausted),
+        )
+
+    def _generate(self, prompt, **kwargs):
+        return self._guarded(lambda: self.model.generate_content(prompt, **kwargs))
+
+    def _send_message(self, chat, message):
+        """對話的每次 send_message 也是一次生成，和 generate_content 共用配額與斷路器"""
+        return self._guarded(lambda: chat.send_message(message))
+
     def _extract_itinerary_spot_names(self, current_itinerary, ai_text=""):
         """從目前行程中整理可查圖的景點名稱，優先取出現在回覆有提到的景點。"""
         if not isinstance(current_itinerary, list) or not current_itinerary:
@@ -180,6 +206,44 @@ class GeminiService:
         parsed_json[day_key] = itinerary_days
         return parsed_json
 
+    def _prefetch_spot_searches(self, current_itinerary, latlng_map):
+        """把 _build_spot_image_cards 需要搜尋的景點先一次批次查快取。"""
+        queries = []
+        for day in current_itinerary:
+            if not isinstance(day, dict):
+                continue
+            activities = day.get("activities") or day.get("location") or day.get("locations") or []
+            if not isinstance(activities, list):
+                continue
+            for activity in activities:
+                if not isinstance(activity, dict) or (activity.get("photo_url") or "").strip():
+                    continue
+                spot_name = (
+                    activity.get("place_name")
+                    or activity.get("location_name")
+                    or activity.get("name")
+                    or ""
+                ).strip()
+                if not spot_name:
+                    continue
+                existing_location = latlng_map.get(spot_name)
+                if existing_location:
+                    queries.append(
+                        {
+                            "text_query": spot_name,
+                            "location": {
+                                "latitude": existing_location["lat"],
+                                "longitude": existing_location["lng"],
+                            },
+                            "max_results": 1,
+                        }
+                    )
+                else:
+                    queries.append({"text_query": spot_name, "language_code": "zh-TW", "max_results": 1})
+
+        if queries:
+            self.map_service.prefetch_searches(queries)
+
     def _build_spot_image_cards(self, current_itinerary, ai_text="", latlng_itinerary=None):
         """把已綁定的 photo_url 轉成聊天室可用的圖片卡片，並保留行程順序。"""
         cards = []
@@ -202,6 +266,8 @@ class GeminiService:
                     if name and lat not in (None, 0) and lng not in (None, 0):
                         latlng_map[name] = {"lat": lat, "lng": lng}
 
+        self._prefetch_spot_searches(current_itinerary, latlng_map)
+
         for day in current_itinerary:
             if not isinstance(day, dict):
                 continue
@@ -589,7 +655,7 @@ class GeminiService:
             }}
             """
 
-            response = self.model.generate_content(
+            response = self._generate(
                 prompt, generation_config=self.generation_config
             )
 
@@ -649,7 +715,7 @@ class GeminiService:
 {itinerary_text}
 """
 
-            response = self.model.generate_content(
+            response = self._generate(
                 prompt, generation_config=self.generation_config
             )
             readable_text = self._strip_markdown_text(response.text)
@@ -809,7 +875,7 @@ class GeminiService:
                     "請直接根據已知資訊給出具體建議，不得反問使用者任何問題。"
                 )
 
-            response = chat.send_message(final_message)
+            response = self._send_message(chat, final_message)
             ai_content = self._strip_markdown_text(response.text)
             spot_images = self._build_spot_image_cards(current_itinerary, ai_content, latlng_itinerary=latlng_itinerary)
             parsed_payload = None
@@ -920,7 +986,7 @@ class GeminiService:
 }}
 """
 
-            response = self.model.generate_content(
+            response = self._generate(
                 prompt, generation_config=self.generation_config
             )
             raw_content, cleaned_json, parsed_json = self._parse_response_json(response)
@@ -969,7 +1035,7 @@ class GeminiService:
 6. 不要輸出除了 time、cost 以外的欄位。
 """
 
-            response = self.model.generate_content(
+            response = self._generate(
                 prompt, generation_config=self.generation_config
             )
             raw_content, cleaned_json, parsed_json = self._parse_response_json(response)
@@ -1123,7 +1189,7 @@ class GeminiService:
             # 交通建議請在兩三句話內結束，不要有容辭贅字。
             # 請想辦法讓生成資料的時間減少。
             # """
-            response = self.model.generate_content(
+            response = self._generate(
                 prompt, generation_config=self.generation_config
             )
 
@@ -1290,7 +1356,7 @@ class GeminiService:
             7. 只回傳純 JSON，不要有任何 markdown 標記或額外說明。
             """
 
-            response = self.model.generate_content(
+            response = self._generate(
                 prompt, generation_config=self.generation_config
             )
 
@@ -1316,7 +1382,7 @@ class GeminiService:
             只回傳純 JSON，不要包含任何 markdown 標記。
             """
 
-            response = self.model.generate_content(
+            response = self._generate(
                 prompt, generation_config=self.generation_config
             )
 
@@ -1352,7 +1418,7 @@ class GeminiService:
             只回傳純 JSON，不要包含任何 markdown 標記。
             """
 
-            response = self.model.generate_content(
+            response = self._generate(
                 prompt, generation_config=self.generation_config
             )
 
@@ -0,0 +1,100 @@
+"""
+座標相關的小工具：geohash 編碼、涵蓋圓形範圍的 geohash 格子、兩點距離
+"""
+import math
+from typing import Dict, List, Optional, Tuple
+
+EARTH_RADIUS_KM = 6371
+KM_PER_DEGREE = 111.32
+_GEOHASH_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+
+def geohash(latitude: float, longitude: float, precision: int) -> str:
+    """標準 geohash 編碼（base32），precision 為字元數"""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(chars) < precision:
+        value, bounds = (longitude, lng_range) if even else (latitude, lat_range)
+        mid = (bounds[0] + bounds[1]) / 2
+        bits <<= 1
+        if value >= mid:
+            bits |= 1
+            bounds[0] = mid
+        else:
+            bounds[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_GEOHASH_BASE32[bits])
+            bits = 0
+            bit_count = 0
+    return ''.join(chars)
+
+
+def prefix_upper_bound(prefix: str) -> Optional[str]:
+    """
+    以 prefix 開頭的 geohash 都落在 [prefix, 回傳值) 之間（base32 字元依序遞增，進位處理最後的 'z'），
+    讓查詢能用 geohash 欄位的 B-tree 索引做範圍掃描；prefix 全是 'z' 時沒有上界，回傳 None。
+    """
+    chars = list(prefix)
+    while chars:
+        index = _GEOHASH_BASE32.index(chars[-1])
+        if index + 1 < len(_GEOHASH_BASE32):
+            chars[-1] = _GEOHASH_BASE32[index + 1]
+            return ''.join(chars)
+        chars.pop()
+    return None
+
+
+def cell_size_degrees(precision: int) -> Tuple[float, float]:
+    """geohash 格子的 (緯度高, 經度寬)，單位為度"""
+    bits = precision * 5
+    return 180 / 2 ** (bits // 2), 360 / 2 ** ((bits + 1) // 2)
+
+
+def covering_cells(location: Dict, radius_m: float, max_precision: int = 9) -> Tuple[int, List[str]]:
+    """
+    回傳 (precision, 格子清單)：選最細、但格子仍不小於半徑的精度，
+    取中心所在格子與周圍 8 格，保證涵蓋以 location 為圓心、radius_m 為半徑的範圍。
+    """
+    latitude, longitude = float(location['latitude']), float(location['longitude'])
+    radius_km = max(radius_m, 1) / 1000
+    lat_span = radius_km / KM_PER_DEGREE
+    lng_span = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(latitude)), 0.01))
+
+    precision = 1
+    for candidate in range(max_precision, 0, -1):
+        cell_lat, cell_lng = cell_size_degrees(candidate)
+        if cell_lat >= lat_span and cell_lng >= lng_span:
+            precision = candidate
+            break
+
+    cell_lat, cell_lng = cell_size_degrees(precision)
+    cells = []
+    for d_lat in (-1, 0, 1):
+        for d_lng in (-1, 0, 1):
+            lat = min(max(latitude + d_lat * cell_lat, -89.999999), 89.999999)
+            lng = (longitude + d_lng * cell_lng + 180) % 360 - 180
+            cell = geohash(lat, lng, precision)
+            if cell not in cells:
+                cells.append(cell)
+    return precision, cells
+
+
+def distance_km(origin: Dict, target: Dict) -> Optional[float]:
+    """Haversine 距離（公里），座標不完整時回傳 None"""
+    lat1, lon1 = origin.get('latitude'), origin.get('longitude')
+    lat2, lon2 = target.get('latitude'), target.get('longitude')
+    if None in (lat1, lon1, lat2, lon2):
+        return None
+    d_lat = math.radians(lat2 - lat1)
+    d_lon = math.radians(lon2 - lon1)
+    a = (
+        math.sin(d_lat / 2) ** 2
+        + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(d_lon / 2) ** 2
+    )
+    return EARTH_RADIUS_KM * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
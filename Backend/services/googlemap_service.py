@@ -1,90 +1,469 @@
+import math
+import threading
+import time
 import requests
+from concurrent.futures import ThreadPoolExecutor, wait
 from typing import Optional, Dict, List
 from config import Config
 from models.cache_model import PlaceCache
+from models import cache_metrics as metrics
+from models.cache_metrics import cache_metrics
+from models.cache_namespaces import NEGATIVE_PREFIX, namespace_of
+from services import cache_keys, geo, http_client, place_profiles
+from services.circuit_breaker import circuit_breakers
+from services.place_index import PlaceIndex, without_photo_urls
+from services.singleflight import SingleFlight
 from datetime import datetime, timezone
 
+# 同一行程內所有 GoogleMapService 共用，跨實例合併相同的上游請求
+single_flight = SingleFlight()
+
+# 可以當作負向快取的錯誤類型（查無資料、請求本身無效）
+NEGATIVE_ERROR_TYPES = {'ZERO_RESULTS', 'NOT_FOUND', 'API_ERROR'}
+
 class GoogleMapService:
-    def __init__(self):
+    # 未指定 profile 時的欄位組合，這兩個 profile 的快取 key 不加後綴（與既有快取相容）
+    SEARCH_DEFAULT_PROFILE = 'full'
+    NEARBY_DEFAULT_PROFILE = 'card'
+    DETAILS_DEFAULT_PROFILE = 'full'
+    # 依名稱查地點時，從幾筆搜尋結果中找同名的地點
+    NAME_LOOKUP_MAX_RESULTS = 5
+    # 沒有路線資料時，直線距離換算成道路距離的係數
+    STRAIGHT_LINE_DETOUR_FACTOR = 1.3
+
+    def __init__(self, place_cache: Optional[PlaceCache] = None, place_index: Optional[PlaceIndex] = None,
+                 http_session: Optional[requests.Session] = None):
         self.api_key = Config.GOOGLE_MAPS_API_KEY
-        self.base_url = "https://places.googleapis.com/v1"
-        self.place_cache = PlaceCache()
+        self.base_url = Config.GOOGLE_PLACES_BASE_URL.rstrip('/')
+        self.routes_base_url = Config.GOOGLE_ROUTES_BASE_URL.rstrip('/')
+        self.http = http_session or http_client.google_session
+        self.place_cache = place_cache or PlaceCache()
+        self.place_index = place_index or PlaceIndex(self.place_cache)
+        # stale-while-revalidate 的背景更新
+        self._refresh_executor = ThreadPoolExecutor(
+            max_workers=Config.CACHE_REFRESH_WORKERS, thread_name_prefix='cache-refresh'
+        )
+        self._refresh_lock = threading.Lock()
+        # 搜尋結果的照片 URL 同時解析
+        self._photo_executor = ThreadPoolExecutor(
+            max_workers=Config.PHOTO_RESOLVE_WORKERS, thread_name_prefix='photo-resolve'
+        )
+        self._refreshing = set()
+
+    @staticmethod
+    def _http_error_type(status_code: Optional[int]) -> str:
+        """
+        401/403 是帳號的問題（API key 失效、帳單、API 未啟用），修好後同一個請求就會成功，
+        標成 AUTH_ERROR 不進負向快取；其餘 4xx（408/429 除外）是請求本身有問題，重試也一樣；
+        其餘視為暫時性錯誤
+        """
+        if status_code in (401, 403):
+            return 'AUTH_ERROR'
+        if status_code and 400 <= status_code < 500 and status_code not in (408, 429):
+            return 'API_ERROR'
+        return 'NETWORK_ERROR'
+
+    def _http_error_result(self, error: requests.HTTPError) -> Dict:
+        status_code = error.response.status_code if error.response is not None else None
+        return {
+            'success': False,
+            'error': f"API 請求失敗: {status_code}",
+            'error_type': self._http_error_type(status_code),
+            'status_code': status_code
+        }
+
+    @staticmethod
+    def _is_negative(result) -> bool:
+        """查無結果或 4xx 的回應可以短暫快取；網路錯誤、5xx、429 等暫時性錯誤與 401/403 不快取"""
+        if not isinstance(result, dict):
+            return False
+        if result.get('success') is False:
+            return result.get('error_type') in NEGATIVE_ERROR_TYPES
+        return 'places' in result and not result['places']
+
+    def _cached(self, cache_key: str, loader, local=None, fallback_keys=()):
+        """
+        先查快取，未命中才呼叫 loader 取得結果並寫回快取。
+        過期但仍在命名空間允許的 stale 範圍內的資料會直接回傳，同時在背景重新抓取。
+        查無結果的回應另外存在 negative_ 命名空間，只保留很短的時間。
+        local 是未命中時、呼叫上游前先試的本地來源（例如 PlaceIndex），回傳 None 表示無法回答。
+        fallback_keys 是內容更完整、可以直接代替這個 key 的快取（例如 full profile 之於 geo），
+        自己的 key 未命中時使用新鮮的那一筆。
+        先單獨查 cache_key：熱門 key 在記憶體層就能回答，不必為了 negative_ 與 fallback_keys 再查資料庫；
+        不新鮮時才把 negative_ 與 fallback_keys 一起查出來。
+        """
+        namespace = namespace_of(cache_key)
+        negative_key = NEGATIVE_PREFIX + cache_key
+        cached, state = self.place_cache.get_with_state(cache_key)
+        if state == PlaceCache.FRESH:
+            cache_metrics.record_request(namespace, metrics.HIT)
+            return cached
+        entries = self.place_cache.get_many_with_state([negative_key, *fallback_keys])
+        negative, negative_state = entries.get(negative_key, (None, None))
+        if negative_state == PlaceCache.FRESH:
+            cache_metrics.record_request(namespace, metrics.NEGATIVE_HIT)
+            return negative
+        for key in fallback_keys:
+            fallback, fallback_state = entries.get(key, (None, None))
+            if fallback_state == PlaceCache.FRESH:
+                cache_metrics.record_request(namespace, metrics.HIT)
+                return fallback
+        if state == PlaceCache.STALE:
+            cache_metrics.record_request(namespace, metrics.STALE_HIT)
+            self._schedule_refresh(cache_key, loader)
+            return cached
+        if local is not None:
+            result = self._try_local(local)
+            if result is not None:
+                cache_metrics.record_request(namespace, metrics.INDEX_HIT)
+                self.place_cache.set(cache_key, self._without_photo_urls(result))
+                return result
+        cache_metrics.record_request(namespace, metrics.MISS)
+        return self._load_and_store(cache_key, loader)
+
+    @staticmethod
+    def _try_local(local):
+        try:
+            return local()
+        except Exception as e:
+            print(f"[place_index] 查詢失敗，改呼叫 Google: {e}")
+            return None
+
+    def _index_places(self, result, query: Optional[str] = None, language_code: str = "zh-TW", replace: bool = True):
+        """把搜尋結果的地點寫進 PlaceIndex；照片沒解析完的結果不寫，索引失敗不影響回傳"""
+        if (isinstance(result, dict) and result.get('success') and result.get('places')
+                and not result.get('photos_degraded')):
+            try:
+                self.place_index.add_places(result['places'], query, language_code, replace)
+            except Exception as e:
+                print(f"[place_index] 寫入失敗: {e}")
+        return result
+
+    def _load_and_store(self, cache_key: str, loader):
+        """同一個 key 同時未命中時只呼叫一次上游，其他執行緒共用結果"""
+        def load():
+            started = time.perf_counter()
+            result = loader()
+            error_type = None
+            if isinstance(result, dict) and result.get('success') is False:
+                error_type = result.get('error_type') or 'UNKNOWN'
+            cache_metrics.record_upstream(namespace_of(cache_key), time.perf_counter() - started, error_type)
+            if self._is_negative(result):
+                self.place_cache.set(NEGATIVE_PREFIX + cache_key, result)
+            elif isinstance(result, dict) and result.get('success', True) and not result.get('photos_degraded'):
+                # 照片沒解析完的結果不快取，下次查詢時照片 URL 多半已在 photo_cdn_ 快取中
+                self.place_cache.set(cache_key, self._without_photo_urls(result))
+            return result
+        return single_flight.do(cache_key, load)
+
+    @staticmethod
+    def _without_photo_urls(result):
+        """
+        搜尋結果的快取比 photo_cdn_ 的 CDN URL 活得久，寫入前清掉 photo_url 只留照片 name，
+        讀出時由 _with_photo_urls 經 photo_cdn_ 補回
+        """
+        if not isinstance(result, dict) or not result.get('places'):
+            return result
+        return {**result, 'places': [without_photo_urls(place) for place in result['places']]}
+
+    def _with_photo_urls(self, result, resolve_photos: bool, profile: str):
+        """補回快取結果的照片 URL；期限內補不完時標記 photos_degraded"""
+        if (resolve_photos and place_profiles.has_photos(profile) and isinstance(result, dict)
+                and result.get('success') and result.get('places')
+                and not self._fill_photo_urls(result['places'])):
+            result['photos_degraded'] = True
+        return result
+
+    def _schedule_refresh(self, cache_key: str, loader):
+        """同一個 key 同時只排一個背景更新"""
+        with self._refresh_lock:
+            if cache_key in self._refreshing:
+                return
+            self._refreshing.add(cache_key)
+
+        def refresh():
+            try:
+                self._load_and_store(cache_key, loader)
+            except Exception as e:
+                print(f"[cache] 背景更新 {cache_key} 失敗: {e}")
+            finally:
+                with self._refresh_lock:
+                    self._refreshing.discard(cache_key)
+
+        try:
+            self._refresh_executor.submit(refresh)
+        except RuntimeError:
+            with self._refresh_lock:
+                self._refreshing.discard(cache_key)
 
     def _resolve_photo_url(self, photo_name: str, max_height: int = 400) -> str:
         """用 skipHttpRedirect=true 拿實際 CDN URL，不含 API key，跨 browser 永遠有效"""
         if not photo_name:
             return ""
-        cache_key = f"photo_cdn_{photo_name}_{max_height}"
-        cached = self.place_cache.get(cache_key)
-        if cached:
-            return cached.get("url", "")
+        cache_key = cache_keys.photo_key(photo_name, max_height)
+        result = self._cached(cache_key, lambda: self._fetch_photo_url(photo_name, max_height))
+        return result.get("url", "")
+
+    def _fetch_photo_url(self, photo_name: str, max_height: int) -> Dict:
         try:
             url = f"{self.base_url}/{photo_name}/media"
             params = {"maxHeightPx": max_height, "key": self.api_key, "skipHttpRedirect": "true"}
-            resp = requests.get(url, params=params, timeout=8)
-            cdn_url = resp.json().get("photoUri", "") if resp.ok else ""
+            resp = self.http.get(url, params=params, timeout=http_client.timeout(8))
+            if not resp.ok:
+                return {"success": False, "url": "", "error_type": self._http_error_type(resp.status_code)}
+            return {"url": resp.json().get("photoUri", "")}
+        except http_client.REJECTED_ERRORS as e:
+            return {**e.result(), "url": ""}
         except Exception:
-            cdn_url = ""
-        self.place_cache.set(cache_key, {"url": cdn_url})
-        return cdn_url
+            return {"success": False, "url": "", "error_type": "NETWORK_ERROR"}
     
-    def search_places(self, text_query: str, language_code: str = "zh-TW", max_results: int = 5):
-        cache_key = f"search_{text_query}_{language_code}_{max_results}"
-        cached = self.place_cache.get(cache_key)
-        if cached:
-            return cached
+    @staticmethod
+    def _simplify_photos(photos: List[Dict]) -> List[Dict]:
+        """每個地點保留前 3 張照片，photo_url 之後由 _fill_photo_urls 補上"""
+        return [
+            {
+                'name': photo.get('name', ''),
+                'photo_url': '',
+                'widthPx': photo.get('widthPx', 0),
+                'heightPx': photo.get('heightPx', 0),
+            }
+            for photo in photos[:3]
+        ]
+
+    def _fill_photo_urls(self, places: List[Dict]) -> bool:
+        """
+        補上所有地點照片的 photo_url，回傳是否全部解析完成。
+        先一次查出 photo_cdn_ 快取，未命中的再同時向 Google 解析。
+        """
+        photos = [
+            photo for place in places for photo in place.get('photos', [])
+            if photo.get('name') and not photo.get('photo_url')
+        ]
+        if not photos:
+            return True
+        cached = self.place_cache.get_many([cache_keys.photo_key(photo['name'], 400) for photo in photos])
+        missing = []
+        for photo in photos:
+            hit = cached.get(cache_keys.photo_key(photo['name'], 400))
+            if hit is not None and hit.get('url'):
+                photo['photo_url'] = hit['url']
+            else:
+                missing.append(photo)
+        return self._resolve_photos_concurrently(missing)
+
+    def _resolve_photos_concurrently(self, photos: List[Dict], max_height: int = 400) -> bool:
+        """
+        同時解析多張照片的 CDN URL 並寫進各自的 photo_url，最多等 PHOTO_RESOLVE_DEADLINE_SECONDS 秒。
+        超過期限仍未完成的照片只保留 name（photo_url 為空字串），回傳 False；
+        已經在跑的解析會繼續完成並寫進 photo_cdn_ 快取，尚未開始的直接取消。
+        """
+        if not photos:
+            return True
+        if circuit_breakers.is_open('places.photo'):
+            # 照片 API 故障中：直接略過，只回傳照片 name，結果標記為 photos_degraded 不寫快取
+            return False
+        futures = {
+            self._photo_executor.submit(self._resolve_photo_url, photo['name'], max_height): photo
+            for photo in photos
+        }
+        done, pending = wait(futures, timeout=Config.PHOTO_RESOLVE_DEADLINE_SECONDS)
+        complete = not pending
+        for future in done:
+            try:
+                futures[future]['photo_url'] = future.result()
+            except Exception:
+                complete = False
+        for future in pending:
+            future.cancel()
+        return complete
+
+    def resolve_photo_urls(self, photo_names: List[str], max_height: int = 400) -> Dict:
+        """
+        批次把照片 name 轉成 CDN URL：先一次查出 photo_cdn_ 快取，未命中的再同時向 Google 解析。
+        回傳 {'success', 'photos': [{'name', 'photo_url'}], 'unresolved'}，順序與 photo_names 相同。
+        """
+        names = [str(name).strip() for name in photo_names if name and str(name).strip()]
+        unique = list(dict.fromkeys(names))
+        keys = {name: cache_keys.photo_key(name, max_height) for name in unique}
+        cached = self.place_cache.get_many(list(keys.values()))
+
+        resolved = {}
+        missing = []
+        for name in unique:
+            hit = cached.get(keys[name])
+            if hit is not None and hit.get('url'):
+                cache_metrics.record_request(namespace_of(keys[name]), metrics.HIT)
+                resolved[name] = hit['url']
+            else:
+                missing.append({'name': name, 'photo_url': ''})
+        self._resolve_photos_concurrently(missing, max_height)
+        resolved.update((photo['name'], photo['photo_url']) for photo in missing)
 
+        photos = [{'name': name, 'photo_url': resolved.get(name, '')} for name in names]
+        return {
+            'success': True,
+            'photos': photos,
+            'unresolved': sum(1 for photo in photos if not photo['photo_url'])
+        }
+
+    def _search_cache_key(self, text_query: str, language_code: str = "zh-TW", max_results: int = 5) -> str:
+        return cache_keys.search_key(text_query, language_code, max_results)
+
+    def _search_nearby_cache_key(self, text_query: str, location: Dict, max_results: int = 10) -> str:
+        return cache_keys.search_nearby_key(text_query, location, max_results)
+
+    def _variant_keys(self, base_key: str, profile: str, default_profile: str, resolve_photos: bool = True,
+                      photo_variants: bool = True):
+        """
+        回傳 (這次結果要寫入的 key, 可以代替它的較完整結果 key 清單)。
+        較完整的 profile 都能回答較精簡的請求；不需要照片 URL 時，只有照片 name 的結果也可以。
+        photo_variants=False 表示這類結果沒有「只有照片 name」的版本（例如地點詳情）。
+        """
+        def key_for(variant, lazy):
+            key = cache_keys.profile_key(base_key, variant, default_profile)
+            return cache_keys.photo_names_key(key) if lazy else key
+
+        lazy = photo_variants and not resolve_photos and place_profiles.has_photos(profile)
+        own = key_for(profile, lazy)
+        fallbacks = []
+        for variant in place_profiles.at_least(profile):
+            for variant_lazy in (False, True):
+                if variant_lazy and (not photo_variants or not place_profiles.has_photos(variant)
+                                     or (place_profiles.has_photos(profile) and not lazy)):
+                    continue
+                key = key_for(variant, variant_lazy)
+                if key != own:
+                    fallbacks.append(key)
+        return own, fallbacks
+
+    def _search_variant_keys(self, query: Dict):
+        """prefetch_searches 的一筆查詢對應的 (key, 代用 key 清單)"""
+        if query.get('location'):
+            base_key = self._search_nearby_cache_key(
+                query['text_query'], query['location'], query.get('max_results', 10)
+            )
+            default_profile = self.NEARBY_DEFAULT_PROFILE
+        else:
+            base_key = self._search_cache_key(
+                query['text_query'], query.get('language_code', 'zh-TW'), query.get('max_results', 5)
+            )
+            default_profile = self.SEARCH_DEFAULT_PROFILE
+        return self._variant_keys(
+            base_key, query.get('profile', default_profile), default_profile, query.get('resolve_photos', True)
+        )
+
+    def prefetch_searches(self, queries: List[Dict]) -> List[Optional[Dict]]:
+        """
+        一次批次查出多個 search_places / search_places_nearby 的快取結果，並暖好記憶體層。
+        queries 的每一項是對應方法的參數（含 location 時視為 nearby 搜尋），
+        較精簡的 profile 或 resolve_photos=False 的查詢也接受較完整的結果。
+        回傳與 queries 對齊的快取結果，未命中為 None。
+        先只查各查詢自己的 key，未命中的查詢才再一次查出它們的代用 key（和 _cached 相同）。
+        """
+        variants = [self._search_variant_keys(query) for query in queries]
+        own_keys = [own for own, _ in variants]
+        cached = self.place_cache.get_many(own_keys) if own_keys else {}
+        fallback_lookup = [key for own, fallbacks in variants if own not in cached for key in fallbacks]
+        if fallback_lookup:
+            cached.update(self.place_cache.get_many(fallback_lookup))
+        return [
+            next((cached[key] for key in [own, *fallbacks] if key in cached), None)
+            for own, fallbacks in variants
+        ]
+
+    def _index_lookup(self, lookup, profile: str, resolve_photos: bool):
+        """
+        PlaceIndex 的地點可能來自較精簡的 profile 或只有照片 name 的搜尋：
+        欄位不足時回傳 None；需要照片 URL 時先補齊，期限內補不完也回傳 None，改由 Google 回答。
+        """
+        def local():
+            result = lookup()
+            if result is None:
+                return None
+            if not all(place_profiles.place_satisfies(place, profile) for place in result['places']):
+                return None
+            if not resolve_photos or not place_profiles.has_photos(profile):
+                return result
+            return result if self._fill_photo_urls(result['places']) else None
+        return local
+
+    def _format_search_place(self, place: Dict, profile: str) -> Dict:
+        """searchText 回傳的地點轉成搜尋結果格式，只包含 profile 有要求的欄位"""
+        formatted = {
+            'place_id': place.get('id', ''),
+            'name': place.get('displayName', {}).get('text', ''),
+            'address': place.get('formattedAddress', ''),
+            'location': place.get('location', {}),
+            'types': place.get('types', [])[:3],
+        }
+        if place_profiles.includes(profile, 'card'):
+            photos = place.get('photos', [])
+            formatted.update({
+                'rating': place.get('rating', 0),
+                'user_rating_count': place.get('userRatingCount', 0),
+                'photos': self._simplify_photos(photos),
+                'photo_count': len(photos),
+            })
+        if place_profiles.includes(profile, 'full'):
+            formatted.update({
+                'phone': place.get('internationalPhoneNumber', ''),
+                'website': place.get('websiteUri', ''),
+            })
+        return formatted
+
+    def search_places(self, text_query: str, language_code: str = "zh-TW", max_results: int = 5,
+                      resolve_photos: bool = True, profile: str = SEARCH_DEFAULT_PROFILE):
+        """
+        profile 決定向 Google 要哪些欄位（geo / card / full，見 services/place_profiles.py）。
+        resolve_photos=False 時照片只回傳 name（photo_url 為空字串），不呼叫照片 API，
+        需要圖片時再用 resolve_photo_urls 批次解析。
+        """
+        cache_key, fallbacks = self._variant_keys(
+            self._search_cache_key(text_query, language_code, max_results),
+            profile, self.SEARCH_DEFAULT_PROFILE, resolve_photos
+        )
+        result = self._cached(
+            cache_key,
+            lambda: self._index_places(
+                self._fetch_search_places(text_query, language_code, max_results, resolve_photos, profile),
+                text_query, language_code, replace=profile != 'geo'
+            ),
+            fallback_keys=fallbacks
+        )
+        return self._with_photo_urls(result, resolve_photos, profile)
+
+    def _fetch_search_places(self, text_query: str, language_code: str, max_results: int,
+                             resolve_photos: bool = True, profile: str = SEARCH_DEFAULT_PROFILE):
         try:
             url = f"{self.base_url}/places:searchText"
             headers = {
                 'Content-Type': 'application/json',
                 'X-Goog-Api-Key': self.api_key,
-                'X-Goog-FieldMask': 'places.displayName,places.formattedAddress,places.location,places.id,places.rating,places.types,places.photos,places.internationalPhoneNumber,places.websiteUri'
+                'X-Goog-FieldMask': place_profiles.search_field_mask(profile)
             }
             payload = {
                 'textQuery': text_query,
                 'languageCode': language_code,
                 'maxResultCount': max_results
             }
-            response = requests.post(url, json=payload, headers=headers, timeout=10)
+            response = self.http.post(url, json=payload, headers=headers, timeout=http_client.timeout(10))
             response.raise_for_status()
             data = response.json()
             places = data.get('places', [])
-            formatted_places = []
-            for place in places:
-                photos = place.get('photos', [])
-                simplified_photos = []
-                for photo in photos[:3]:
-                    photo_name = photo.get('name', '')
-                    photo_url = self._resolve_photo_url(photo_name)
-                    simplified_photos.append({
-                        'name': photo_name,
-                        'photo_url': photo_url,
-                        'widthPx': photo.get('widthPx', 0),
-                        'heightPx': photo.get('heightPx', 0),
-                    })
-                formatted_place = {
-                    'place_id': place.get('id', ''),
-                    'name': place.get('displayName', {}).get('text', ''),
-                    'address': place.get('formattedAddress', ''),
-                    'location': place.get('location', {}),
-                    'rating': place.get('rating', 0),
-                    'types': place.get('types', [])[:3],
-                    'phone': place.get('internationalPhoneNumber', ''),
-                    'website': place.get('websiteUri', ''),
-                    'photos': simplified_photos,
-                    'photo_count': len(photos)
-                }
-                formatted_places.append(formatted_place)
+            formatted_places = [self._format_search_place(place, profile) for place in places]
             result = {
                 'success': True,
                 'places': formatted_places,
                 'total_results': len(formatted_places),
                 'query': text_query
             }
-            # 寫入快取
-            self.place_cache.set(cache_key, result)
+            if resolve_photos and not self._fill_photo_urls(formatted_places):
+                result['photos_degraded'] = True
             return result
+        except http_client.REJECTED_ERRORS as e:
+            return e.result()
+        except requests.HTTPError as e:
+            return self._http_error_result(e)
         except requests.RequestException as e:
             return {
                 'success': False,
@@ -97,19 +476,36 @@ class GoogleMapService:
                 'error': f"錯誤: {str(e)}",
                 'error_type': 'UNKNOWN_ERROR'
             }
-            
-    def search_places_nearby(self, text_query: str, location: Dict, radius: int = 5000, language_code: str = "zh-TW", max_results: int = 10):
-            cache_key = f"search_nearby_{text_query}_{location['latitude']}_{location['longitude']}_{max_results}"
-            cached = self.place_cache.get(cache_key)
-            if cached:
-                return cached
 
+    def search_places_nearby(self, text_query: str, location: Dict, radius: int = 5000, language_code: str = "zh-TW", max_results: int = 10,
+                             resolve_photos: bool = True, profile: str = NEARBY_DEFAULT_PROFILE):
+            cache_key, fallbacks = self._variant_keys(
+                self._search_nearby_cache_key(text_query, location, max_results),
+                profile, self.NEARBY_DEFAULT_PROFILE, resolve_photos
+            )
+            result = self._cached(
+                cache_key,
+                lambda: self._index_places(
+                    self._fetch_search_places_nearby(text_query, location, radius, language_code, max_results,
+                                                     resolve_photos, profile),
+                    text_query, language_code, replace=profile != 'geo'
+                ),
+                local=self._index_lookup(
+                    lambda: self.place_index.find_by_name(text_query, location, radius, language_code, max_results),
+                    profile, resolve_photos
+                ),
+                fallback_keys=fallbacks
+            )
+            return self._with_photo_urls(result, resolve_photos, profile)
+
+    def _fetch_search_places_nearby(self, text_query: str, location: Dict, radius: int, language_code: str, max_results: int,
+                                    resolve_photos: bool = True, profile: str = NEARBY_DEFAULT_PROFILE):
             try:
                 url = f"{self.base_url}/places:searchText"
                 headers = {
                     'Content-Type': 'application/json',
                     'X-Goog-Api-Key': self.api_key,
-                    'X-Goog-FieldMask': 'places.displayName,places.formattedAddress,places.location,places.id,places.rating,places.userRatingCount,places.types,places.photos'
+                    'X-Goog-FieldMask': place_profiles.search_field_mask(profile)
                 }
                 payload = {
                     'textQuery': text_query,
@@ -125,43 +521,24 @@ class GoogleMapService:
                         }
                     }
                 }
-                response = requests.post(url, json=payload, headers=headers, timeout=10)
+                response = self.http.post(url, json=payload, headers=headers, timeout=http_client.timeout(10))
                 response.raise_for_status()
                 data = response.json()
                 places = data.get('places', [])
-                formatted_places = []
-                for place in places:
-                    photos = place.get('photos', [])
-                    simplified_photos = []
-                    for photo in photos[:3]:
-                        photo_name = photo.get('name', '')
-                        photo_url = self._resolve_photo_url(photo_name)
-                        simplified_photos.append({
-                            'name': photo_name,
-                            'photo_url': photo_url,
-                            'widthPx': photo.get('widthPx', 0),
-                            'heightPx': photo.get('heightPx', 0),
-                        })
-                    formatted_place = {
-                        'place_id': place.get('id', ''),
-                        'name': place.get('displayName', {}).get('text', ''),
-                        'address': place.get('formattedAddress', ''),
-                        'location': place.get('location', {}),
-                        'rating': place.get('rating', 0),
-                        'user_rating_count': place.get('userRatingCount', 0),
-                        'types': place.get('types', [])[:3],
-                        'photos': simplified_photos,
-                        'photo_count': len(photos)
-                    }
-                    formatted_places.append(formatted_place)
+                formatted_places = [self._format_search_place(place, profile) for place in places]
                 result = {
                     'success': True,
                     'places': formatted_places,
                     'total_results': len(formatted_places),
                     'query': text_query
                 }
-                self.place_cache.set(cache_key, result)
+                if resolve_photos and not self._fill_photo_urls(formatted_places):
+                    result['photos_degraded'] = True
                 return result
+            except http_client.REJECTED_ERRORS as e:
+                return e.result()
+            except requests.HTTPError as e:
+                return self._http_error_result(e)
             except requests.RequestException as e:
                 return {
                     'success': False,
@@ -175,42 +552,69 @@ class GoogleMapService:
                     'error_type': 'UNKNOWN_ERROR'
                 }
     
-    def get_place_details(self, place_id_or_name: str, is_name: bool = False):
+    def get_place_details(self, place_id_or_name: str, is_name: bool = False,
+                          profile: str = DETAILS_DEFAULT_PROFILE, language_code: str = "zh-TW"):
         if is_name:
-            search_result = self.search_places(place_id_or_name)
-        if not search_result.get('success') or not search_result.get('places'):
-            return {
-                'success': False,
-                'error': '查無此地點',
-                'error_type': 'NOT_FOUND'
-            }
-            place_id = search_result['places'][0]['place_id']
+            lookup = self._place_id_for_name(place_id_or_name, language_code)
+            if not lookup.get('success'):
+                return lookup
+            place_id = lookup['place_id']
         else:
             place_id = place_id_or_name
 
-        cache_key = f"details_{place_id}"
-        cached = self.place_cache.get(cache_key)
-        if cached:
-            return cached
+        cache_key, fallbacks = self._variant_keys(
+            cache_keys.details_key(place_id, language_code), profile, self.DETAILS_DEFAULT_PROFILE,
+            photo_variants=False
+        )
+        return self._cached(
+            cache_key, lambda: self._fetch_place_details(place_id, profile, language_code), fallback_keys=fallbacks
+        )
 
+    def _fetch_place_details(self, place_id: str, profile: str = DETAILS_DEFAULT_PROFILE,
+                             language_code: str = "zh-TW"):
         try:
             url = f"{self.base_url}/places/{place_id}"
             headers = {
                 'Content-Type': 'application/json',
                 'X-Goog-Api-Key': self.api_key,
-                'X-Goog-FieldMask': 'id,displayName,formattedAddress,location,rating,internationalPhoneNumber,websiteUri,regularOpeningHours,photos,reviews,types,priceLevel,priceRange'
+                'X-Goog-FieldMask': place_profiles.details_field_mask(profile)
             }
-            response = requests.get(url, headers=headers, timeout=10)
+            params = {'languageCode': language_code}
+            response = self.http.get(url, headers=headers, params=params, timeout=http_client.timeout(10))
             response.raise_for_status()
-            data = response.json()
-            photos = data.get('photos', [])
-            simplified_photos = [{'name': p.get('name', '')} for p in photos[:5]]
-            reviews = data.get('reviews', [])
-            simplified_reviews = [{
-                'rating': r.get('rating', 0),
-                'text': r.get('text', {}).get('text', '')[:200]
-            } for r in reviews[:3]]
+            return {
+                'success': True,
+                'details': self._format_details(response.json(), profile)
+            }
+        except http_client.REJECTED_ERRORS as e:
+            return e.result()
+        except requests.HTTPError as e:
+            return self._http_error_result(e)
+        except requests.RequestException as e:
+            return {
+                'success': False,
+                'error': f"網絡錯誤: {str(e)}",
+                'error_type': 'NETWORK_ERROR'
+            }
+        except Exception as e:
+            return {
+                'success': False,
+                'error': f"錯誤: {str(e)}",
+                'error_type': 'UNKNOWN_ERROR'
+            }
 
+    @staticmethod
+    def _format_details(data: Dict, profile: str) -> Dict:
+        """Place Details 回應轉成 details 格式，只包含 profile 有要求的欄位"""
+        details = {
+            'place_id': data.get('id', ''),
+            'name': data.get('displayName', {}).get('text', ''),
+            'address': data.get('formattedAddress', ''),
+            'location': data.get('location', {}),
+            'types': data.get('types', [])[:5]
+        }
+        if place_profiles.includes(profile, 'card'):
+            photos = data.get('photos', [])
             price_level = data.get('priceLevel') or data.get('price_level')
             price_range = data.get('priceRange') or data.get('price_range')
             if not price_range and isinstance(price_level, int):
@@ -232,47 +636,46 @@ class GoogleMapService:
             }
             price_text = price_map.get(price_level, None) if isinstance(price_level, int) else None
 
-            details = {
-                'place_id': data.get('id', ''),
-                'name': data.get('displayName', {}).get('text', ''),
-                'address': data.get('formattedAddress', ''),
-                'location': data.get('location', {}),
+            details.update({
                 'rating': data.get('rating', 0),
-                'phone': data.get('internationalPhoneNumber', ''),
-                'website': data.get('websiteUri', ''),
-                'opening_hours': data.get('regularOpeningHours', {}),
                 'price_level': price_level,
                 'price_text': price_text,
                 'price_range': price_range,
-                'photos': simplified_photos,
+                'photos': [{'name': p.get('name', '')} for p in photos[:5]],
                 'photo_count': len(photos),
-                'reviews': simplified_reviews,
+            })
+        if place_profiles.includes(profile, 'full'):
+            reviews = data.get('reviews', [])
+            details.update({
+                'phone': data.get('internationalPhoneNumber', ''),
+                'website': data.get('websiteUri', ''),
+                'opening_hours': data.get('regularOpeningHours', {}),
+                'reviews': [{
+                    'rating': r.get('rating', 0),
+                    'text': r.get('text', {}).get('text', '')[:200]
+                } for r in reviews[:3]],
                 'review_count': len(reviews),
-                'types': data.get('types', [])[:5]
-            }
-            result = {
-                'success': True,
-                'details': details
-            }
-            self.place_cache.set(cache_key, result)
-            return result
-        except requests.RequestException as e:
-            return {
-                'success': False,
-                'error': f"網絡錯誤: {str(e)}",
-                'error_type': 'NETWORK_ERROR'
-            }
-        except Exception as e:
-            return {
-                'success': False,
-                'error': f"錯誤: {str(e)}",
-                'error_type': 'UNKNOWN_ERROR'
-            }
+            })
+        return details
     
     def nearby_search(self, location: Dict, radius: int = 1500, 
                      included_types: Optional[List[str]] = None,
                      language_code: str = "zh-TW",
                      max_results: int = 10):
+        # 半徑內已知的同類型地點夠多時直接回答
+        if included_types:
+            local = self._try_local(lambda: self.place_index.find_by_types(
+                location, radius, included_types, language_code, max_results
+            ))
+            if local is not None:
+                return local
+        return self._index_places(
+            self._fetch_nearby_search(location, radius, included_types, language_code, max_results),
+            language_code=language_code, replace=False
+        )
+
+    def _fetch_nearby_search(self, location: Dict, radius: int, included_types: Optional[List[str]],
+                             language_code: str, max_results: int):
         try:
             url = f"{self.base_url}/places:searchNearby"
             
@@ -299,7 +702,7 @@ class GoogleMapService:
             if included_types:
                 payload['includedTypes'] = included_types
             
-            response = requests.post(url, json=payload, headers=headers, timeout=10)
+            response = self.http.post(url, json=payload, headers=headers, timeout=http_client.timeout(10))
             response.raise_for_status()
             data = response.json()
             
@@ -324,6 +727,10 @@ class GoogleMapService:
                 'total_results': len(formatted_places)
             }
             
+        except http_client.REJECTED_ERRORS as e:
+            return e.result()
+        except requests.HTTPError as e:
+            return self._http_error_result(e)
         except requests.RequestException as e:
             return {
                 'success': False,
@@ -338,15 +745,15 @@ class GoogleMapService:
             }
     
     def get_distance_and_duration(self, origin: str, destination: str, mode: str = 'driving'):
-        cache_key = f"distance_{origin}_{destination}_{mode}"
-        cached = self.place_cache.get(cache_key)
-        if cached:
-            return cached
+        cache_key = cache_keys.distance_key(origin, destination, mode)
+        return self._cached(cache_key, lambda: self._fetch_distance_and_duration(origin, destination, mode))
+
+    def _fetch_distance_and_duration(self, origin: str, destination: str, mode: str):
         try:
             travel_mode_map = {'driving': 'DRIVE', 'transit': 'TRANSIT', 'walking': 'WALK'}
             travel_mode = travel_mode_map.get(mode.lower(), 'DRIVE')
 
-            url = "https://routes.googleapis.com/directions/v2:computeRoutes"
+            url = f"{self.routes_base_url}/directions/v2:computeRoutes"
             headers = {
                 'Content-Type': 'application/json',
                 'X-Goog-Api-Key': self.api_key,
@@ -366,87 +773,128 @@ class GoogleMapService:
                     .strftime('%Y-%m-%dT%H:%M:%SZ')
                 )
 
-            response = requests.post(url, json=payload, headers=headers, timeout=10)
+            response = self.http.post(url, json=payload, headers=headers, timeout=http_client.timeout(10))
             response.raise_for_status()
             data = response.json()
 
             if not data.get('routes'):
-                return {'success': False, 'error': '無法找到路線'}
+                return {'success': False, 'error': '無法找到路線', 'error_type': 'ZERO_RESULTS'}
 
             route = data['routes'][0]
-            duration_seconds = int(route.get('duration', '0s').replace('s', ''))
-            if duration_seconds < 3600:
-                duration_text = f"{duration_seconds // 60} 分鐘"
-            else:
-                hours = duration_seconds // 3600
-                minutes = (duration_seconds % 3600) // 60
-                duration_text = f"{hours} 小時 {minutes} 分鐘"
-
-            distance_meters = route.get('distanceMeters', 0)
-            distance_text = (
-                f"{distance_meters} 公尺"
-                if distance_meters < 1000
-                else f"{distance_meters / 1000:.1f} 公里"
+            return self._distance_result(
+                self._duration_seconds(route.get('duration')), route.get('distanceMeters', 0), mode
             )
-
-            result = {
-                'success': True,
-                'distance': distance_text,
-                'duration': duration_text,
-                'mode': mode
-            }
-            self.place_cache.set(cache_key, result)
-            return result
+        except http_client.REJECTED_ERRORS as e:
+            return e.result()
+        except requests.HTTPError as e:
+            return self._http_error_result(e)
         except Exception as e:
             return {'success': False, 'error': str(e)}
         
-    def get_place_business_info(self, place_id_or_name: str, is_name: bool = False):
+    def get_place_business_info(self, place_id_or_name: str, is_name: bool = False, language_code: str = "zh-TW"):
         if is_name:
-            search_result = self.search_places(place_id_or_name)
-            if not search_result.get('success') or not search_result.get('places'):
-                return {'success': False, 'error': '查無此地點', 'error_type': 'NOT_FOUND'}
-            
-            matched = next((p for p in search_result['places'] 
-                        if p.get('name', '').strip() == place_id_or_name.strip()), None)
-        
-            place_id = matched['place_id'] if matched else search_result['places'][0]['place_id']
+            lookup = self._place_id_for_name(place_id_or_name, language_code)
+            if not lookup.get('success'):
+                return lookup
+            place_id = lookup['place_id']
         else:
             place_id = place_id_or_name
 
-        cache_key = f"business_{place_id}"
-        cached = self.place_cache.get(cache_key)
-        if cached:
-            return cached
+        cache_key = cache_keys.business_key(place_id, language_code)
+        return self._cached(cache_key, lambda: self._fetch_place_business_info(place_id, language_code))
+
+    def _place_id_for_name(self, name: str, language_code: str = "zh-TW"):
+        """
+        地名對應的 place_id（place_name_ 快取）。
+        未命中時由 _lookup_place_by_name 一次取回，同時寫好該地點同語言的 details_ 與 business_ 快取，
+        所以依名稱查詳情或營業時間最多只需要一次 Google 請求。
+        """
+        return self._cached(
+            cache_keys.place_name_key(name, language_code), lambda: self._lookup_place_by_name(name, language_code)
+        )
+
+    def _lookup_place_by_name(self, name: str, language_code: str = "zh-TW"):
+        """用 searchText 直接要 full 詳情的欄位，名稱完全相同的地點優先，否則取第一筆"""
+        try:
+            url = f"{self.base_url}/places:searchText"
+            headers = {
+                'Content-Type': 'application/json',
+                'X-Goog-Api-Key': self.api_key,
+                'X-Goog-FieldMask': place_profiles.details_search_field_mask('full')
+            }
+            payload = {
+                'textQuery': name,
+                'languageCode': language_code,
+                'maxResultCount': self.NAME_LOOKUP_MAX_RESULTS
+            }
+            response = self.http.post(url, json=payload, headers=headers, timeout=http_client.timeout(10))
+            response.raise_for_status()
+            places = response.json().get('places', [])
+        except http_client.REJECTED_ERRORS as e:
+            return e.result()
+        except requests.HTTPError as e:
+            return self._http_error_result(e)
+        except requests.RequestException as e:
+            return {'success': False, 'error': f"網絡錯誤: {str(e)}", 'error_type': 'NETWORK_ERROR'}
+        except Exception as e:
+            return {'success': False, 'error': f"錯誤: {str(e)}", 'error_type': 'UNKNOWN_ERROR'}
+
+        if not places:
+            return {'success': False, 'error': '查無此地點', 'error_type': 'NOT_FOUND'}
+        place = next(
+            (p for p in places if p.get('displayName', {}).get('text', '').strip() == name.strip()), places[0]
+        )
+        place_id = place.get('id')
+        if not place_id:
+            # 沒有 id 就沒有可寫的 details_ / business_ key，當成查無此地點
+            return {'success': False, 'error': '查無此地點', 'error_type': 'NOT_FOUND'}
+        self.place_cache.set_many({
+            cache_keys.details_key(place_id, language_code): {
+                'success': True, 'details': self._format_details(place, 'full')
+            },
+            cache_keys.business_key(place_id, language_code): self._format_business_info(place),
+        })
+        return {
+            'success': True,
+            'place_id': place_id,
+            'name': place.get('displayName', {}).get('text')
+        }
+
+    @staticmethod
+    def _format_business_info(data: Dict) -> Dict:
+        """Place Details / searchText 的地點轉成營業資訊格式（business_ 快取）"""
+        return {
+            'success': True,
+            'place_id': data.get('id'),
+            'name': data.get('displayName', {}).get('text'),
+            'opening_hours': data.get('regularOpeningHours', {}).get('weekdayDescriptions', []),
+            'price_range': data.get('priceRange', '未知')
+        }
+
+    def _fetch_place_business_info(self, place_id: str, language_code: str = "zh-TW"):
         try:
-            url = f"https://places.googleapis.com/v1/places/{place_id}"
+            url = f"{self.base_url}/places/{place_id}"
             headers = {
                 'Content-Type': 'application/json',
                 'X-Goog-Api-Key': self.api_key,
                 'X-Goog-FieldMask': 'id,displayName,regularOpeningHours,priceRange' 
             }
             params = {
-                'languageCode': 'zh-TW'
+                'languageCode': language_code
             }
             
-            response = requests.get(url, headers=headers, params=params, timeout=10)
+            response = self.http.get(url, headers=headers, params=params, timeout=http_client.timeout(10))
             if response.status_code != 200:
                 return {
                     'success': False, 
                     'error': f"API 請求失敗: {response.status_code}",
-                    'error_type': 'API_ERROR'
+                    'error_type': self._http_error_type(response.status_code),
+                    'status_code': response.status_code
                 }
             
-            data = response.json()
-            result = {
-                'success': True,
-                'place_id': data.get('id'),
-                'name': data.get('displayName', {}).get('text'),
-                'opening_hours': data.get('regularOpeningHours', {}).get('weekdayDescriptions', []),
-                'price_range': data.get('priceRange', '未知')
-            }
-            
-            self.place_cache.set(cache_key, result)
-            return result
+            return self._format_business_info(response.json())
+        except http_client.REJECTED_ERRORS as e:
+            return e.result()
         except Exception as e:
             return {'success': False, 'error': str(e)}
         
@@ -454,21 +902,13 @@ class GoogleMapService:
 
         mode = mode.lower()
 
-        cache_key = (
-            f"routes_v2_"
-            f"{origin.get('latitude')}_"
-            f"{origin.get('longitude')}_"
-            f"{destination.get('latitude')}_"
-            f"{destination.get('longitude')}_"
-            f"{mode}"
-        )
+        cache_key = cache_keys.routes_v2_key(origin, destination, mode)
 
-        cached = self.place_cache.get(cache_key)
-        if cached:
-            return cached
+        return self._cached(cache_key, lambda: self._fetch_routes(origin, destination, mode))
 
+    def _fetch_routes(self, origin: Dict, destination: Dict, mode: str):
         try:
-            url = "https://routes.googleapis.com/directions/v2:computeRoutes"
+            url = f"{self.routes_base_url}/directions/v2:computeRoutes"
 
             travel_mode_map = {
                 'driving': 'DRIVE',
@@ -518,11 +958,11 @@ class GoogleMapService:
                     .replace(hour=9, minute=0, second=0, microsecond=0)
                     .strftime('%Y-%m-%dT%H:%M:%SZ')
                 )
-            response = requests.post(
+            response = self.http.post(
                 url,
                 json=payload,
                 headers=headers,
-                timeout=15
+                timeout=http_client.timeout(15)
             )
 
             response.raise_for_status()
@@ -532,6 +972,7 @@ class GoogleMapService:
                 return {
                     'success': False,
                     'error': 'ZERO_RESULTS',
+                    'error_type': 'ZERO_RESULTS',
                     'fallback_url': (
                         "https://www.google.com/maps/dir/?api=1"
                         f"&origin={origin.get('latitude')},{origin.get('longitude')}"
@@ -542,32 +983,14 @@ class GoogleMapService:
 
             route = data['routes'][0]
 
-            duration_seconds = int(route.get('duration', '0s').replace('s', ''))
-
-            if duration_seconds < 3600:
-                duration_text = f"{duration_seconds // 60} 分"
-            else:
-                hours = duration_seconds // 3600
-                minutes = (duration_seconds % 3600) // 60
-                duration_text = f"{hours} 小時 {minutes} 分"
-
-            distance_meters = route.get('distanceMeters', 0)
-
-            if distance_meters < 1000:
-                distance_text = f"{distance_meters} 公尺"
-            else:
-                distance_text = f"{distance_meters / 1000:.1f} 公里"
-
-            result = {
-                'success': True,
-                'duration': duration_text,
-                'distance': distance_text
-            }
-
-            self.place_cache.set(cache_key, result)
-
-            return result
+            return self._routes_v2_result(
+                self._duration_seconds(route.get('duration')), route.get('distanceMeters', 0)
+            )
 
+        except http_client.REJECTED_ERRORS as e:
+            return e.result()
+        except requests.HTTPError as e:
+            return self._http_error_result(e)
         except requests.RequestException as e:
             return {
                 'success': False,
@@ -580,29 +1003,363 @@ class GoogleMapService:
                 'error': str(e)
             }
 
+    TRAVEL_MODES = {'driving': 'DRIVE', 'transit': 'TRANSIT', 'walking': 'WALK'}
+    # computeRouteMatrix 單次請求的元素上限（origins x destinations）
+    ROUTE_MATRIX_LIMITS = {'TRANSIT': 100, 'DEFAULT': 625}
+    ROUTE_MATRIX_MAX_BLOCKS = 3
+    # 外接矩形的元素數不超過實際需要的這個倍數時才合併成一塊（Routes API 依元素計費）
+    ROUTE_MATRIX_MAX_OVERFETCH = 1.5
+    # 拆成多塊時同時送出的請求數
+    ROUTE_MATRIX_PARALLEL = 4
+
+    @staticmethod
+    def _duration_seconds(duration) -> int:
+        """Routes API 的 duration 為 '123s' 格式"""
+        return int(str(duration or '0s').rstrip('s') or 0)
+
+    @staticmethod
+    def _distance_text(distance_meters: int) -> str:
+        return f"{distance_meters} 公尺" if distance_meters < 1000 else f"{distance_meters / 1000:.1f} 公里"
+
+    @classmethod
+    def _routes_v2_result(cls, duration_seconds: int, distance_meters: int) -> Dict:
+        """compute_routes（routes_v2_ 快取）的結果格式"""
+        if duration_seconds < 3600:
+            duration_text = f"{duration_seconds // 60} 分"
+        else:
+            duration_text = f"{duration_seconds // 3600} 小時 {(duration_seconds % 3600) // 60} 分"
+        return {
+            'success': True,
+            'duration': duration_text,
+            'distance': cls._distance_text(distance_meters),
+            'duration_seconds': duration_seconds,
+            'distance_meters': distance_meters
+        }
+
+    @classmethod
+    def _distance_result(cls, duration_seconds: int, distance_meters: int, mode: str) -> Dict:
+        """get_distance_and_duration（distance_ 快取）的結果格式"""
+        if duration_seconds < 3600:
+            duration_text = f"{duration_seconds // 60} 分鐘"
+        else:
+            duration_text = f"{duration_seconds // 3600} 小時 {(duration_seconds % 3600) // 60} 分鐘"
+        return {
+            'success': True,
+            'distance': cls._distance_text(distance_meters),
+            'duration': duration_text,
+            'mode': mode,
+            'duration_seconds': duration_seconds,
+            'distance_meters': distance_meters
+        }
+
+    @staticmethod
+    def _is_coordinate(waypoint) -> bool:
+        return (isinstance(waypoint, dict)
+                and waypoint.get('latitude') is not None and waypoint.get('longitude') is not None)
+
+    @classmethod
+    def _waypoint_text(cls, waypoint) -> str:
+        if cls._is_coordinate(waypoint):
+            return f"{waypoint['latitude']},{waypoint['longitude']}"
+        return str(waypoint)
+
+    def _matrix_element_key(self, origin, destination, mode: str) -> str:
+        """
+        兩端都是座標時和 compute_routes 共用 routes_v2_ 快取，
+        否則（地名或混合）和 get_distance_and_duration 共用 distance_ 快取。
+        """
+        if self._is_coordinate(origin) and self._is_coordinate(destination):
+            return cache_keys.routes_v2_key(origin, destination, mode)
+        return cache_keys.distance_key(self._waypoint_text(origin), self._waypoint_text(destination), mode)
+
+    def _matrix_element_result(self, cache_key: str, duration_seconds: int, distance_meters: int, mode: str) -> Dict:
+        if namespace_of(cache_key) == 'routes_v2':
+            return self._routes_v2_result(duration_seconds, distance_meters)
+        return self._distance_result(duration_seconds, distance_meters, mode)
+
+    def compute_route_matrix(self, origins: List, destinations: Optional[List] = None, mode: str = 'driving') -> Dict:
+        """
+        一次取得多個起點到多個終點的時間與距離（Routes API computeRouteMatrix）。
+        起終點可以是 {'latitude', 'longitude'} 或地名字串；destinations 省略時等於 origins。
+        每個起終點組合各自快取，和 compute_routes / get_distance_and_duration 的快取互通，
+        只有未命中的組合所在的列與欄才送到 Google。
+        回傳 rows[i][j] 為 origins[i] 到 destinations[j] 的結果，格式與對應的單點查詢相同。
+        """
+        mode = mode.lower()
+        destinations = origins if destinations is None else destinations
+        keys = [[self._matrix_element_key(o, d, mode) for d in destinations] for o in origins]
+        pairs = [(i, j) for i in range(len(origins)) for j in range(len(destinations))]
+        results, upstream_calls = self._matrix_elements(origins, destinations, keys, pairs, mode)
+        rows = [[results[key] for key in row] for row in keys]
+        return {
+            'success': True,
+            'mode': mode,
+            'rows': rows,
+            'upstream_calls': upstream_calls
+        }
+
+    def _matrix_elements(self, origins, destinations, keys, pairs, mode, diagonal=False):
+        """
+        查出 pairs 列出的 (列, 欄) 組合：先一次查快取，未命中的才送到 Google，stale 的在背景更新。
+        diagonal=True 表示 pairs 都在對角線上，區塊改用 _diagonal_blocks 切。
+        回傳 ({key: result}, 上游呼叫次數)，取不到的組合為錯誤結果。
+        """
+        flat_keys = list(dict.fromkeys(keys[i][j] for i, j in pairs))
+        entries = self.place_cache.get_many_with_state(
+            flat_keys + [NEGATIVE_PREFIX + key for key in flat_keys]
+        )
+
+        results = {}
+        stale = set()
+        for key in flat_keys:
+            namespace = namespace_of(key)
+            cached, state = entries.get(key, (None, None))
+            negative, negative_state = entries.get(NEGATIVE_PREFIX + key, (None, None))
+            if state == PlaceCache.FRESH:
+                cache_metrics.record_request(namespace, metrics.HIT)
+                results[key] = cached
+            elif negative_state == PlaceCache.FRESH:
+                cache_metrics.record_request(namespace, metrics.NEGATIVE_HIT)
+                results[key] = negative
+            elif state == PlaceCache.STALE:
+                cache_metrics.record_request(namespace, metrics.STALE_HIT)
+                results[key] = cached
+                stale.add(key)
+            else:
+                cache_metrics.record_request(namespace, metrics.MISS)
+
+        upstream_calls = 0
+        missing = [(i, j) for i, j in pairs if keys[i][j] not in results]
+        if missing:
+            upstream_calls, fetched = self._load_route_matrix(origins, destinations, keys, missing, mode, diagonal)
+            results.update(fetched)
+        if stale:
+            # 有未命中時 stale 元素先照舊回傳，和全部命中時一樣在背景另外更新
+            self._schedule_matrix_refresh(origins, destinations, keys, pairs, stale, mode, diagonal)
+
+        for key in flat_keys:
+            if not results.get(key):
+                results[key] = {'success': False, 'error': '無法取得路線', 'error_type': 'NETWORK_ERROR'}
+        return results, upstream_calls
+
+    def compute_day_legs(self, stops: List, mode: str = 'driving') -> Dict:
+        """
+        一天行程相鄰景點之間的交通時間，回傳 legs[k] 為 stops[k] 到 stops[k+1] 的結果。
+        只用得到 stops[:-1] x stops[1:] 的對角線，未命中的路段由 _diagonal_blocks 併成方塊送出：
+        一次請求最多涵蓋 isqrt(元素上限) 段（TRANSIT 10 段、其他 25 段），一般一天的行程只要一次請求，
+        代價是 Routes API 依元素計費，m 段會付 m x m 個元素的費用。
+        """
+        mode = mode.lower()
+        if len(stops) < 2:
+            return {'success': True, 'mode': mode, 'legs': [], 'upstream_calls': 0}
+        origins, destinations = stops[:-1], stops[1:]
+        pairs = [(k, k) for k in range(len(origins))]
+        keys = [
+            [self._matrix_element_key(origins[i], destinations[j], mode) if i == j else None
+             for j in range(len(destinations))]
+            for i in range(len(origins))
+        ]
+        results, upstream_calls = self._matrix_elements(origins, destinations, keys, pairs, mode, diagonal=True)
+        return {
+            'success': True,
+            'mode': mode,
+            'legs': [results[keys[k][k]] for k in range(len(origins))],
+            'upstream_calls': upstream_calls
+        }
+
+    def _matrix_blocks(self, pairs):
+        """
+        把需要的 (列, 欄) 組合拆成要送出的矩形區塊 [(rows, cols)]。
+        Routes API 依元素計費，缺的欄相同的列合成一塊；塊數太多、而且外接矩形多付的元素不多時
+        （不超過需要的 ROUTE_MATRIX_MAX_OVERFETCH 倍）才合成一個外接矩形，減少請求次數。
+        """
+        missing_cols = {}
+        for i, j in pairs:
+            missing_cols.setdefault(i, set()).add(j)
+        groups = {}
+        for i, cols in sorted(missing_cols.items()):
+            groups.setdefault(tuple(sorted(cols)), []).append(i)
+        all_cols = sorted({j for _, j in pairs})
+        needed = sum(len(cols) for cols in missing_cols.values())
+        if (len(groups) > self.ROUTE_MATRIX_MAX_BLOCKS
+                and len(missing_cols) * len(all_cols) <= needed * self.ROUTE_MATRIX_MAX_OVERFETCH):
+            return [(sorted(missing_cols), all_cols)]
+        return [(rows, list(cols)) for cols, rows in groups.items()]
+
+    @staticmethod
+    def _diagonal_blocks(pairs, limit):
+        """
+        把對角線上的 (k, k) 組合切成方塊：每塊取 isqrt(limit) 個 k 當列也當欄，
+        請求數是元素上限允許的最少次數，塊內非對角線的元素不寫快取（key 為 None）。
+        """
+        indexes = sorted(i for i, _ in pairs)
+        size = max(math.isqrt(limit), 1)
+        return [(indexes[start:start + size], indexes[start:start + size]) for start in range(0, len(indexes), size)]
+
+    def _load_route_matrix(self, origins, destinations, keys, pairs, mode, diagonal=False):
+        """
+        把需要的組合送到 Google，每個區塊再依元素上限切成多次請求，多個請求同時送出；
+        同一組 key 同時未命中時只呼叫一次。回傳 (呼叫次數, {key: result})。
+        """
+        first_i, first_j = pairs[0]
+        flight_key = f"{keys[first_i][first_j]}|matrix|{','.join(keys[i][j] for i, j in pairs)}"
+
+        def load():
+            travel_mode = self.TRAVEL_MODES.get(mode, 'DRIVE')
+            limit = self.ROUTE_MATRIX_LIMITS.get(travel_mode, self.ROUTE_MATRIX_LIMITS['DEFAULT'])
+            requests_to_send = []
+            blocks = self._diagonal_blocks(pairs, limit) if diagonal else self._matrix_blocks(pairs)
+            for rows, cols in blocks:
+                rows_per_call = max(limit // len(cols), 1)
+                for start in range(0, len(rows), rows_per_call):
+                    requests_to_send.append((rows[start:start + rows_per_call], cols))
+
+            def fetch(block):
+                return self._fetch_route_matrix(origins, destinations, keys, block[0], block[1], mode)
+
+            fetched = {}
+            if len(requests_to_send) == 1:
+                fetched.update(fetch(requests_to_send[0]))
+            else:
+                workers = min(len(requests_to_send), self.ROUTE_MATRIX_PARALLEL)
+                with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='route-matrix') as executor:
+                    for block_result in executor.map(fetch, requests_to_send):
+                        fetched.update(block_result)
+            return len(requests_to_send), fetched
+
+        return single_flight.do(flight_key, load)
+
+    def _schedule_matrix_refresh(self, origins, destinations, keys, pairs, stale, mode, diagonal=False):
+        """矩陣裡有 stale 元素時，在背景重新抓取那些元素"""
+        pairs = [(i, j) for i, j in pairs if keys[i][j] in stale]
+        refresh_key = '|'.join(sorted(stale))
+        with self._refresh_lock:
+            if refresh_key in self._refreshing:
+                return
+            self._refreshing.add(refresh_key)
+
+        def refresh():
+            try:
+                self._load_route_matrix(origins, destinations, keys, pairs, mode, diagonal)
+            except Exception as e:
+                print(f"[cache] 背景更新路線矩陣失敗: {e}")
+            finally:
+                with self._refresh_lock:
+                    self._refreshing.discard(refresh_key)
+
+        try:
+            self._refresh_executor.submit(refresh)
+        except RuntimeError:
+            with self._refresh_lock:
+                self._refreshing.discard(refresh_key)
+
+    def _route_matrix_waypoint(self, waypoint) -> Dict:
+        if self._is_coordinate(waypoint):
+            return {'waypoint': {'location': {'latLng': {
+                'latitude': waypoint['latitude'],
+                'longitude': waypoint['longitude']
+            }}}}
+        return {'waypoint': {'address': str(waypoint)}}
+
+    def _fetch_route_matrix(self, origins, destinations, keys, rows, cols, mode) -> Dict:
+        """
+        呼叫一次 computeRouteMatrix 並把每個元素寫進各自的快取，回傳 {key: result}。
+        找不到路線的元素存成負向快取；整個請求失敗時不寫快取，回傳錯誤結果。
+        """
+        namespace = namespace_of(keys[rows[0]][cols[0]])
+        travel_mode = self.TRAVEL_MODES.get(mode, 'DRIVE')
+        started = time.perf_counter()
+        try:
+            url = f"{self.routes_base_url}/distanceMatrix/v2:computeRouteMatrix"
+            headers = {
+                'Content-Type': 'application/json',
+                'X-Goog-Api-Key': self.api_key,
+                'X-Goog-FieldMask': 'originIndex,destinationIndex,status,condition,duration,distanceMeters'
+            }
+            payload = {
+                'origins': [self._route_matrix_waypoint(origins[i]) for i in rows],
+                'destinations': [self._route_matrix_waypoint(destinations[j]) for j in cols],
+                'travelMode': travel_mode,
+                'languageCode': 'zh-TW',
+                'units': 'METRIC'
+            }
+            if travel_mode == 'TRANSIT':
+                payload['departureTime'] = (
+                    datetime.now(timezone.utc)
+                    .replace(hour=9, minute=0, second=0, microsecond=0)
+                    .strftime('%Y-%m-%dT%H:%M:%SZ')
+                )
+            response = self.http.post(url, json=payload, headers=headers, timeout=http_client.timeout(15))
+            response.raise_for_status()
+            elements = response.json()
+        except http_client.REJECTED_ERRORS as e:
+            error = e.result()
+        except requests.HTTPError as e:
+            error = self._http_error_result(e)
+        except requests.RequestException as e:
+            error = {'success': False, 'error': f"網路錯誤: {str(e)}", 'error_type': 'NETWORK_ERROR'}
+        except Exception as e:
+            error = {'success': False, 'error': str(e), 'error_type': 'UNKNOWN_ERROR'}
+        else:
+            cache_metrics.record_upstream(namespace, time.perf_counter() - started)
+            fetched = {}
+            positives = {}
+            negatives = {}
+            for element in elements:
+                i = rows[element.get('originIndex', 0)]
+                j = cols[element.get('destinationIndex', 0)]
+                key = keys[i][j]
+                if key is None:
+                    continue
+                status_code = (element.get('status') or {}).get('code', 0)
+                if status_code == 0 and element.get('condition') == 'ROUTE_EXISTS':
+                    result = positives[key] = self._matrix_element_result(
+                        key, self._duration_seconds(element.get('duration')), element.get('distanceMeters', 0), mode
+                    )
+                else:
+                    result = {'success': False, 'error': 'ZERO_RESULTS', 'error_type': 'ZERO_RESULTS'}
+                    negatives[NEGATIVE_PREFIX + key] = result
+                fetched[key] = result
+            if positives or negatives:
+                self.place_cache.set_many({**positives, **negatives})
+            return fetched
+        cache_metrics.record_upstream(namespace, time.perf_counter() - started, error.get('error_type'))
+        return {keys[i][j]: error for i in rows for j in cols if keys[i][j] is not None}
+
     def estimate_transit_time(self, origin: Dict, destination: Dict):
         # 首先，使用DRIVING模式獲取距離
         drive_route = self.compute_routes(origin, destination, mode='driving')
         
         if not drive_route.get('success'):
-            return {
-                "success": False,
-                "error": "無法計算基礎距離以進行估算",
-                "source": "distance_calculation_failed"
-            }
+            # Routes API 無法使用（斷路器打開、配額不足、網路錯誤）時改用直線距離乘上繞路係數
+            straight_km = geo.distance_km(origin, destination)
+            if straight_km is None:
+                return {
+                    "success": False,
+                    "error": "無法計算基礎距離以進行估算",
+                    "source": "distance_calculation_failed"
+                }
+            result = self._transit_heuristic(straight_km * self.STRAIGHT_LINE_DETOUR_FACTOR)
+            result["source"] = "heuristic_straight_line"
+            return result
 
-        # 從 '12.3 公里' 或 '500 公尺' 的格式中提取純數字的公尺
-        distance_text = drive_route.get('distance', '0 公尺')
-        distance_parts = distance_text.split()
-        distance_value = float(distance_parts[0])
-        
-        if '公里' in distance_parts[1]:
-            distance_meters = distance_value * 1000
-        else: # 預設為公尺
-            distance_meters = distance_value
+        distance_meters = drive_route.get('distance_meters')
+        if distance_meters is None:
+            # 從 '12.3 公里' 或 '500 公尺' 的格式中提取純數字的公尺
+            distance_text = drive_route.get('distance', '0 公尺')
+            distance_parts = distance_text.split()
+            distance_value = float(distance_parts[0])
+
+            if '公里' in distance_parts[1]:
+                distance_meters = distance_value * 1000
+            else: # 預設為公尺
+                distance_meters = distance_value
 
-        distance_km = distance_meters / 1000
+        return self._transit_heuristic(distance_meters / 1000)
 
+    @staticmethod
+    def _transit_heuristic(distance_km: float) -> Dict:
+        """依道路距離估算大眾運輸時間（分鐘）"""
         #  short distance heuristic (GUARANTEED NO FAILURE)
         if distance_km < 2:
             walk_time = distance_km / 4.5 * 60
@@ -626,15 +1383,15 @@ class GoogleMapService:
         }
         
     def get_route_details(self, origin: str, destination: str, mode: str = 'driving'):
-        cache_key = f"route_{origin}_{destination}_{mode}"
-        cached = self.place_cache.get(cache_key)
-        if cached:
-            return cached
+        cache_key = cache_keys.route_key(origin, destination, mode)
+        return self._cached(cache_key, lambda: self._fetch_route_details(origin, destination, mode))
+
+    def _fetch_route_details(self, origin: str, destination: str, mode: str):
         try:
             travel_mode_map = {'driving': 'DRIVE', 'transit': 'TRANSIT', 'walking': 'WALK'}
             travel_mode = travel_mode_map.get(mode.lower(), 'DRIVE')
 
-            url = "https://routes.googleapis.com/directions/v2:computeRoutes"
+            url = f"{self.routes_base_url}/directions/v2:computeRoutes"
             headers = {
                 'Content-Type': 'application/json',
                 'X-Goog-Api-Key': self.api_key,
@@ -660,12 +1417,12 @@ class GoogleMapService:
                     .strftime('%Y-%m-%dT%H:%M:%SZ')
                 )
 
-            response = requests.post(url, json=payload, headers=headers, timeout=10)
+            response = self.http.post(url, json=payload, headers=headers, timeout=http_client.timeout(10))
             response.raise_for_status()
             data = response.json()
 
             if not data.get('routes'):
-                return {'success': False, 'error': '查詢失敗'}
+                return {'success': False, 'error': '查詢失敗', 'error_type': 'ZERO_RESULTS'}
 
             steps = []
             for step in data['routes'][0].get('legs', [{}])[0].get('steps', []):
@@ -696,7 +1453,10 @@ class GoogleMapService:
                 'success': True,
                 'steps': steps
             }
-            self.place_cache.set(cache_key, result)
             return result
+        except http_client.REJECTED_ERRORS as e:
+            return e.result()
+        except requests.HTTPError as e:
+            return self._http_error_result(e)
         except Exception as e:
             return {'success': False, 'error': str(e)}
\ No newline at end of file
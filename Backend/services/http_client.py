@@ -0,0 +1,93 @@
+"""
+呼叫 Google API 用的共用 HTTP session
+
+模組層級的 requests.get/post 每次都重新建立 TCP + TLS 連線；改用同一個 requests.Session，
+連線依 host 放在連線池中 keep-alive 重複使用（places.googleapis.com、routes.googleapis.com 各一個池），
+池大小依同時會打 Google 的執行緒數設定。
+
+暫時性錯誤（429、5xx、連線失敗）由 urllib3 Retry 自動重試，等待時間為指數退避加上隨機抖動，
+有 Retry-After 標頭時以它為準；重試用完仍失敗時回傳最後一次的 response，交給呼叫端的
+raise_for_status / status_code 判斷，錯誤分類維持原本的邏輯。
+
+每個請求送出前依 URL 分類出上游 API，先經過該 API 的斷路器（services/circuit_breaker），
+再取得配額（services/quota，重試不另外取）；斷路器打開時拋出 CircuitOpen，
+配額不足且排隊會超過上限時拋出 QuotaExceeded，兩者請求都不會送出，
+呼叫端以 REJECTED_ERRORS 一起處理。
+"""
+from typing import Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from config import Config
+from services import circuit_breaker, quota
+
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+# Places searchText / Routes computeRoutes 雖然是 POST，但都是唯讀查詢，重試是安全的
+RETRY_METHODS = frozenset({'GET', 'POST'})
+# 重試用完仍是這些狀態碼時，算作上游故障（其餘 4xx 是請求本身的問題）
+FAILURE_STATUS_CODES = frozenset(RETRY_STATUS_CODES)
+# 在送出前就被擋下的請求
+REJECTED_ERRORS = (quota.QuotaExceeded, circuit_breaker.CircuitOpen)
+
+
+def build_retry(total: Optional[int] = None) -> Retry:
+    total = Config.GOOGLE_HTTP_MAX_RETRIES if total is None else total
+    return Retry(
+        total=total,
+        read=0,  # 讀取逾時代表請求可能已送達、也已計費，不重送
+        backoff_factor=Config.GOOGLE_HTTP_BACKOFF_FACTOR,
+        backoff_jitter=Config.GOOGLE_HTTP_BACKOFF_JITTER,
+        backoff_max=Config.GOOGLE_HTTP_BACKOFF_MAX,
+        status_forcelist=RETRY_STATUS_CODES,
+        allowed_methods=RETRY_METHODS,
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+
+
+class UpstreamAdapter(HTTPAdapter):
+    """送出請求前先經過該 API 的斷路器並取得配額，回應結果回報給斷路器"""
+
+    def __init__(self, quota_manager=None, breakers=None, **kwargs):
+        self.quota_manager = quota_manager or quota.quota_manager
+        self.breakers = breakers or circuit_breaker.circuit_breakers
+        super().__init__(**kwargs)
+
+    def send(self, request, *args, **kwargs):
+        api = quota.api_for_url(request.url)
+
+        def send():
+            self.quota_manager.acquire(api)
+            return super(UpstreamAdapter, self).send(request, *args, **kwargs)
+
+        return self.breakers.call(
+            api, send, is_failure=lambda response: response.status_code in FAILURE_STATUS_CODES
+        )
+
+
+def build_session(pool_size: Optional[int] = None, max_retries: Optional[int] = None,
+                  quota_manager=None, breakers=None) -> requests.Session:
+    """建立帶連線池、重試、斷路器與配額設定的 session；pool_size 為每個 host 保留的連線數"""
+    pool_size = pool_size or Config.GOOGLE_HTTP_POOL_SIZE
+    adapter = UpstreamAdapter(
+        quota_manager=quota_manager,
+        breakers=breakers,
+        pool_connections=4,  # 同時保留連線池的 host 數
+        pool_maxsize=pool_size,
+        max_retries=build_retry(max_retries),
+    )
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def timeout(read_seconds: float) -> Tuple[float, float]:
+    """(連線逾時, 讀取逾時)；連線逾時統一設定，讀取逾時依各 API 的回應時間決定"""
+    return Config.GOOGLE_HTTP_CONNECT_TIMEOUT, read_seconds
+
+
+# 同一行程內所有 GoogleMapService 共用
+google_session = build_session()
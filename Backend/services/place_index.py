@@ -0,0 +1,232 @@
+import json
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from models.cache_namespaces import policy_for
+from services.cache_keys import normalize_text
+from services.geo import covering_cells, distance_km, geohash, prefix_upper_bound
+
+
+def without_photo_urls(place: Dict) -> Dict:
+    """
+    回傳清掉 photo_url、只留照片 name 的地點副本。CDN URL 只在 photo_cdn_ 快取的 TTL 內有效，
+    存得比它久的資料不能帶著 URL，讀出時再由 photo_cdn_ 重新解析。
+    """
+    if not place.get('photos'):
+        return place
+    return {**place, 'photos': [{**photo, 'photo_url': ''} for photo in place['photos']]}
+
+
+class PlaceIndex:
+    """
+    以 geohash 建索引的已知地點表，和 PlaceCache 共用同一個資料庫。
+
+    search_places / search_places_nearby 從 Google 拿到的地點都會寫進 place_locations，
+    查詢字串與第一筆結果的對應寫進 place_aliases。之後中心點不同、但半徑內已經有
+    同名（或同一個查詢字串找過）的地點時，直接由這裡回答，不必再呼叫 Google。
+    """
+
+    GEOHASH_PRECISION = 9
+    MAX_CANDIDATES = 2000
+
+    def __init__(self, place_cache):
+        self.place_cache = place_cache
+        self.ttl = policy_for('search_nearby_').ttl
+        self._schema_backend = None
+
+    def _ensure_schema(self):
+        """建表；PlaceCache 從 Postgres 退回 SQLite 時要在新的資料庫再建一次"""
+        backend = 'postgres' if self.place_cache.use_postgres else 'sqlite'
+        if self._schema_backend == backend:
+            return
+        run = self.place_cache._run
+        run(
+            '''CREATE TABLE IF NOT EXISTS place_locations (
+                   place_id TEXT PRIMARY KEY,
+                   name_norm TEXT NOT NULL,
+                   language_code TEXT NOT NULL,
+                   latitude DOUBLE PRECISION NOT NULL,
+                   longitude DOUBLE PRECISION NOT NULL,
+                   geohash TEXT NOT NULL,
+                   types TEXT NOT NULL,
+                   place TEXT NOT NULL,
+                   updated_at TIMESTAMPTZ NOT NULL
+               )''',
+            sqlite_sql='''CREATE TABLE IF NOT EXISTS place_locations (
+                              place_id TEXT PRIMARY KEY,
+                              name_norm TEXT NOT NULL,
+                              language_code TEXT NOT NULL,
+                              latitude REAL NOT NULL,
+                              longitude REAL NOT NULL,
+                              geohash TEXT NOT NULL,
+                              types TEXT NOT NULL,
+                              place TEXT NOT NULL,
+                              updated_at TEXT NOT NULL
+                          )'''
+        )
+        run(
+            '''CREATE TABLE IF NOT EXISTS place_aliases (
+                   query_norm TEXT NOT NULL,
+                   language_code TEXT NOT NULL,
+                   place_id TEXT NOT NULL,
+                   PRIMARY KEY (query_norm, language_code, place_id)
+               )'''
+        )
+        run('CREATE INDEX IF NOT EXISTS idx_place_locations_geohash ON place_locations (geohash)')
+        run('CREATE INDEX IF NOT EXISTS idx_place_locations_name ON place_locations (name_norm, language_code)')
+        run('CREATE INDEX IF NOT EXISTS idx_place_aliases_place ON place_aliases (place_id)')
+        self._schema_backend = backend
+
+    @staticmethod
+    def _has_location(place):
+        location = place.get('location') or {}
+        return location.get('latitude') is not None and location.get('longitude') is not None
+
+    def add_places(self, places: List[Dict], query: Optional[str] = None,
+                   language_code: str = 'zh-TW', replace: bool = True):
+        """
+        記錄搜尋到的地點。query 有值時把它和第一筆結果記成別名。
+        replace=False 時已存在的地點不覆蓋（欄位較少的來源，例如 nearby_search）。
+        照片只存 name，photo_url 由讀取端經 photo_cdn_ 補上。
+        """
+        places = [place for place in places or [] if place.get('place_id') and self._has_location(place)]
+        if not places:
+            return
+        self._ensure_schema()
+        now = datetime.utcnow()
+        rows = [
+            (
+                place['place_id'],
+                normalize_text(place.get('name')),
+                language_code,
+                place['location']['latitude'],
+                place['location']['longitude'],
+                geohash(place['location']['latitude'], place['location']['longitude'], self.GEOHASH_PRECISION),
+                json.dumps(place.get('types') or []),
+                json.dumps(without_photo_urls(place), ensure_ascii=False),
+                now,
+            )
+            for place in places
+        ]
+        conflict = (
+            '''DO UPDATE SET name_norm = EXCLUDED.name_norm, language_code = EXCLUDED.language_code,
+                             latitude = EXCLUDED.latitude, longitude = EXCLUDED.longitude,
+                             geohash = EXCLUDED.geohash, types = EXCLUDED.types,
+                             place = EXCLUDED.place, updated_at = EXCLUDED.updated_at'''
+            if replace else 'DO NOTHING'
+        )
+        self.place_cache._run_many(
+            f'''INSERT INTO place_locations
+                    (place_id, name_norm, language_code, latitude, longitude, geohash, types, place, updated_at)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+                ON CONFLICT (place_id) {conflict}''',
+            rows
+        )
+        query_norm = normalize_text(query)
+        if query_norm:
+            self.place_cache._run(
+                '''INSERT INTO place_aliases (query_norm, language_code, place_id) VALUES (%s, %s, %s)
+                   ON CONFLICT (query_norm, language_code, place_id) DO NOTHING''',
+                (query_norm, language_code, places[0]['place_id'])
+            )
+
+    def _candidates(self, location: Dict, radius_m: float, where: str, params: tuple):
+        """
+        geohash 格子先篩一輪，再用實際距離過濾，依距離排序回傳 [(距離 km, place)]。
+        每個格子寫成 geohash >= 格子 AND geohash < 下一個格子的範圍條件（不用 substr），
+        才能走 idx_place_locations_geohash 索引，不必掃整張表。
+        """
+        _, cells = covering_cells(location, radius_m)
+        ranges = []
+        range_params = []
+        for cell in cells:
+            upper = prefix_upper_bound(cell)
+            if upper is None:
+                ranges.append('geohash >= %s')
+                range_params.append(cell)
+            else:
+                ranges.append('(geohash >= %s AND geohash < %s)')
+                range_params.extend((cell, upper))
+        rows = self.place_cache._run(
+            f'''SELECT place, latitude, longitude FROM place_locations
+                WHERE ({' OR '.join(ranges)}) AND updated_at >= %s AND {where}
+                LIMIT %s''',
+            (*range_params, datetime.utcnow() - self.ttl, *params, self.MAX_CANDIDATES),
+            fetch=True
+        )
+        matches = []
+        for place, latitude, longitude in rows:
+            distance = distance_km(location, {'latitude': latitude, 'longitude': longitude})
+            if distance is not None and distance * 1000 <= radius_m:
+                matches.append((distance, json.loads(place)))
+        matches.sort(key=lambda item: item[0])
+        return matches
+
+    def find_by_name(self, text_query: str, location: Dict, radius_m: float,
+                     language_code: str = 'zh-TW', max_results: int = 1) -> Optional[Dict]:
+        """
+        半徑內名稱相同、或同一個查詢字串曾經找到的地點。
+        找到的數量足夠 max_results 才回傳搜尋結果格式，否則回傳 None（交給 Google）。
+        """
+        query_norm = normalize_text(text_query)
+        if not query_norm or not location:
+            return None
+        self._ensure_schema()
+        matches = self._candidates(
+            location, radius_m,
+            '''language_code = %s AND (name_norm = %s OR place_id IN (
+                   SELECT place_id FROM place_aliases WHERE query_norm = %s AND language_code = %s))''',
+            (language_code, query_norm, query_norm, language_code)
+        )
+        if len(matches) < max_results or not matches:
+            return None
+        places = [place for _, place in matches[:max_results]]
+        return {
+            'success': True,
+            'places': places,
+            'total_results': len(places),
+            'query': text_query,
+            'source': 'place_index'
+        }
+
+    def find_by_types(self, location: Dict, radius_m: float, included_types: List[str],
+                      language_code: str = 'zh-TW', max_results: int = 10) -> Optional[Dict]:
+        """半徑內符合類型的已知地點；數量不足 max_results 時回傳 None"""
+        if not included_types:
+            return None
+        self._ensure_schema()
+        matches = [
+            (distance, place)
+            for distance, place in self._candidates(location, radius_m, 'language_code = %s', (language_code,))
+            if set(place.get('types') or []) & set(included_types)
+        ]
+        if len(matches) < max_results:
+            return None
+        places = [place for _, place in matches[:max_results]]
+        return {
+            'success': True,
+            'places': places,
+            'total_results': len(places),
+            'source': 'place_index'
+        }
+
+    def remove_place(self, place_id: str) -> int:
+        self._ensure_schema()
+        self.place_cache._run('DELETE FROM place_aliases WHERE place_id = %s', (place_id,))
+        return max(self.place_cache._run('DELETE FROM place_locations WHERE place_id = %s', (place_id,)), 0)
+
+    def clear(self) -> int:
+        self._ensure_schema()
+        self.place_cache._run('DELETE FROM place_aliases')
+        return max(self.place_cache._run('DELETE FROM place_locations'), 0)
+
+    def purge_expired(self) -> int:
+        """刪除超過 search_nearby TTL 的地點與失效的別名，回傳刪除的地點筆數"""
+        self._ensure_schema()
+        deleted = self.place_cache._run(
+            'DELETE FROM place_locations WHERE updated_at < %s', (datetime.utcnow() - self.ttl,)
+        )
+        self.place_cache._run(
+            'DELETE FROM place_aliases WHERE place_id NOT IN (SELECT place_id FROM place_locations)'
+        )
+        return max(deleted, 0)
@@ -0,0 +1,73 @@
+"""
+Places API 欄位組合（field mask profile）
+
+呼叫端依需求選擇要向 Google 拿哪些欄位，欄位越少回應越小、計費 SKU 也越低：
+  - geo：座標、名稱、地址、類型（DataFixService 定中心點、排路線只需要這些）
+  - card：geo 再加上評分與照片（景點卡片）
+  - full：card 再加上電話、網站；地點詳情另含營業時間與評論
+profile 會寫進快取 key；較完整的快取結果可以直接回答較精簡的請求。
+"""
+from typing import Dict, List
+
+PROFILES = ('geo', 'card', 'full')
+
+# searchText 的欄位（field mask 會加上 places. 前綴）
+SEARCH_FIELDS = {
+    'geo': ['id', 'displayName', 'formattedAddress', 'location', 'types'],
+    'card': ['rating', 'userRatingCount', 'photos'],
+    'full': ['internationalPhoneNumber', 'websiteUri'],
+}
+
+# Place Details 的欄位
+DETAILS_FIELDS = {
+    'geo': ['id', 'displayName', 'formattedAddress', 'location', 'types'],
+    'card': ['rating', 'photos', 'priceLevel', 'priceRange'],
+    'full': ['internationalPhoneNumber', 'websiteUri', 'regularOpeningHours', 'reviews'],
+}
+
+# 格式化後的地點至少要有這些欄位，才算是該 profile 的結果（用來檢查 PlaceIndex 裡的地點）
+SEARCH_OUTPUT_KEYS = {
+    'geo': {'place_id', 'name', 'location'},
+    'card': {'rating', 'photos'},
+    'full': {'phone', 'website'},
+}
+
+
+def is_valid(profile) -> bool:
+    return profile in PROFILES
+
+
+def includes(profile: str, level: str) -> bool:
+    """profile 是否包含 level 那一層的欄位"""
+    return PROFILES.index(profile) >= PROFILES.index(level)
+
+
+def at_least(profile: str) -> List[str]:
+    """和 profile 一樣或更完整的 profile，由精簡到完整"""
+    return list(PROFILES[PROFILES.index(profile):])
+
+
+def has_photos(profile: str) -> bool:
+    return includes(profile, 'card')
+
+
+def _fields(table: Dict[str, List[str]], profile: str) -> List[str]:
+    return [field for level in PROFILES[:PROFILES.index(profile) + 1] for field in table[level]]
+
+
+def search_field_mask(profile: str) -> str:
+    return ','.join(f'places.{field}' for field in _fields(SEARCH_FIELDS, profile))
+
+
+def details_field_mask(profile: str) -> str:
+    return ','.join(_fields(DETAILS_FIELDS, profile))
+
+
+def details_search_field_mask(profile: str) -> str:
+    """用 searchText 取得 Place Details 欄位時的 field mask（依名稱查詳情）"""
+    return ','.join(f'places.{field}' for field in _fields(DETAILS_FIELDS, profile))
+
+
+def place_satisfies(place: Dict, profile: str) -> bool:
+    """格式化後的搜尋結果地點是否含有 profile 需要的欄位"""
+    return all(key in place for level in PROFILES[:PROFILES.index(profile) + 1] for key in SEARCH_OUTPUT_KEYS[level])
@@ -0,0 +1,266 @@
+"""
+上游 API 的請求配額（token bucket）
+
+Google Places / Routes 與 Gemini 都有每個方法各自的 QPS / RPM 上限，超過時整批回 429，
+一次 /data/latlng 就可能讓整份行程查詢失敗。這裡替每個上游 API 維護一個 token bucket：
+  - rate：每秒補充的 token 數；burst：bucket 容量（允許的瞬間併發）
+  - 取不到 token 的呼叫端排隊等候，需要等超過 max_wait 秒時直接回報 QuotaExceeded，不送出請求
+  - 採預約制：等候中的呼叫端先扣 token（可以扣到負值），依扣到的順序醒來，不需要輪詢
+
+bucket 狀態預設存在本機的 SQLite 檔（Config.QUOTA_STATE_PATH），以 BEGIN IMMEDIATE 交易鎖住，
+同一台機器的多個 worker 共用同一份配額；設為空字串或檔案無法開啟時只在行程內共用。
+Google 的請求由 services/http_client 的 adapter 依 URL 分類後取 token，Gemini 由 GeminiService 取。
+"""
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from config import Config
+
+
+@dataclass(frozen=True)
+class QuotaPolicy:
+    name: str
+    rate: float
+    burst: float
+    max_wait: float
+
+
+def _policy(name: str, rate: float, max_wait: float = None) -> QuotaPolicy:
+    return QuotaPolicy(
+        name,
+        rate,
+        max(rate * Config.QUOTA_BURST_SECONDS, 1.0),
+        Config.QUOTA_MAX_WAIT_SECONDS if max_wait is None else max_wait,
+    )
+
+
+QUOTA_POLICIES = [
+    _policy('places.searchText', Config.QUOTA_PLACES_QPS),
+    _policy('places.searchNearby', Config.QUOTA_PLACES_QPS),
+    _policy('places.details', Config.QUOTA_PLACES_QPS),
+    _policy('places.photo', Config.QUOTA_PHOTO_QPS),
+    _policy('routes.computeRoutes', Config.QUOTA_ROUTES_QPS),
+    _policy('routes.computeRouteMatrix', Config.QUOTA_ROUTES_QPS),
+    # Gemini 一次生成本身就要好幾秒，排隊上限也放寬
+    _policy('gemini.generate', Config.QUOTA_GEMINI_RPM / 60, Config.QUOTA_GEMINI_MAX_WAIT_SECONDS),
+]
+
+# URL 片段對應的 API，依序比對（computeRouteMatrix 要排在 computeRoutes 前面）
+_URL_PATTERNS = (
+    (':searchText', 'places.searchText'),
+    (':searchNearby', 'places.searchNearby'),
+    ('/media', 'places.photo'),
+    (':computeRouteMatrix', 'routes.computeRouteMatrix'),
+    (':computeRoutes', 'routes.computeRoutes'),
+    ('/places/', 'places.details'),
+)
+
+
+def api_for_url(url: str) -> Optional[str]:
+    """Google API 的 URL 對應到哪一個配額，不屬於任何配額時回傳 None"""
+    path = str(url).split('?', 1)[0]
+    for fragment, api in _URL_PATTERNS:
+        if fragment in path:
+            return api
+    return None
+
+
+class QuotaExceeded(Exception):
+    """排隊時間會超過 max_wait，請求沒有送出"""
+
+    def __init__(self, api: str, retry_after: float):
+        self.api = api
+        self.retry_after = retry_after
+        super().__init__(f"{api} 請求配額已用完，請 {max(retry_after, 0.1):.1f} 秒後再試")
+
+    def result(self) -> Dict:
+        """GoogleMapService 的錯誤結果格式；QUOTA_EXCEEDED 不會寫進負向快取"""
+        return {
+            'success': False,
+            'error': str(self),
+            'error_type': 'QUOTA_EXCEEDED',
+            'retry_after': round(self.retry_after, 2),
+        }
+
+
+def _reserve(policy: QuotaPolicy, tokens: float, updated_at: float, now: float):
+    """
+    補充 token 後嘗試預約一個，回傳 (新的 token 數, 需要等待的秒數, 是否預約成功)；
+    等待會超過 max_wait 時不預約，token 數只做補充。
+    """
+    tokens = min(policy.burst, tokens + max(now - updated_at, 0) * policy.rate)
+    wait = max(1 - tokens, 0) / policy.rate if policy.rate > 0 else float('inf')
+    if wait > policy.max_wait:
+        return tokens, wait, False
+    return tokens - 1, wait, True
+
+
+class _Usage:
+    def __init__(self):
+        self.granted = 0
+        self.waited = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.rejected = 0
+
+
+class _LocalBuckets:
+    """只在行程內共用的 bucket 狀態"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._state = {}
+
+    def reserve(self, policy: QuotaPolicy):
+        now = time.time()
+        with self._lock:
+            tokens, updated_at = self._state.get(policy.name, (policy.burst, now))
+            tokens, wait, reserved = _reserve(policy, tokens, updated_at, now)
+            self._state[policy.name] = (tokens, now)
+            return wait, reserved
+
+    def tokens(self, policy: QuotaPolicy) -> float:
+        now = time.time()
+        with self._lock:
+            tokens, updated_at = self._state.get(policy.name, (policy.burst, now))
+        return min(policy.burst, tokens + max(now - updated_at, 0) * policy.rate)
+
+
+class _SqliteBuckets:
+    """存在本機 SQLite 檔的 bucket 狀態，同一台機器的所有 worker 共用"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection().execute(
+            '''CREATE TABLE IF NOT EXISTS quota_buckets (
+                   api TEXT PRIMARY KEY,
+                   tokens REAL NOT NULL,
+                   updated_at REAL NOT NULL
+               )'''
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    def reserve(self, policy: QuotaPolicy):
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            now = time.time()
+            row = conn.execute(
+                'SELECT tokens, updated_at FROM quota_buckets WHERE api = ?', (policy.name,)
+            ).fetchone()
+            tokens, updated_at = row if row else (policy.burst, now)
+            tokens, wait, reserved = _reserve(policy, tokens, updated_at, now)
+            conn.execute(
+                'INSERT OR REPLACE INTO quota_buckets (api, tokens, updated_at) VALUES (?, ?, ?)',
+                (policy.name, tokens, now)
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return wait, reserved
+
+    def tokens(self, policy: QuotaPolicy) -> float:
+        now = time.time()
+        row = self._connection().execute(
+            'SELECT tokens, updated_at FROM quota_buckets WHERE api = ?', (policy.name,)
+        ).fetchone()
+        tokens, updated_at = row if row else (policy.burst, now)
+        return min(policy.burst, tokens + max(now - updated_at, 0) * policy.rate)
+
+
+class QuotaManager:
+    def __init__(self, policies=None, state_path: Optional[str] = None, enabled: Optional[bool] = None):
+        self.policies = {policy.name: policy for policy in (policies or QUOTA_POLICIES)}
+        self.enabled = Config.QUOTA_ENABLED if enabled is None else enabled
+        state_path = Config.QUOTA_STATE_PATH if state_path is None else state_path
+        self.shared = False
+        self._buckets = _LocalBuckets()
+        if state_path:
+            try:
+                self._buckets = _SqliteBuckets(state_path)
+                self.shared = True
+            except (OSError, sqlite3.Error) as e:
+                print(f"[quota] 無法開啟 {state_path}，配額只在行程內共用: {e}")
+        self._lock = threading.Lock()
+        self._usage = {name: _Usage() for name in self.policies}
+
+    def _reserve(self, policy: QuotaPolicy):
+        try:
+            return self._buckets.reserve(policy)
+        except sqlite3.Error as e:
+            # 檔案鎖逾時或損毀時改用行程內的 bucket，不讓配額本身擋住請求
+            print(f"[quota] 共用配額失敗，改用行程內配額: {e}")
+            self._buckets = _LocalBuckets()
+            self.shared = False
+            return self._buckets.reserve(policy)
+
+    def acquire(self, api: Optional[str]) -> float:
+        """
+        取得一次呼叫 api 的配額，必要時在這裡排隊等候，回傳等待的秒數。
+        未設定配額的 api 直接通過；等待會超過 max_wait 時拋出 QuotaExceeded。
+        """
+        policy = self.policies.get(api)
+        if not self.enabled or policy is None:
+            return 0.0
+        wait, reserved = self._reserve(policy)
+        usage = self._usage[policy.name]
+        if not reserved:
+            with self._lock:
+                usage.rejected += 1
+            raise QuotaExceeded(policy.name, wait - policy.max_wait)
+        with self._lock:
+            usage.granted += 1
+            if wait > 0:
+                usage.waited += 1
+                usage.wait_seconds += wait
+                usage.max_wait_seconds = max(usage.max_wait_seconds, wait)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def usage(self) -> Dict:
+        """各 API 的設定、目前可用的 token 與本行程內的取用統計"""
+        apis = {}
+        for name, policy in self.policies.items():
+            usage = self._usage[name]
+            try:
+                available = self._buckets.tokens(policy)
+            except sqlite3.Error:
+                available = None
+            with self._lock:
+                apis[name] = {
+                    'rate_per_second': round(policy.rate, 4),
+                    'burst': policy.burst,
+                    'max_wait_seconds': policy.max_wait,
+                    'available_tokens': round(available, 2) if available is not None else None,
+                    'granted': usage.granted,
+                    'waited': usage.waited,
+                    'mean_wait_ms': round(usage.wait_seconds / usage.waited * 1000, 2) if usage.waited else 0,
+                    'max_wait_ms': round(usage.max_wait_seconds * 1000, 2),
+                    'rejected': usage.rejected,
+                }
+        return {
+            'enabled': self.enabled,
+            'shared': self.shared,
+            'apis': apis,
+        }
+
+
+# 同一行程內所有服務共用
+quota_manager = QuotaManager()
@@ -0,0 +1,125 @@
+"""
+服務容器
+
+每個服務在整個行程中只建立一次，第一次取用時才初始化（建表、ALTER、連線池都只跑一次），
+之後 app、controllers、routes、decorators 拿到的都是同一個實例，PlaceCache 的記憶體層與
+連線池也因此真正共用。服務之間的相依關係在這裡組好後以建構子參數注入。
+
+import 放在各個 factory 裡面，避免載入這個模組就把 Gemini、資料庫等相依都帶進來。
+"""
+import os
+import threading
+
+_lock = threading.RLock()
+_instances = {}
+_factories = {}
+
+
+def register(name, factory):
+    """註冊（或替換）服務的建立方式；已建立的實例會被丟棄"""
+    with _lock:
+        _factories[name] = factory
+        _instances.pop(name, None)
+
+
+def get(name):
+    """取得服務實例，第一次呼叫時建立"""
+    instance = _instances.get(name)
+    if instance is not None:
+        return instance
+    # 用 RLock：factory 內會再呼叫 get() 取得相依的服務
+    with _lock:
+        instance = _instances.get(name)
+        if instance is None:
+            if name not in _factories:
+                raise KeyError(f'未註冊的服務: {name}')
+            instance = _instances[name] = _factories[name]()
+        return instance
+
+
+def provide(name, instance):
+    """直接放入已建立好的實例（腳本或測試替換用）"""
+    with _lock:
+        _instances[name] = instance
+
+
+def reset():
+    """丟棄所有已建立的實例"""
+    with _lock:
+        _instances.clear()
+
+
+def _google_map_service():
+    from services.googlemap_service import GoogleMapService
+    return GoogleMapService()
+
+
+def _async_google_map_service():
+    from services.async_googlemap_service import AsyncGoogleMapService
+    return AsyncGoogleMapService(map_service=google_map_service())
+
+
+def _data_fix_service():
+    from services.data_fix_service import DataFixService
+    return DataFixService(google_map_service=google_map_service())
+
+
+def _gemini_service():
+    from services.gemini_service import GeminiService
+    return GeminiService(map_service=google_map_service(), data_fix_service=data_fix_service())
+
+
+def _travel_service():
+    from services.travel_service import TravelService
+    return TravelService()
+
+
+def _auth_service():
+    from services.auth_service import AuthService
+    return AuthService()
+
+
+def _cache_warmup_service():
+    from services.cache_warmup import CacheWarmupService
+    # TravelService 需要主資料庫；沒有 DATABASE_URL 時 seed 仍可用，只有 warm_recent 會報錯
+    return CacheWarmupService(
+        data_fix_service(),
+        travel_service=travel_service() if os.getenv('DATABASE_URL') else None
+    )
+
+
+register('google_map_service', _google_map_service)
+register('async_google_map_service', _async_google_map_service)
+register('data_fix_service', _data_fix_service)
+register('gemini_service', _gemini_service)
+register('travel_service', _travel_service)
+register('auth_service', _auth_service)
+register('cache_warmup_service', _cache_warmup_service)
+
+
+def google_map_service():
+    return get('google_map_service')
+
+
+def async_google_map_service():
+    return get('async_google_map_service')
+
+
+def data_fix_service():
+    return get('data_fix_service')
+
+
+def gemini_service():
+    return get('gemini_service')
+
+
+def travel_service():
+    return get('travel_service')
+
+
+def auth_service():
+    return get('auth_service')
+
+
+def cache_warmup_service():
+    return get('cache_warmup_service')
@@ -0,0 +1,71 @@
+import copy
+import threading
+
+from models.cache_namespaces import namespace_of
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.followers = 0
+
+
+class SingleFlight:
+    """
+    合併同時發生的相同請求：同一個 key 同時只有一個執行緒真正呼叫上游，
+    其餘執行緒等待並共用它的結果（或例外）。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._stats = {}
+
+    def _stat(self, key):
+        namespace = namespace_of(key)
+        stats = self._stats.get(namespace)
+        if stats is None:
+            stats = self._stats[namespace] = {'upstream_calls': 0, 'deduplicated': 0}
+        return stats
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self._stat(key)['upstream_calls'] += 1
+            else:
+                call.followers += 1
+                self._stat(key)['deduplicated'] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            # call.result 是 leader 在 done.set() 前做好、只供複製的快照，每個等待者再拿一份獨立的副本
+            return copy.deepcopy(call.result)
+
+        result = None
+        try:
+            result = fn()
+            return result
+        except BaseException as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+                followers = call.followers
+            # 移出 _calls 後不會再有新的等待者；leader 的呼叫端拿到 result 後可能馬上修改它，
+            # 所以要在喚醒等待者之前先複製，不能讓等待者直接複製 leader 手上的物件
+            if followers and call.error is None:
+                call.result = copy.deepcopy(result)
+            call.done.set()
+
+    def stats(self):
+        """各命名空間實際呼叫上游與被合併掉的次數"""
+        with self._lock:
+            return {namespace: dict(stats) for namespace, stats in self._stats.items()}
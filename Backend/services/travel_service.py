@@ -97,6 +97,23 @@ class TravelService:
                 )
                 return cur.fetchall()
 
+    def get_recent_itineraries(self, limit=50, since_days=30):
+        """最近建立的行程（快取預熱用），只取有景點清單的"""
+        with self._conn() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    """
+                    SELECT itinerary_id, destination, data_json, data_latlng
+                    FROM itineraries
+                    WHERE created_at >= NOW() - make_interval(days => %s)
+                      AND (data_json IS NOT NULL OR data_latlng IS NOT NULL)
+                    ORDER BY created_at DESC
+                    LIMIT %s
+                    """,
+                    (since_days, limit),
+                )
+                return cur.fetchall()
+
     def get_itineraries(self, project_id):
         with self._conn() as conn:
             with conn.cursor() as cur:
@@ -1,7 +1,7 @@
 import json
 import re
 import math
-from services.googlemap_service import GoogleMapService
+from services import registry
 from datetime import datetime
 
 buffer_time = 20  # minutes
@@ -15,25 +15,30 @@ def validate_travel_plan(travel_plan):
     route_result = route_validate(data)
     
     
+def duration_minutes(result):
+    """路線結果的分鐘數；舊快取沒有 duration_seconds 時從「X 小時 Y 分鐘」文字解析"""
+    if result.get("duration_seconds") is not None:
+        return result["duration_seconds"] // 60
+    time_str = result.get("duration") or ""
+    hours = re.search(r'(\d+)\s*小時', time_str)
+    minutes = re.search(r'(\d+)\s*分', time_str)
+    h = int(hours.group(1)) if hours else 0
+    m = int(minutes.group(1)) if minutes else 0
+    return h * 60 + m
+
+
 def time_validate(data_days):
-    service = GoogleMapService()
+    service = registry.google_map_service()
     time = 0
     for day in data_days["days"]:
-        stops = day["activities"]
-        for i in range(len(stops) - 1):
-            origin = stops[i]["place_name"]
-            destination = stops[i + 1]["place_name"]
-            result = service.get_distance_and_duration(origin, destination, mode="driving")
-            if result["success"] == True:
-                time_str = result["data"]["duration"]
-                hours = re.search(r'(\d+)小時', time_str)
-                minutes = re.search(r'(\d+)分鐘', time_str)
-                h = int(hours.group(1)) if hours else 0
-                m = int(minutes.group(1)) if minutes else 0
-                duration = h * 60 + m
-                time += duration + buffer_time
+        stops = [stop["place_name"] for stop in day["activities"]]
+        # 一天的所有路段用一次路線矩陣取得
+        legs = service.compute_day_legs(stops, mode="driving")["legs"]
+        for i, result in enumerate(legs):
+            if result.get("success"):
+                time += duration_minutes(result) + buffer_time
             else:
-                return {"success": False, "message": f"Failed to get distance and duration from {origin} to {destination}"}
+                return {"success": False, "message": f"Failed to get distance and duration from {stops[i]} to {stops[i + 1]}"}
     if time <= limit_time:
         return {"success": True, "message": "Travel plan is valid within the time limit."}
     else:
@@ -41,7 +46,7 @@ def time_validate(data_days):
 
 
 def open_validate(data_days):
-    service = GoogleMapService()
+    service = registry.google_map_service()
 
     for day in data_days:
         weekday = day.get("weekday")
@@ -57,7 +62,7 @@ def open_validate(data_days):
                     "success": False,
                     "message": f"無法取得 {place_name} 的營業時間"
                 }
-            opening_hours = result["data"].get("opening_hours", [])
+            opening_hours = result.get("opening_hours", [])
 
             # 找對應的星期
             day_opening = None
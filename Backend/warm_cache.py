@@ -0,0 +1,77 @@
+"""
+快取預熱與 bundle 匯出／匯入
+
+用法（在 Backend 目錄下執行）：
+    python warm_cache.py recent --limit 50 --days 30     # 重播最近的行程
+    python warm_cache.py seed data/cache_seed.json       # 依種子檔預熱熱門目的地
+    python warm_cache.py export cache_bundle.jsonl.gz [--namespace search_nearby --namespace photo_cdn]
+    python warm_cache.py import cache_bundle.jsonl.gz [--overwrite]
+"""
+import argparse
+import sys
+
+from models.cache_bundle import export_bundle, import_bundle
+from models.cache_model import PlaceCache
+from models.cache_namespaces import POLICIES_BY_NAME
+
+
+def warmup_service():
+    # 延後 import：export/import 不需要 Google API key 與主資料庫
+    from services import registry
+    return registry.cache_warmup_service()
+
+
+def print_report(report):
+    for key, value in report.items():
+        print(f"  {key}: {value}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    recent = subparsers.add_parser('recent', help='重播最近建立的行程')
+    recent.add_argument('--limit', type=int, default=50)
+    recent.add_argument('--days', type=int, default=30, help='只取最近幾天內建立的行程')
+    recent.add_argument('--workers', type=int, default=2)
+
+    seed = subparsers.add_parser('seed', help='依種子檔預熱')
+    seed.add_argument('path', nargs='?', default='data/cache_seed.json')
+    seed.add_argument('--workers', type=int, default=2)
+
+    export = subparsers.add_parser('export', help='把快取匯出成 bundle')
+    export.add_argument('path')
+    export.add_argument('--namespace', action='append', choices=sorted(POLICIES_BY_NAME))
+
+    load = subparsers.add_parser('import', help='匯入 bundle')
+    load.add_argument('path')
+    load.add_argument('--namespace', action='append', choices=sorted(POLICIES_BY_NAME))
+    load.add_argument('--overwrite', action='store_true', help='覆蓋資料庫裡比較新的資料')
+
+    args = parser.parse_args()
+
+    if args.command == 'recent':
+        print(f"🔥 重播最近 {args.days} 天內的行程（最多 {args.limit} 筆）")
+        print_report(warmup_service().warm_recent(args.limit, args.days, args.workers))
+    elif args.command == 'seed':
+        print(f"🔥 依種子檔 {args.path} 預熱")
+        print_report(warmup_service().warm_from_seed(args.path, args.workers))
+    elif args.command == 'export':
+        cache = PlaceCache()
+        report = export_bundle(cache, args.path, args.namespace)
+        print(f"📦 匯出 {report['entries']} 筆到 {args.path}")
+        print_report(report['namespaces'])
+        cache.close()
+    elif args.command == 'import':
+        cache = PlaceCache()
+        try:
+            report = import_bundle(cache, args.path, overwrite=args.overwrite, namespaces=args.namespace)
+        except ValueError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+        print(f"📥 匯入 {report['entries']} 筆，略過已過期 {report['expired']} 筆")
+        cache.close()
+
+
+if __name__ == '__main__':
+    main()